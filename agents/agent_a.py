@@ -1,6 +1,8 @@
 from intents.classifier import classify_intent, Intent
 from tools import repo_tools
 from agents.agent_b import AgentB
+from utils import tracing
+from config.settings import ENABLE_VECTORSTORE
 
 
 class AgentA:
@@ -8,18 +10,37 @@ class AgentA:
     Leader / Router Agent
     """
 
-    def __init__(self, llm):
+    def __init__(self, llm, ctx, progress=None):
+        """
+        progress(done, total) is called by long-running repository-wide
+        intents.
+        """
         self.llm = llm
-        self.agent_b = AgentB(llm)
+        self.ctx = ctx
+        self.progress = progress
+        self.agent_b = AgentB(llm, ctx)
 
-    def handle_query(self, user_query: str) -> str:
+    def handle_query(self, user_query: str, stream: bool = False):
         """
         Main entry point for all user queries.
+        With stream=True, explanations are returned as an iterator of
+        text chunks; every other intent still returns a string.
         """
-
-        intent_result = classify_intent(self.llm, user_query)
+        with tracing.span("handle_query") as span:
+            return self._handle_query(user_query, stream, span)
+
+    def _handle_query(self, user_query: str, stream: bool, span):
+        # cheap, throttled check for new commits on the default branch
+        repo_tools.refresh_head(self.ctx)
+
+        intent_result = classify_intent(
+            self.llm,
+            user_query,
+            repo_tools.get_path_index(self.ctx),
+        )
         intent = intent_result.intent
         entities = intent_result.entities
+        span.set(intent=intent.value)
 
         if intent == Intent.SHOW_REPO_TREE:
             return self._show_repo_tree()
@@ -31,30 +52,85 @@ class AgentA:
             return self._get_owner_info()
 
         if intent == Intent.SHOW_FILE_CODE:
-            return self._show_file_code(entities.filename)
+            return self._show_file_code(
+                entities.filename,
+                entities.start_line,
+                entities.end_line,
+            )
 
         if intent == Intent.EXPLAIN_CODE:
-            return self._explain_file(entities.filename)
+            return self._explain_file(entities.filename, stream)
 
         if intent == Intent.EXPLAIN_CODE_SLICE:
             return self._explain_code_slice(
                 entities.filename,
                 entities.start_line,
                 entities.end_line,
+                stream,
             )
 
         if intent == Intent.CODE_METRICS:
             return self._code_metrics(entities.filename)
 
+        if intent == Intent.REPO_METRICS:
+            return self.agent_b.repo_metrics(self.progress)
+
         if intent == Intent.DEPENDENCY_GRAPH:
             return self._dependency_graph(entities.filename)
 
+        if intent == Intent.IMPORTED_BY:
+            path = self._resolve_file_path(entities.filename)
+            return self.agent_b.imported_by(path)
+
+        if intent == Intent.IMPORT_CYCLES:
+            return self.agent_b.import_cycles()
+
+        if intent == Intent.GREP_CODE:
+            if not entities.query:
+                raise ValueError("Nothing to search for")
+            path = (
+                self._resolve_file_path(entities.filename)
+                if entities.filename else None
+            )
+            return self.agent_b.grep_code(
+                entities.query,
+                path,
+                self.progress,
+            )
+
+        if intent in (Intent.FIND_SYMBOL, Intent.SHOW_SYMBOL, Intent.EXPLAIN_SYMBOL):
+            if not entities.symbol:
+                raise ValueError("Symbol name not provided")
+            path = (
+                self._resolve_file_path(entities.filename)
+                if entities.filename else None
+            )
+            if intent == Intent.FIND_SYMBOL:
+                return self.agent_b.find_symbol(entities.symbol, path, self.progress)
+            if intent == Intent.SHOW_SYMBOL:
+                return self.agent_b.show_symbol(entities.symbol, path, self.progress)
+            return self.agent_b.explain_symbol(
+                entities.symbol, path, self.progress, stream
+            )
+
+        if intent == Intent.SEARCH_CODE and not ENABLE_VECTORSTORE:
+            # no vector index to search; fall back to a definition or text
+            if entities.symbol:
+                return self.agent_b.find_symbol(entities.symbol, None, self.progress)
+            return self.agent_b.grep_code(entities.query or user_query, None, self.progress)
+
+        if intent == Intent.SEARCH_CODE:
+            return self.agent_b.search_code(
+                entities.query or user_query,
+                self.progress,
+            )
+
         raise ValueError(f"Unhandled intent: {intent}")
 
 
     def _show_repo_tree(self) -> str:
-        tree = repo_tools.get_repo_tree()
-        metadata = repo_tools.get_repo_metadata()
+        tree = repo_tools.get_repo_tree(self.ctx)
+        metadata = repo_tools.get_repo_metadata(self.ctx)
 
         lines = [f"{metadata['name']}/"]
         lines.extend(repo_tools.format_repo_tree(tree))
@@ -63,33 +139,39 @@ class AgentA:
 
 
     def _repo_summary(self) -> str:
-        readme = repo_tools.get_readme()
-        tree = repo_tools.get_repo_tree()
-        metadata = repo_tools.get_repo_metadata()
+        readme = repo_tools.get_readme(self.ctx)
+        tree = repo_tools.get_repo_tree(self.ctx)
+        metadata = repo_tools.get_repo_metadata(self.ctx)
         return repo_tools.summarize_repo(readme, tree, metadata)
 
     def _get_owner_info(self) -> str:
-        return repo_tools.get_owner_info()
+        return repo_tools.get_owner_info(self.ctx)
 
-    def _show_file_code(self, filename: str) -> str:
+    def _show_file_code(
+        self,
+        filename: str,
+        start_line: int = None,
+        end_line: int = None,
+    ) -> str:
         path = self._resolve_file_path(filename)
-        return self.agent_b.show_file(path)
+        return self.agent_b.show_file(path, start_line, end_line)
 
-    def _explain_file(self, filename: str) -> str:
+    def _explain_file(self, filename: str, stream: bool = False):
         path = self._resolve_file_path(filename)
-        return self.agent_b.explain_file(path)
+        return self.agent_b.explain_file(path, stream)
 
     def _explain_code_slice(
         self,
         filename: str,
         start_line: int,
         end_line: int,
-    ) -> str:
+        stream: bool = False,
+    ):
         if start_line is None or end_line is None:
             raise ValueError("Line range required for code slice explanation")
 
         path = self._resolve_file_path(filename)
-        return self.agent_b.explain_file_slice(path, start_line, end_line)
+        return self.agent_b.explain_file_slice(path, start_line, end_line, stream)
 
     def _code_metrics(self, filename: str) -> str:
         path = self._resolve_file_path(filename)
@@ -100,11 +182,12 @@ class AgentA:
         return self.agent_b.dependency_graph(path)
 
 
+    @tracing.traced("resolve_file_path")
     def _resolve_file_path(self, filename: str) -> str:
         if not filename:
             raise ValueError("Filename not provided")
 
-        matches = repo_tools.find_file_path(filename)
+        matches = repo_tools.find_file_path(self.ctx, filename)
 
         if not matches:
             raise FileNotFoundError(f"File '{filename}' not found in repository")
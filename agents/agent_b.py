@@ -1,5 +1,8 @@
-from tools import file_tools, code_tools, dependency_tools
+from tools import file_tools, code_tools, dependency_tools, repo_tools
+from tools import repo_metrics_tools, import_graph_tools, search_tools, grep_tools
+from tools import symbol_tools
 from config.prompts import AGENT_B_SYSTEM_PROMPT
+from config.settings import SHOW_FILE_MAX_LINES
 #the coder
 
 class AgentB:
@@ -7,17 +10,32 @@ class AgentB:
     Code / Technical Agent
     """
 
-    def __init__(self, llm):
+    def __init__(self, llm, ctx):
         self.llm = llm
+        self.ctx = ctx
 
 
-    def show_file(self, path: str) -> str:
-        content = file_tools.get_file_content(path)
-        return content
+    def show_file(self, path: str, start_line: int = None, end_line: int = None) -> str:
+        if start_line is not None:
+            text, _ = file_tools.get_file_lines(
+                self.ctx, path, start_line, end_line or start_line
+            )
+            return text
 
+        try:
+            return file_tools.get_file_content(self.ctx, path)
+        except file_tools.FileTooLargeError:
+            text, total = file_tools.get_file_lines(
+                self.ctx, path, 1, SHOW_FILE_MAX_LINES
+            )
+            return (
+                f"{text}\n\n---\nShowing lines 1-{min(total, SHOW_FILE_MAX_LINES)} "
+                f"of {total:,}. Ask for a line range to see more."
+            )
 
-    def explain_file(self, path: str) -> str:
-        content = file_tools.get_file_content(path)
+
+    def explain_file(self, path: str, stream: bool = False):
+        content = file_tools.get_file_content(self.ctx, path)
         language = code_tools.detect_language(path)
 
         explanation = code_tools.explain_code(
@@ -25,6 +43,8 @@ class AgentB:
             language=language,
             llm=self.llm,
             system_prompt=AGENT_B_SYSTEM_PROMPT,
+            blob_sha=repo_tools.get_blob_sha(self.ctx, path),
+            stream=stream,
         )
         return explanation
 
@@ -33,31 +53,147 @@ class AgentB:
         path: str,
         start_line: int,
         end_line: int,
-    ) -> str:
-        content = file_tools.get_file_content(path)
+        stream: bool = False,
+    ):
+        slice_content, _ = file_tools.get_file_lines(
+            self.ctx, path, start_line, end_line
+        )
         language = code_tools.detect_language(path)
 
         explanation = code_tools.explain_code_slice(
-            content=content,
+            slice_content=slice_content,
             language=language,
             start_line=start_line,
             end_line=end_line,
             llm=self.llm,
             system_prompt=AGENT_B_SYSTEM_PROMPT,
+            blob_sha=repo_tools.get_blob_sha(self.ctx, path),
+            stream=stream,
         )
         return explanation
 
 
     def code_metrics(self, path: str) -> str:
-        content = file_tools.get_file_content(path)
+        content = file_tools.get_file_content(self.ctx, path)
         language = code_tools.detect_language(path)
-        metrics = code_tools.code_metrics(content, language)
+        metrics = code_tools.code_metrics(
+            content,
+            language,
+            blob_sha=repo_tools.get_blob_sha(self.ctx, path),
+        )
         return code_tools.format_metrics(metrics)
 
+    def repo_metrics(self, progress=None) -> str:
+        report = repo_metrics_tools.repo_metrics(
+            self.ctx,
+            progress=progress,
+        )
+        return repo_metrics_tools.format_repo_metrics(report)
+
     def dependency_graph(self, path: str) -> str:
-        content = file_tools.get_file_content(path)
         language = code_tools.detect_language(path)
 
+        # the repository-wide graph only when it is already built; one
+        # file's own imports never justify crawling every module
+        graph = (
+            import_graph_tools.cached_import_graph(self.ctx)
+            if language == "python" else None
+        )
+        if graph is not None:
+            module = graph.module_for_path(path)
+            if module is not None:
+                return import_graph_tools.format_module_dependencies(graph, module)
+
+        content = file_tools.get_file_content(self.ctx, path)
+
         imports = dependency_tools.extract_imports(content, language)
         graph = dependency_tools.build_dependency_graph(imports)
         return dependency_tools.format_dependency_graph(graph)
+
+    def imported_by(self, path: str) -> str:
+        graph = import_graph_tools.get_import_graph(self.ctx)
+        module = graph.module_for_path(path)
+        if module is None:
+            raise ValueError(f"'{path}' is not a Python module in this repository")
+        return import_graph_tools.format_dependents(graph, module)
+
+    def import_cycles(self) -> str:
+        graph = import_graph_tools.get_import_graph(self.ctx)
+        return import_graph_tools.format_cycles(graph)
+
+    def search_code(self, query: str, progress=None) -> str:
+        report = search_tools.semantic_search(
+            self.ctx,
+            query,
+            progress=progress,
+        )
+        return search_tools.format_search_results(report)
+
+    def grep_code(self, pattern: str, path: str = None, progress=None) -> str:
+        report = grep_tools.grep_code(
+            self.ctx,
+            pattern,
+            path,
+            progress=progress,
+        )
+        return grep_tools.format_grep_results(report)
+
+
+    def _symbol_index(self, path: str = None, progress=None):
+        if path is not None:
+            return symbol_tools.get_file_symbol_index(self.ctx, path)
+        return symbol_tools.get_symbol_index(self.ctx, progress)
+
+    def _resolve_symbol(self, name: str, path: str = None, progress=None) -> dict:
+        index = self._symbol_index(path, progress)
+        matches = index.lookup(name, path)
+
+        if not matches:
+            raise FileNotFoundError(f"Symbol '{name}' not found in repository")
+
+        if len(matches) > 1:
+            options = "\n".join(
+                f"{d['name']} ({d['kind']}) {symbol_tools.format_location(d)}"
+                for d in matches
+            )
+            raise ValueError(f"Multiple definitions of '{name}' found:\n{options}")
+
+        return matches[0]
+
+    def find_symbol(self, name: str, path: str = None, progress=None) -> str:
+        index = self._symbol_index(path, progress)
+        return symbol_tools.format_definitions(name, index.lookup(name, path))
+
+    def show_symbol(self, name: str, path: str = None, progress=None) -> str:
+        definition = self._resolve_symbol(name, path, progress)
+        text, _ = file_tools.get_file_lines(
+            self.ctx,
+            definition["path"],
+            definition["start_line"],
+            definition["end_line"],
+        )
+        return f"{symbol_tools.format_location(definition)}\n\n{text}"
+
+    def explain_symbol(self, name: str, path: str = None, progress=None, stream: bool = False):
+        """
+        Only the symbol's own lines are sent to the LLM.
+        """
+        definition = self._resolve_symbol(name, path, progress)
+        slice_content, _ = file_tools.get_file_lines(
+            self.ctx,
+            definition["path"],
+            definition["start_line"],
+            definition["end_line"],
+        )
+
+        explanation = code_tools.explain_code_slice(
+            slice_content=slice_content,
+            language=code_tools.detect_language(definition["path"]),
+            start_line=definition["start_line"],
+            end_line=definition["end_line"],
+            llm=self.llm,
+            system_prompt=AGENT_B_SYSTEM_PROMPT,
+            blob_sha=repo_tools.get_blob_sha(self.ctx, definition["path"]),
+            stream=stream,
+        )
+        return explanation
@@ -1,18 +1,29 @@
+import time
+
 import streamlit as st
-from github import Github
 #app
 from agents.agent_a import AgentA
-from utils.github_client import init_repo
+from utils.github_client import init_repo, list_repos
 from config.settings import (
-    LLM_PROVIDER,
-    LLM_MODEL,
-    LLM_TEMPERATURE,
     GITHUB_TOKEN,
     GROQ_API_KEY,
+    SNAPSHOT_MODE,
+    ENABLE_PREFETCH,
+    ENABLE_TRACING,
+    METRICS_PORT,
 )
 from utils.formatting import format_error
+from utils.llm_client import get_llm
+from tools.repo_tools import get_tree_entries
+from tools.prefetch_tools import PrefetchJob
 from storage.session_cache import clear_cache
 from storage.file_cache import clear_file_cache
+from storage.blob_store import blob_stats
+from storage.disk_cache import disk_stats
+from intents.classifier import classifier_stats
+from storage.response_cache import explanation_cache, intent_cache
+from storage.single_flight import single_flight_stats
+from utils import tracing
 
 st.set_page_config(
     page_title="ARES - Agent for Repository Exploration & Structured-analysis",
@@ -23,38 +34,81 @@ st.title("ARES - Agent for Repository Exploration & Structured-analysis")
 
 USER_AVATAR = "assets/user.png"
 AGENT_AVATAR = "assets/agent.png"
+STREAM_REDRAW_SECONDS = 0.1
 
 
 st.session_state.setdefault("repo_loaded", False)
 st.session_state.setdefault("repo_owner", None)
 st.session_state.setdefault("repo_name", None)
+st.session_state.setdefault("repo_ctx", None)
 st.session_state.setdefault("chat_history", [])
 st.session_state.setdefault("chat_input", "")
+st.session_state.setdefault("prefetch_job", None)
+st.session_state.setdefault("last_trace", None)
 
+# Prometheus text at /metrics; started once per server process
+tracing.start_metrics_server(METRICS_PORT)
 
-def get_llm():
-    if LLM_PROVIDER == "groq":
-        from groq import Groq
-        client = Groq()
 
-        class GroqLLM:
-            def invoke(self, messages):
-                response = client.chat.completions.create(
-                    model=LLM_MODEL,
-                    messages=messages,
-                    temperature=LLM_TEMPERATURE,
-                )
-                return response.choices[0].message
+st.sidebar.header("🔧 System Status")
 
-        return GroqLLM()
+st.sidebar.success(" GROQ_API_KEY detected" if GROQ_API_KEY else "❌ GROQ_API_KEY missing")
+st.sidebar.success(" GITHUB_TOKEN detected" if GITHUB_TOKEN else "❌ GITHUB_TOKEN missing")
 
-    raise RuntimeError("Unsupported LLM provider")
+_blobs = blob_stats()
+st.sidebar.caption(
+    f"Shared file cache: {_blobs['entries']} files, "
+    f"{_blobs['bytes'] / (1024 * 1024):.1f} MB, "
+    f"hit rate {_blobs['hit_rate']:.0%}, "
+    f"{_blobs['evictions']} evictions"
+)
 
+_disk = disk_stats()
+if _disk["enabled"] and not _disk.get("error"):
+    st.sidebar.caption(
+        f"Disk cache: {_disk['entries']} entries, "
+        f"{_disk['bytes'] / (1024 * 1024):.1f} of "
+        f"{_disk['max_bytes'] / (1024 * 1024):.0f} MB"
+    )
+
+_intents = classifier_stats()
+st.sidebar.caption(
+    f"Intent fast path: {_intents['fast_path']} of "
+    f"{_intents['fast_path'] + _intents['cache'] + _intents['llm']} queries "
+    f"({_intents['fast_path_rate']:.0%}), {_intents['cache']} from cache"
+)
 
-st.sidebar.header("🔧 System Status")
+st.sidebar.caption(
+    f"LLM cache hit rate: explanations "
+    f"{explanation_cache.stats()['hit_rate']:.0%}, "
+    f"intents {intent_cache.stats()['hit_rate']:.0%}"
+)
 
-st.sidebar.success(" GROQ_API_KEY detected" if GROQ_API_KEY else "❌ GROQ_API_KEY missing")
-st.sidebar.success(" GITHUB_TOKEN detected" if GITHUB_TOKEN else "❌ GITHUB_TOKEN missing")
+_flights = single_flight_stats()
+st.sidebar.caption(
+    f"Duplicate calls coalesced: files {_flights['files']['shared']}, "
+    f"GitHub {_flights['repo']['shared']}, "
+    f"LLM {_flights['llm']['shared']}"
+)
+
+if ENABLE_TRACING and st.sidebar.checkbox("Show timing breakdown"):
+    _trace = st.session_state.last_trace
+    if _trace is None:
+        st.sidebar.caption("Ask a question to see where its time goes.")
+    else:
+        st.sidebar.caption(f"Last answer: {_trace.duration_ms:,.0f} ms (nested steps overlap)")
+        st.sidebar.table([
+            {"step": name, "calls": calls, "ms": round(ms, 1)}
+            for name, calls, ms in _trace.breakdown()
+        ])
+        _counters = _trace.counters
+        _remaining = tracing.gauge_value("github.rate_limit_remaining")
+        st.sidebar.caption(
+            f"LLM tokens: {_counters.get('llm.prompt_tokens', 0):,} in, "
+            f"{_counters.get('llm.completion_tokens', 0):,} out. "
+            f"GitHub requests: {_counters.get('github.requests', 0)}"
+            + (f", rate limit remaining {_remaining:,}" if _remaining is not None else "")
+        )
 
 st.sidebar.divider()
 st.sidebar.header("📂 Repository Selection")
@@ -64,40 +118,74 @@ repo_list = []
 
 if owner:
     try:
-        gh = Github(GITHUB_TOKEN)
-        repo_list = [r.name for r in gh.get_user(owner).get_repos()]
+        repo_list = list_repos(owner)
     except Exception as e:
         st.sidebar.error(str(e))
 
 repo = st.sidebar.selectbox("Select Repository", [""] + repo_list)
 
+snapshot_mode = st.sidebar.checkbox(
+    "Snapshot mode (download the whole repo once)",
+    value=SNAPSHOT_MODE,
+)
+
+def stop_prefetch():
+    job = st.session_state.get("prefetch_job")
+    if job is not None:
+        job.cancel()
+    st.session_state.prefetch_job = None
+
+
 if st.sidebar.button("Load Repository"):
     if owner and repo:
-        init_repo(owner, repo)
+        stop_prefetch()
+        ctx = init_repo(owner, repo, snapshot=snapshot_mode)
+        if snapshot_mode:
+            with st.sidebar:
+                with st.spinner("Downloading repository snapshot..."):
+                    get_tree_entries(ctx)
+        st.session_state.repo_ctx = ctx
         st.session_state.repo_loaded = True
         st.session_state.repo_owner = owner
         st.session_state.repo_name = repo
+        if ENABLE_PREFETCH:
+            st.session_state.prefetch_job = PrefetchJob(ctx).start()
         st.sidebar.success(f"Loaded {owner}/{repo}")
 
+_prefetch = st.session_state.prefetch_job
+if _prefetch is not None:
+    _status = _prefetch.status()
+    if not _status["finished"]:
+        if _status["total"]:
+            st.sidebar.progress(
+                _status["done"] / _status["total"],
+                text=f"Warming up: {_status['done']} of {_status['total']} files",
+            )
+        else:
+            st.sidebar.caption(f"Warming up: {_status['stage']}...")
+    elif _status["error"]:
+        st.sidebar.caption(f"Warm-up stopped: {_status['error']}")
+    elif not _status["cancelled"]:
+        st.sidebar.caption(
+            f"Warmed up {_status['files']} files in {_status['seconds']:.1f} s"
+        )
+
 st.sidebar.divider()
 
 if st.sidebar.button(" Clear Session "):
+    stop_prefetch()
     st.session_state.clear()
     clear_cache()
     clear_file_cache()
     st.rerun()
 
 
-if st.session_state.repo_loaded:
-    init_repo(st.session_state.repo_owner, st.session_state.repo_name)
-
-
 if not st.session_state.repo_loaded:
     st.info("Load a repository from the sidebar to begin.")
     st.stop()
 
 llm = get_llm()
-agent_a = AgentA(llm)
+agent_a = AgentA(llm, st.session_state.repo_ctx)
 
 st.subheader("💬 Chat with the Repository")
 
@@ -119,11 +207,46 @@ with st.form("chat_form", clear_on_submit=True):
 if submitted and user_input.strip():
     st.session_state.chat_history.append(("user", user_input))
 
-    try:
-        with st.spinner("Processing..."):
-            response = agent_a.handle_query(user_input)
-        st.session_state.chat_history.append(("agent", response))
-    except Exception as e:
-        st.session_state.chat_history.append(("agent", format_error(str(e))))
+    progress_area = st.empty()
+
+    def show_progress(done, total):
+        progress_area.progress(
+            done / total if total else 1.0,
+            text=f"Analysed {done} of {total} files",
+        )
+
+    agent_a.progress = show_progress
+
+    # the trace also covers streaming, where explanations spend their time
+    with tracing.trace("query") as query_trace:
+        try:
+            with st.spinner("Processing..."):
+                response = agent_a.handle_query(user_input, stream=True)
+            progress_area.empty()
+
+            if not isinstance(response, str):
+                # explanations arrive as chunks; render them as they come
+                cols = st.columns([1, 12])
+                cols[0].image(AGENT_AVATAR, width=32)
+                placeholder = cols[1].empty()
+
+                # each redraw sends the whole text, so redraw at most
+                # every STREAM_REDRAW_SECONDS rather than on every chunk
+                text = ""
+                last_redraw = 0.0
+                for chunk in response:
+                    text += chunk
+                    now = time.monotonic()
+                    if now - last_redraw >= STREAM_REDRAW_SECONDS:
+                        placeholder.code(text)
+                        last_redraw = now
+                placeholder.code(text)
+                response = text
+
+            st.session_state.chat_history.append(("agent", response))
+        except Exception as e:
+            st.session_state.chat_history.append(("agent", format_error(str(e))))
+
+    st.session_state.last_trace = query_trace
 
     st.rerun()
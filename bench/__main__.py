@@ -0,0 +1,108 @@
+import argparse
+import json
+import os
+import sys
+
+#bench cli
+# python -m bench [--repo-dir PATH | --synthetic N] [--save NAME] [--compare NAME]
+#
+# Everything runs offline: no GitHub token, Groq key or network is used.
+# On-disk caches go to bench.scratch, so cold runs can wipe them without
+# touching the app's own .ares_cache.
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m bench",
+        description="Benchmark ARES per intent against a local GitHub and LLM stand-in.",
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--repo-dir", help="serve this local directory as the repository")
+    source.add_argument(
+        "--synthetic", type=int, default=10_000, metavar="N",
+        help="generate a Python project of N files (default: %(default)s)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=3, help="timed runs per scenario and mode")
+    parser.add_argument("--modes", default="cold,warm", help="comma-separated: cold, warm")
+    parser.add_argument("--only", help="comma-separated scenario names, e.g. EXPLAIN_CODE,GREP_CODE")
+    parser.add_argument("--snapshot", action="store_true", help="serve the repository in snapshot mode")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+
+    parser.add_argument("--github-ms", type=float, default=80, help="GitHub round trip (ms)")
+    parser.add_argument("--github-per-kb-ms", type=float, default=0.05, help="GitHub transfer time per KB (ms)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="relative latency jitter")
+    parser.add_argument(
+        "--rate-limit", type=int,
+        help="GitHub requests allowed per query before quota pauses (default: unlimited)",
+    )
+    parser.add_argument("--llm-first-token-ms", type=float, default=300)
+    parser.add_argument("--llm-per-token-ms", type=float, default=5)
+
+    parser.add_argument("--json", help="also write the full report to this file")
+    parser.add_argument("--save", metavar="NAME", help="store the report as baseline NAME")
+    parser.add_argument(
+        "--compare", metavar="NAME",
+        help="compare with baseline NAME; exit 1 on regressions",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+
+    # settings are read at import time, so the environment comes first
+    os.environ.setdefault("GITHUB_TOKEN", "bench")
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ.setdefault("ARES_PREFETCH", "0")
+
+    from bench import runner
+    from bench.fake_github import LatencyModel, files_from_directory, synthetic_files
+    from bench.fake_llm import FakeLLM
+
+    if args.repo_dir:
+        files = files_from_directory(args.repo_dir)
+    else:
+        files = synthetic_files(args.synthetic, args.seed)
+
+    def progress(mode, name, result):
+        print(
+            f"  {mode:<5} {name:<20} p50 {result['p50_ms']:>9.1f} ms, "
+            f"{result['api_calls']:.0f} API calls",
+            file=sys.stderr,
+        )
+
+    print(f"Benchmarking {len(files)} files...", file=sys.stderr)
+    report = runner.run_benchmark(
+        files,
+        modes=[mode.strip() for mode in args.modes.split(",") if mode.strip()],
+        iterations=args.iterations,
+        only=[name.strip() for name in args.only.split(",")] if args.only else None,
+        latency=LatencyModel(args.github_ms, args.github_per_kb_ms, args.jitter, args.seed),
+        llm=FakeLLM(args.llm_first_token_ms, args.llm_per_token_ms),
+        snapshot=args.snapshot,
+        rate_limit=args.rate_limit,
+        memory=not args.no_memory,
+        progress=progress,
+    )
+
+    print(runner.format_report(report))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.save:
+        print(f"\nSaved baseline to {runner.save_baseline(report, args.save)}")
+
+    if args.compare:
+        rows = runner.compare_reports(report, runner.load_baseline(args.compare))
+        print(f"\nAgainst baseline {args.compare}:")
+        print(runner.format_comparison(rows))
+        if any(row[-1] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,374 @@
+import hashlib
+import io
+import os
+import random
+import tarfile
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from github import GithubException
+
+#fake github
+# A local stand-in for the GitHub API, serving one repository from a dict of
+# path -> bytes. It answers both halves of the traffic ARES produces: the
+# PyGithub Repository methods the tools call (trees, contents, README,
+# compare, archive link) and the raw HTTP requests sent through the fetch
+# scheduler's session (branch head, raw blobs, tarball). Every call is
+# counted per endpoint and delayed by a LatencyModel.
+
+_API = "https://api.github.com"
+
+# GitHub truncates recursive tree listings beyond roughly this many entries
+TREE_TRUNCATE_ENTRIES = 100_000
+
+_SKIP_DIRS = {".git", "__pycache__", ".ares_cache", "node_modules", ".venv", "venv"}
+
+
+class LatencyModel:
+    """
+    Simulated round trip: base_ms plus per_kb_ms per KB of response, with
+    uniform relative jitter. Seeded, so runs are repeatable.
+    """
+
+    def __init__(self, base_ms: float = 80, per_kb_ms: float = 0.05, jitter: float = 0.2, seed: int = 0):
+        self.base_ms = base_ms
+        self.per_kb_ms = per_kb_ms
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, size: int = 0) -> float:
+        ms = self.base_ms + self.per_kb_ms * size / 1024
+        with self._lock:
+            ms *= 1 + self._random.uniform(-self.jitter, self.jitter)
+        return max(ms, 0) / 1000
+
+    def sleep(self, size: int = 0):
+        seconds = self.delay(size)
+        if seconds:
+            time.sleep(seconds)
+
+
+def git_blob_sha(data: bytes) -> str:
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _tree_sha(path: str) -> str:
+    return hashlib.sha1(f"tree {path}".encode()).hexdigest()
+
+
+def files_from_directory(root: str) -> dict:
+    """
+    path -> bytes for every regular file below root, skipping VCS, cache
+    and virtualenv directories.
+    """
+    files = {}
+    for directory, dirs, names in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in _SKIP_DIRS)
+        for name in sorted(names):
+            full = os.path.join(directory, name)
+            if os.path.islink(full):
+                continue
+            path = os.path.relpath(full, root).replace(os.sep, "/")
+            with open(full, "rb") as f:
+                files[path] = f.read()
+    return files
+
+
+def _synthetic_module(rng, package: str, number: int, index: int, modules: list) -> bytes:
+    lines = ['"""', f"Synthetic module {index} of {package}.", '"""', "import os", ""]
+    for target in rng.sample(modules, min(len(modules), rng.randint(0, 3))):
+        lines.insert(4, f"from {target} import *")
+
+    for c in range(rng.randint(0, 2)):
+        lines += ["", f"class Model{number}x{index}x{c}:", "    def __init__(self, value):", "        self.value = value", ""]
+        for m in range(rng.randint(1, 4)):
+            lines += [
+                f"    def method_{m}(self, items):",
+                "        total = 0",
+                "        for item in items:",
+                f"            if item % {m + 2} == 0:",
+                "                total += item",
+                "            else:",
+                "                total -= self.value",
+                "        return total",
+                "",
+            ]
+
+    for f in range(rng.randint(2, 8)):
+        body = rng.randint(3, 25)
+        lines += ["", f"def handle_{number}_{index}_{f}(request, retries=3):"]
+        for b in range(body):
+            lines.append(f"    value_{b} = request.get('{package}_{b}', {b})")
+            if b % 5 == 4:
+                lines += [f"    if value_{b} > retries:", f"        return value_{b}"]
+        lines += ["    return None", ""]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def synthetic_files(n_files: int = 10_000, seed: int = 0) -> dict:
+    """
+    A Python project of about n_files files spread over nested packages,
+    with cross-package imports, classes and functions, plus a README and
+    requirements.txt.
+    """
+    rng = random.Random(seed)
+    files = {
+        "README.md": (
+            b"# synthetic\n\nA generated project used to benchmark ARES.\n\n"
+            b"It has many small packages that import each other.\n"
+        ),
+        "requirements.txt": b"requests==2.32.3\nnumpy==1.26.4\n",
+        "setup.py": b"from setuptools import setup\n\nsetup(name='synthetic')\n",
+    }
+
+    packages = []
+    while len(files) < n_files:
+        depth = rng.randint(1, 3)
+        parts = [f"pkg{rng.randint(0, 20)}" for _ in range(depth)]
+        package = "/".join(["src"] + parts)
+        if package in packages:
+            parts.append(f"sub{len(packages)}")
+            package = "/".join(["src"] + parts)
+        packages.append(package)
+
+        dotted = package.replace("/", ".")
+        modules = []
+        files[f"{package}/__init__.py"] = b""
+        for index in range(rng.randint(3, 30)):
+            if len(files) >= n_files:
+                break
+            earlier = [p.replace("/", ".") + f".mod{i}" for p in packages[-5:-1] for i in range(3)]
+            files[f"{package}/mod{index}.py"] = _synthetic_module(
+                rng, dotted, len(packages), index, modules + earlier
+            )
+            modules.append(f"{dotted}.mod{index}")
+    return files
+
+
+class _Response:
+    def __init__(self, status_code: int, content: bytes = b"", headers: dict = None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} from fake GitHub", response=self)
+
+    def iter_content(self, chunk_size: int = 1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeRepository:
+    """
+    The subset of github.Repository.Repository that ARES uses, over a
+    fixed commit of files.
+    """
+
+    def __init__(
+        self,
+        files: dict,
+        owner: str = "bench",
+        name: str = "repo",
+        latency: LatencyModel = None,
+        truncate_over: int = TREE_TRUNCATE_ENTRIES,
+    ):
+        self.files = files
+        self.name = name
+        self.full_name = f"{owner}/{name}"
+        self.url = f"{_API}/repos/{owner}/{name}"
+        self.default_branch = "main"
+        self.description = f"Benchmark repository with {len(files)} files"
+        self.language = "Python"
+        self.stargazers_count = 0
+        self.forks_count = 0
+        self.owner = SimpleNamespace(
+            login=owner, html_url=f"https://github.com/{owner}", type="User"
+        )
+
+        self.latency = latency or LatencyModel(base_ms=0, per_kb_ms=0, jitter=0)
+        self.truncate_over = truncate_over
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+        self.blobs = {git_blob_sha(data): data for data in files.values()}
+        self.dirs = {}
+        for path in files:
+            parts = path.split("/")
+            for i in range(1, len(parts)):
+                directory = "/".join(parts[:i])
+                self.dirs[directory] = _tree_sha(directory)
+        self.head_sha = hashlib.sha1(
+            b"".join(sorted(git_blob_sha(d).encode() + p.encode() for p, d in files.items()))
+        ).hexdigest()
+        self._tree_shas = {sha: path for path, sha in self.dirs.items()}
+        self._tree_shas[self.head_sha] = ""
+        self._tarball = None
+
+    def _call(self, endpoint: str, size: int = 0):
+        with self._lock:
+            self.calls[endpoint] += 1
+        self.latency.sleep(size)
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    # ---- PyGithub surface ----
+
+    def _element(self, path: str, relative: str):
+        if path in self.files:
+            data = self.files[path]
+            return SimpleNamespace(
+                path=relative, type="blob", sha=git_blob_sha(data), size=len(data), mode="100644"
+            )
+        return SimpleNamespace(
+            path=relative, type="tree", sha=self.dirs[path], size=None, mode="040000"
+        )
+
+    def get_git_tree(self, sha: str, recursive: bool = False):
+        if sha not in self._tree_shas:
+            self._call("git_tree")
+            raise GithubException(404, {"message": "Not Found"}, None)
+
+        base = self._tree_shas[sha]
+        prefix = base + "/" if base else ""
+        # git order: a directory sorts as if its name ended in "/"
+        paths = sorted(
+            (
+                path for path in list(self.dirs) + list(self.files)
+                if path.startswith(prefix)
+                and (recursive or "/" not in path[len(prefix):])
+            ),
+            key=lambda path: path + "/" if path in self.dirs else path,
+        )
+        truncated = recursive and len(paths) > self.truncate_over
+        if truncated:
+            paths = paths[:self.truncate_over]
+
+        self._call("git_tree.recursive" if recursive else "git_tree", 100 * len(paths))
+        return SimpleNamespace(
+            sha=sha,
+            tree=[self._element(path, path[len(prefix):]) for path in paths],
+            raw_data={"sha": sha, "truncated": truncated},
+        )
+
+    def _content_file(self, path: str):
+        data = self.files[path]
+        return SimpleNamespace(
+            path=path,
+            name=path.rpartition("/")[2],
+            type="file",
+            sha=git_blob_sha(data),
+            size=len(data),
+            decoded_content=data,
+        )
+
+    def get_contents(self, path: str, ref: str = None):
+        self._call("contents", len(self.files.get(path, b"")))
+        if path not in self.files:
+            raise GithubException(404, {"message": "Not Found"}, None)
+        return self._content_file(path)
+
+    def get_readme(self, ref: str = None):
+        self._call("readme")
+        for path in self.files:
+            if "/" not in path and path.lower().startswith("readme"):
+                return self._content_file(path)
+        raise GithubException(404, {"message": "Not Found"}, None)
+
+    def compare(self, base: str, head: str):
+        # the benchmark commit never moves
+        self._call("compare")
+        return SimpleNamespace(status="identical", files=[])
+
+    def get_archive_link(self, archive_format: str, ref: str = None):
+        self._call("archive_link")
+        return f"{self.url}/tarball/{ref or self.head_sha}"
+
+    # ---- raw HTTP surface ----
+
+    def _tarball_bytes(self) -> bytes:
+        if self._tarball is None:
+            buffer = io.BytesIO()
+            top = f"{self.full_name.replace('/', '-')}-{self.head_sha[:7]}"
+            with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+                for path, data in self.files.items():
+                    info = tarfile.TarInfo(f"{top}/{path}")
+                    info.size = len(data)
+                    archive.addfile(info, io.BytesIO(data))
+            self._tarball = buffer.getvalue()
+        return self._tarball
+
+    def handle(self, rest: str, headers: dict) -> _Response:
+        if rest.startswith("/commits/"):
+            etag = f'"{self.head_sha}"'
+            if headers.get("If-None-Match") == etag:
+                self._call("commits.not_modified")
+                return _Response(304, headers={"ETag": etag})
+            self._call("commits")
+            return _Response(200, self.head_sha.encode(), {"ETag": etag})
+
+        if rest.startswith("/git/blobs/"):
+            data = self.blobs.get(rest[len("/git/blobs/"):])
+            self._call("git_blob", len(data or b""))
+            if data is None:
+                return _Response(404)
+            return _Response(200, data)
+
+        if rest.startswith("/tarball/"):
+            data = self._tarball_bytes()
+            self._call("tarball", len(data))
+            return _Response(200, data)
+
+        return _Response(404)
+
+
+class FakeGitHubSession:
+    """
+    Stands in for the fetch scheduler's requests.Session, routing GETs to
+    the registered FakeRepositorys. With rate_limit set, responses carry
+    rate-limit headers counting down from it like GitHub's (304s are
+    free), so the scheduler's quota pauses show up in the timings.
+    """
+
+    def __init__(self, rate_limit: int = None):
+        self.repos = {}
+        self.rate_limit = rate_limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def register(self, repo: FakeRepository):
+        self.repos[repo.url] = repo
+
+    def reset_quota(self):
+        with self._lock:
+            self.used = 0
+
+    def get(self, url: str, headers: dict = None, stream: bool = False, timeout: float = None):
+        response = _Response(404)
+        for base, repo in self.repos.items():
+            if url.startswith(base + "/"):
+                response = repo.handle(url[len(base):], headers or {})
+                break
+
+        if self.rate_limit is None:
+            return response
+
+        with self._lock:
+            if response.status_code != 304:
+                self.used += 1
+            remaining = max(self.rate_limit - self.used, 0)
+        response.headers.update({
+            "x-ratelimit-remaining": str(remaining),
+            "x-ratelimit-reset": str(int(time.time()) + 3600),
+        })
+        return response
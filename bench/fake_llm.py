@@ -0,0 +1,95 @@
+import hashlib
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from config.prompts import INTENT_CLASSIFIER_PROMPT
+from intents.rules import classify_by_rules
+from utils.token_utils import count_tokens
+
+#fake llm
+# Deterministic stand-in for the Groq client (same invoke / stream surface
+# as app.get_llm()). Intent classification is answered from the rule-based
+# classifier, so queries the rules are unsure about still reach the LLM
+# path; explanations are pseudo-text derived from a hash of the prompt, so
+# identical prompts give identical answers across runs.
+
+_WORDS = (
+    "the", "function", "reads", "returns", "value", "each", "file", "class",
+    "calls", "module", "request", "loop", "checks", "list", "result", "and",
+    "then", "handles", "error", "input", "state", "cache", "builds", "from",
+)
+
+
+class FakeLLM:
+    """
+    Latency: first_token_ms before the first token, then per_token_ms per
+    completion token. Completions are about one token per
+    tokens_per_answer_token prompt tokens, capped at max_tokens.
+    """
+
+    model = "fake-llm"
+
+    def __init__(
+        self,
+        first_token_ms: float = 300,
+        per_token_ms: float = 5,
+        tokens_per_answer_token: int = 10,
+        max_tokens: int = 400,
+    ):
+        self.first_token_ms = first_token_ms
+        self.per_token_ms = per_token_ms
+        self.tokens_per_answer_token = tokens_per_answer_token
+        self.max_tokens = max_tokens
+
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls = self.prompt_tokens = self.completion_tokens = 0
+
+    def _classify(self, query: str) -> str:
+        intent, entities, _ = classify_by_rules(query)
+        return json.dumps({
+            "intent": intent or "REPO_SUMMARY",
+            "entities": {key: value for key, value in entities.items() if value is not None},
+        })
+
+    def _answer(self, messages) -> list:
+        if messages[0]["content"] == INTENT_CLASSIFIER_PROMPT:
+            return [self._classify(messages[-1]["content"])]
+
+        prompt = "".join(message["content"] for message in messages)
+        length = min(
+            self.max_tokens,
+            20 + count_tokens(prompt) // self.tokens_per_answer_token,
+        )
+        digest = hashlib.sha256(prompt.encode()).digest()
+        return [
+            _WORDS[digest[i % len(digest)] % len(_WORDS)] + ("\n" if i % 16 == 15 else " ")
+            for i in range(length)
+        ]
+
+    def _record(self, messages, tokens: list):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += sum(count_tokens(m["content"]) for m in messages)
+            self.completion_tokens += len(tokens)
+
+    def invoke(self, messages):
+        tokens = self._answer(messages)
+        self._record(messages, tokens)
+        time.sleep((self.first_token_ms + self.per_token_ms * len(tokens)) / 1000)
+        return SimpleNamespace(content="".join(tokens))
+
+    def stream(self, messages):
+        tokens = self._answer(messages)
+        self._record(messages, tokens)
+        time.sleep(self.first_token_ms / 1000)
+        for token in tokens:
+            time.sleep(self.per_token_ms / 1000)
+            yield token
@@ -0,0 +1,406 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import time
+import tracemalloc
+
+# must come before the app modules; it points their on-disk caches at a
+# scratch directory
+from bench import scratch
+from agents.agent_a import AgentA
+from bench.fake_github import FakeGitHubSession, FakeRepository, LatencyModel
+from bench.fake_llm import FakeLLM
+from storage.blob_store import clear_blobs
+from storage.large_file_store import close_large_files
+from storage.response_cache import (
+    explanation_cache,
+    imports_cache,
+    intent_cache,
+    metrics_cache,
+    symbols_cache,
+)
+from storage.session_cache import use_session
+from utils import fetch_scheduler, tracing
+from utils.github_client import RepoContext
+from config.settings import (
+    BENCH_BASELINE_DIR,
+    BENCH_MIN_REGRESSION_MS,
+    BENCH_REGRESSION_THRESHOLD,
+    ENABLE_DISK_CACHE,
+    ENABLE_VECTORSTORE,
+    LARGE_FILE_DIR,
+    SNAPSHOT_DIR,
+    TRIGRAM_INDEX_DIR,
+    VECTOR_INDEX_DIR,
+)
+
+#bench runner
+# Runs the real AgentA / AgentB / tools code against a FakeRepository and
+# FakeLLM in a session of its own. "cold" empties every cache (session,
+# blob store, response caches, ETags, on-disk indexes) before each run;
+# "warm" asks the same question once untimed and then measures the
+# repeats. Memory is the tracemalloc peak of one extra run, kept out of
+# the timed runs because tracing allocations slows everything down.
+
+MODES = ("cold", "warm")
+
+_DEFINITION = re.compile(rb"^\s*def ([A-Za-z_]\w*_\w*)\(", re.MULTILINE)
+
+
+def _pick_targets(files: dict) -> dict:
+    sources = sorted(
+        (path for path, data in files.items() if path.endswith(".py") and data.strip()),
+        key=lambda path: (len(files[path]), path),
+    )
+    if not sources:
+        raise ValueError("The benchmark repository has no Python source files")
+
+    # a name defined once, so symbol lookups are not ambiguous
+    definitions = {}
+    for path in sources:
+        for name in _DEFINITION.findall(files[path]):
+            definitions[name] = definitions.get(name, 0) + 1
+
+    medium = sources[len(sources) // 2]
+    symbol = None
+    for path in [medium] + sources[::-1]:
+        unique = [name for name in _DEFINITION.findall(files[path]) if definitions[name] == 1]
+        if unique:
+            symbol = unique[0].decode()
+            break
+    return {"file": medium, "large": sources[-1], "symbol": symbol}
+
+
+def scenarios(files: dict) -> dict:
+    """
+    Scenario name -> query, one per intent (plus a large-file explanation
+    and a query only the LLM can classify), aimed at files and symbols
+    that exist in files. SEARCH_CODE needs ENABLE_VECTORSTORE.
+    """
+    targets = _pick_targets(files)
+    file, large, symbol = targets["file"], targets["large"], targets["symbol"]
+
+    queries = {
+        "SHOW_REPO_TREE": "show the repo tree",
+        "REPO_SUMMARY": "summarize this repository",
+        "GET_OWNER_INFO": "who owns this repo",
+        "SHOW_FILE_CODE": f"show {file}",
+        "EXPLAIN_CODE": f"explain {file}",
+        "EXPLAIN_CODE:large": f"explain {large}",
+        "EXPLAIN_CODE_SLICE": f"explain lines 1-20 of {file}",
+        "CODE_METRICS": f"code metrics for {file}",
+        "REPO_METRICS": "show the complexity hotspots",
+        "DEPENDENCY_GRAPH": f"show the imports of {file}",
+        "IMPORTED_BY": f"what imports {file}",
+        "IMPORT_CYCLES": "find circular imports",
+        "CLASSIFIED_BY_LLM": "tell me something interesting",
+    }
+    if ENABLE_VECTORSTORE:
+        queries["SEARCH_CODE"] = "where is the retry handling"
+    if symbol:
+        queries.update({
+            "GREP_CODE": f'grep "{symbol}"',
+            "FIND_SYMBOL": f"where is {symbol} defined",
+            "SHOW_SYMBOL": f"show function {symbol}",
+            "EXPLAIN_SYMBOL": f"explain function {symbol}",
+        })
+    return queries
+
+
+def reset_caches():
+    """
+    Empty every process-wide cache a query can be answered from, including
+    the on-disk indexes and large-file copies. Refuses to run when those
+    live outside the benchmark's scratch directory, i.e. when the app's
+    settings were loaded before bench.runner.
+    """
+    directories = (LARGE_FILE_DIR, SNAPSHOT_DIR, TRIGRAM_INDEX_DIR, VECTOR_INDEX_DIR)
+    foreign = [directory for directory in directories if not scratch.owns(directory)]
+    if foreign or ENABLE_DISK_CACHE:
+        raise RuntimeError(
+            "Benchmark caches are not isolated (disk cache on, or outside "
+            f"{scratch.ROOT}: {', '.join(foreign) or 'none'}); "
+            "import bench.runner before any app module"
+        )
+
+    clear_blobs()
+    close_large_files()
+    fetch_scheduler.clear_etags()
+    for cache in (explanation_cache, intent_cache, metrics_cache, symbols_cache, imports_cache):
+        cache.clear()
+    for directory in directories:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class Bench:
+    """
+    One fake repository, session and LLM shared by every scenario.
+    """
+
+    def __init__(
+        self,
+        files: dict,
+        latency: LatencyModel,
+        llm: FakeLLM,
+        snapshot: bool = False,
+        rate_limit: int = None,
+    ):
+        self.session = FakeGitHubSession(rate_limit)
+        self.repo = FakeRepository(files, latency=latency)
+        self.session.register(self.repo)
+        fetch_scheduler.use_transport(self.session)
+
+        self.llm = llm
+        self.ctx = RepoContext(
+            self.repo.owner.login, self.repo.name, self.repo, token="bench", snapshot=snapshot
+        )
+        self.agent = AgentA(llm, self.ctx)
+        self.state = {}
+
+    def reset(self):
+        self.state.clear()
+        reset_caches()
+
+    def ask(self, query: str) -> dict:
+        """
+        One query, answered in full (streams are drained), with its latency,
+        time to first output and GitHub / LLM usage.
+        """
+        self.repo.reset_calls()
+        self.llm.reset_calls()
+        self.session.reset_quota()
+
+        error = None
+        first = None
+        start = time.perf_counter()
+        with use_session(self.state), tracing.trace("bench", query=query) as trace:
+            try:
+                response = self.agent.handle_query(query, stream=True)
+                if isinstance(response, str):
+                    first = time.perf_counter()
+                else:
+                    for _ in response:
+                        if first is None:
+                            first = time.perf_counter()
+            except Exception as e:
+                # first line only; some errors list every candidate
+                error = type(e).__name__ + ": " + str(e).partition("\n")[0]
+        end = time.perf_counter()
+
+        handled = trace.find("handle_query") if trace is not None else None
+
+        return {
+            "ms": (end - start) * 1000,
+            "first_ms": ((first or end) - start) * 1000,
+            "intent": handled.attrs.get("intent") if handled is not None else None,
+            "error": error,
+            "api_calls": dict(self.repo.calls),
+            "llm_calls": self.llm.calls,
+            "llm_tokens": self.llm.prompt_tokens + self.llm.completion_tokens,
+        }
+
+    def measure(self, query: str, mode: str, iterations: int, memory: bool = True) -> dict:
+        runs = []
+        if mode == "warm":
+            self.reset()
+            self.ask(query)
+        for _ in range(iterations):
+            if mode == "cold":
+                self.reset()
+            runs.append(self.ask(query))
+
+        peak_kb = None
+        if memory:
+            if mode == "cold":
+                self.reset()
+            tracemalloc.start()
+            try:
+                self.ask(query)
+                peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+            finally:
+                tracemalloc.stop()
+
+        latencies = [run["ms"] for run in runs]
+        endpoints = {}
+        for run in runs:
+            for endpoint, calls in run["api_calls"].items():
+                endpoints[endpoint] = endpoints.get(endpoint, 0) + calls / len(runs)
+
+        return {
+            "query": query,
+            "intent": runs[-1]["intent"],
+            "runs": len(runs),
+            "errors": sorted({run["error"] for run in runs if run["error"]}),
+            "p50_ms": _percentile(latencies, 0.5),
+            "p90_ms": _percentile(latencies, 0.9),
+            "p99_ms": _percentile(latencies, 0.99),
+            "mean_ms": sum(latencies) / len(latencies),
+            "first_p50_ms": _percentile([run["first_ms"] for run in runs], 0.5),
+            "api_calls": sum(endpoints.values()),
+            "api_by_endpoint": dict(sorted(endpoints.items())),
+            "llm_calls": sum(run["llm_calls"] for run in runs) / len(runs),
+            "llm_tokens": sum(run["llm_tokens"] for run in runs) / len(runs),
+            "peak_kb": peak_kb,
+        }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(
+    files: dict,
+    modes=MODES,
+    iterations: int = 3,
+    only=None,
+    latency: LatencyModel = None,
+    llm: FakeLLM = None,
+    snapshot: bool = False,
+    rate_limit: int = None,
+    memory: bool = True,
+    progress=None,
+) -> dict:
+    """
+    Benchmark every scenario (or the names in only) in each mode.
+    progress(mode, name, result) is called after each scenario. rate_limit
+    is the GitHub quota per query (None: unlimited).
+    """
+    latency = latency or LatencyModel()
+    llm = llm or FakeLLM()
+    bench = Bench(files, latency, llm, snapshot, rate_limit)
+
+    queries = scenarios(files)
+    if set(modes) - set(MODES):
+        raise ValueError(f"Modes must be among: {', '.join(MODES)}")
+    unknown = set(only or ()) - set(queries)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for mode in modes:
+        results[mode] = {}
+        for name, query in queries.items():
+            if only and name not in only:
+                continue
+            result = bench.measure(query, mode, iterations, memory)
+            results[mode][name] = result
+            if progress is not None:
+                progress(mode, name, result)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "files": len(files),
+            "bytes": sum(len(data) for data in files.values()),
+            "iterations": iterations,
+            "snapshot": snapshot,
+            "rate_limit": rate_limit,
+            "github_latency": {
+                "base_ms": latency.base_ms,
+                "per_kb_ms": latency.per_kb_ms,
+                "jitter": latency.jitter,
+            },
+            "llm_latency": {
+                "first_token_ms": llm.first_token_ms,
+                "per_token_ms": llm.per_token_ms,
+            },
+        },
+        "results": results,
+    }
+
+
+def _baseline_path(name: str) -> str:
+    return os.path.join(BENCH_BASELINE_DIR, f"{name}.json")
+
+
+def save_baseline(report: dict, name: str) -> str:
+    path = _baseline_path(name)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    return path
+
+
+def load_baseline(name: str) -> dict:
+    with open(_baseline_path(name)) as f:
+        return json.load(f)
+
+
+def compare_reports(report: dict, baseline: dict) -> list:
+    """
+    One row per scenario measured in both reports: (mode, name, baseline
+    p50, p50, baseline API calls, API calls, regressed).
+    """
+    rows = []
+    for mode, scenarios_now in report["results"].items():
+        before_mode = baseline["results"].get(mode, {})
+        for name, now in scenarios_now.items():
+            before = before_mode.get(name)
+            if before is None:
+                continue
+            slower = (
+                now["p50_ms"] > before["p50_ms"] * (1 + BENCH_REGRESSION_THRESHOLD)
+                and now["p50_ms"] - before["p50_ms"] >= BENCH_MIN_REGRESSION_MS
+            )
+            more_calls = (
+                now["api_calls"] > before["api_calls"]
+                or now["llm_calls"] > before["llm_calls"]
+            )
+            rows.append((
+                mode, name,
+                before["p50_ms"], now["p50_ms"],
+                before["api_calls"], now["api_calls"],
+                slower or more_calls,
+            ))
+    return rows
+
+
+def format_report(report: dict) -> str:
+    header = (
+        f"{'mode':<5} {'scenario':<20} {'intent':<20} {'p50 ms':>9} {'p90 ms':>9} "
+        f"{'p99 ms':>9} {'first ms':>9} {'API':>7} {'LLM':>5} {'tokens':>8} {'peak KB':>9}"
+    )
+    lines = [header, "-" * len(header)]
+    for mode, results in report["results"].items():
+        for name, r in results.items():
+            peak = f"{r['peak_kb']:,.0f}" if r["peak_kb"] is not None else "-"
+            lines.append(
+                f"{mode:<5} {name:<20} {(r['intent'] or '-'):<20} {r['p50_ms']:>9.1f} "
+                f"{r['p90_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['first_p50_ms']:>9.1f} "
+                f"{r['api_calls']:>7.1f} {r['llm_calls']:>5.1f} {r['llm_tokens']:>8.0f} {peak:>9}"
+            )
+            for error in r["errors"]:
+                lines.append(f"      ! {error}")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: list) -> str:
+    header = (
+        f"{'mode':<5} {'scenario':<20} {'p50 before':>11} {'p50 now':>9} "
+        f"{'change':>8} {'API before':>11} {'API now':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for mode, name, before_ms, now_ms, before_calls, now_calls, regressed in rows:
+        change = (now_ms - before_ms) / before_ms if before_ms else 0.0
+        lines.append(
+            f"{mode:<5} {name:<20} {before_ms:>11.1f} {now_ms:>9.1f} {change:>+8.0%} "
+            f"{before_calls:>11.1f} {now_calls:>8.1f}" + ("  REGRESSION" if regressed else "")
+        )
+    return "\n".join(lines)
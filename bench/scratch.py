@@ -0,0 +1,33 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+#bench scratch
+# The benchmark's own directory for on-disk caches. bench.runner imports
+# this before any app module, because settings are read at import time:
+# the index, snapshot and large-file directories are pointed here and the
+# SQLite tier is switched off, so cold runs can wipe them without touching
+# the app's .ares_cache. Removed when the process exits.
+
+ROOT = tempfile.mkdtemp(prefix="ares-bench-")
+
+os.environ["ARES_DISK_CACHE"] = "0"
+for _variable, _name in (
+    ("ARES_DISK_CACHE_PATH", "cache.sqlite3"),
+    ("ARES_LARGE_FILE_DIR", "blobs"),
+    ("ARES_SNAPSHOT_DIR", "snapshots"),
+    ("ARES_TRIGRAM_INDEX_DIR", "trigrams"),
+    ("ARES_VECTOR_INDEX_DIR", "vectors"),
+):
+    os.environ[_variable] = os.path.join(ROOT, _name)
+
+atexit.register(shutil.rmtree, ROOT, ignore_errors=True)
+
+
+def owns(path: str) -> bool:
+    """
+    True if path lies inside the scratch directory.
+    """
+    root = os.path.realpath(ROOT)
+    return os.path.realpath(path).startswith(root + os.sep)
@@ -69,7 +69,14 @@ Possible intents:
 - EXPLAIN_CODE
 - EXPLAIN_CODE_SLICE
 - CODE_METRICS
+- REPO_METRICS
 - DEPENDENCY_GRAPH
+- IMPORTED_BY
+- IMPORT_CYCLES
+{SEARCH_CODE_INTENT}- GREP_CODE
+- FIND_SYMBOL
+- SHOW_SYMBOL
+- EXPLAIN_SYMBOL
 - REPO_SUMMARY
 - GET_OWNER_INFO
 
@@ -77,6 +84,20 @@ Entity extraction rules:
 - Filenames must be exact strings if mentioned.
 - Line ranges must include start and end if present.
 - If required information is missing, set entity value to null.
+- CODE_METRICS is for ONE named file; use REPO_METRICS for metrics,
+  complexity or hotspots across the whole repository.
+- DEPENDENCY_GRAPH is what a file imports; IMPORTED_BY is which modules
+  import the named file or module; IMPORT_CYCLES needs no filename.
+- A Python module name (e.g. utils.github_client) counts as a filename.
+- SHOW_FILE_CODE keeps start_line/end_line when the user asks to see
+  only some lines of the file.
+{SEARCH_CODE_RULE}- GREP_CODE is for finding where an exact name or text occurs (e.g. where
+  a constant is used). "query" is the exact text, or /regex/ for a regular
+  expression; filename is set only to restrict the search to one file.
+- FIND_SYMBOL / SHOW_SYMBOL / EXPLAIN_SYMBOL are for a function, method
+  or class named without (or in addition to) a filename: where it is
+  defined, show its code, or explain it. Put its name in "symbol"
+  (e.g. "handle_query" or "AgentA.handle_query").
 
 JSON format:
 {
@@ -84,7 +105,9 @@ JSON format:
   "entities": {
     "filename": "... or null",
     "start_line": number or null,
-    "end_line": number or null
+    "end_line": number or null,
+    "query": "... or null",
+    "symbol": "... or null"
   }
 }
 You MUST return exactly ONE JSON object.
@@ -92,3 +115,32 @@ Do NOT return multiple answers.
 Stop after the first valid JSON object.
 
 """
+
+
+# Filled into INTENT_CLASSIFIER_PROMPT only when semantic search is on
+SEARCH_CODE_INTENT = "- SEARCH_CODE\n"
+SEARCH_CODE_RULE = """- SEARCH_CODE is for finding WHERE something is implemented when no
+  filename is given; put the thing to look for in "query".
+"""
+
+
+CHUNK_EXPLAIN_PROMPT = """
+The file is too large to explain in one pass. Below is part {index} of {total},
+covering lines {start_line}-{end_line}.
+
+Explain ONLY what this part contains, concisely. Name the functions, classes
+and top-level statements it defines and what they do. Do not speculate about
+the parts you have not been shown.
+
+"""
+
+
+MERGE_EXPLANATIONS_PROMPT = """
+Below are explanations of consecutive parts of ONE source file, in order.
+
+Combine them into a single coherent explanation of the whole file.
+- Use ONLY the information in the partial explanations.
+- Remove repetition between parts.
+- Do NOT add features or behaviour that none of the parts mention.
+
+"""
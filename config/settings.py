@@ -23,10 +23,84 @@ LLM_MODEL = "llama-3.3-70b-versatile"
 LLM_TEMPERATURE = 0.0   # deterministic
 LLM_MAX_TOKENS = 2500
 
+# Files above EXPLAIN_CHUNK_TOKENS are split into chunks that are explained
+# concurrently and then merged. EXPLAIN_TOKEN_BUDGET caps the input tokens
+# one explanation request may spend; EXPLAIN_CONCURRENCY caps the chunk calls
+# in flight across all requests.
+EXPLAIN_CHUNK_TOKENS = 6000
+EXPLAIN_TOKEN_BUDGET = 60000
+EXPLAIN_CONCURRENCY = 4
 
-# Max file size (in KB) that can be fetched
+# LLM results are deterministic (temperature 0), so explanations and
+# intent classifications are reused across sessions for this long
+LLM_CACHE_TTL_SECONDS = 24 * 60 * 60
+LLM_CACHE_MAX_ENTRIES = 2000
+INTENT_CACHE_MAX_ENTRIES = 5000
+
+# Per-blob code metrics
+METRICS_CACHE_MAX_ENTRIES = 20000
+
+# Repository-wide metrics: worker processes (None = one per CPU core),
+# files per task sent to a worker, and hotspots listed per category
+REPO_METRICS_WORKERS = None
+REPO_METRICS_BATCH_SIZE = 32
+REPO_METRICS_TOP_N = 10
+
+
+# HTTP connections kept open per GitHub client (shared by all sessions)
+GITHUB_POOL_SIZE = 20
+
+# All GitHub requests from tools go through one scheduler: requests in
+# flight at once, retries of transient failures with jittered exponential
+# backoff (honouring Retry-After for at most FETCH_MAX_RATE_LIMIT_WAIT_SECONDS),
+# and the remaining rate-limit quota below which new requests wait for the
+# window to reset. Foreground requests wait at most
+# FETCH_MAX_RATE_LIMIT_WAIT_SECONDS and then fail with a rate-limit error.
+FETCH_CONCURRENCY = 8
+FETCH_TIMEOUT_SECONDS = 60
+FETCH_MAX_RETRIES = 4
+FETCH_BACKOFF_BASE_SECONDS = 0.5
+FETCH_BACKOFF_MAX_SECONDS = 30
+FETCH_RATE_LIMIT_RESERVE = 50
+FETCH_MAX_RATE_LIMIT_WAIT_SECONDS = 60
+
+# Background warm-up after "Load Repository": tree, README and metadata,
+# then manifests and the smallest, shallowest source files (each at most
+# PREFETCH_MAX_FILE_KB) until PREFETCH_BYTE_BUDGET bytes are cached.
+# Prefetch holds at most PREFETCH_CONCURRENCY fetch slots and yields them
+# to foreground queries.
+ENABLE_PREFETCH = os.getenv("ARES_PREFETCH", "1") == "1"
+PREFETCH_CONCURRENCY = 2
+PREFETCH_BYTE_BUDGET = 8 * 1024 * 1024
+PREFETCH_MAX_FILE_KB = 64
+PREFETCH_MAX_FILES = 400
+
+# Longest a caller waits on an identical in-flight fetch or LLM completion
+# before doing the work itself (e.g. when the leader's stream was abandoned)
+SINGLE_FLIGHT_WAIT_SECONDS = 90
+
+# Responses of mutable endpoints (branch heads) kept with their ETag, so
+# unchanged answers come back as 304s that do not count against the quota
+ETAG_CACHE_MAX_ENTRIES = 1000
+
+# How long GitHub repo handles and owner repo listings are reused
+GITHUB_HANDLE_TTL_SECONDS = 600
+REPO_LIST_TTL_SECONDS = 300
+
+
+# Max file size (in KB) that is loaded into memory whole. Larger files are
+# streamed from the Git blob API to LARGE_FILE_DIR and read by line range.
 MAX_FILE_SIZE_KB = 500
 
+# Local copies of large blobs, the disk budget for them, and how many are
+# kept memory-mapped at once
+LARGE_FILE_DIR = os.getenv("ARES_LARGE_FILE_DIR", ".ares_cache/blobs")
+LARGE_FILE_DIR_MAX_BYTES = 2 * 1024 * 1024 * 1024
+LARGE_FILE_MAX_OPEN = 16
+
+# Lines shown for a large file when no line range is given
+SHOW_FILE_MAX_LINES = 300
+
 # Max number of files shown in tree (top-level only)
 MAX_TREE_ENTRIES = 200
 
@@ -34,7 +108,98 @@ MAX_TREE_ENTRIES = 200
 ENABLE_SESSION_CACHE = True
 ENABLE_FILE_CACHE = True
 
-# FAISS is OPTIONAL and OFF by default
-ENABLE_VECTORSTORE = False
+# Byte budget of the process-wide blob store shared by all sessions
+BLOB_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Optional SQLite tier that keeps trees, blobs and README across restarts.
+# Safe to share between several app worker processes.
+ENABLE_DISK_CACHE = os.getenv("ARES_DISK_CACHE", "0") == "1"
+DISK_CACHE_PATH = os.getenv("ARES_DISK_CACHE_PATH", ".ares_cache/cache.sqlite3")
+DISK_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Opt-in whole-repo snapshot mode: download the tarball for a commit once
+# and serve tree, path lookups and file content from local disk. Snapshots
+# of least recently used commits are removed beyond the byte budget.
+SNAPSHOT_MODE = False
+SNAPSHOT_DIR = os.getenv("ARES_SNAPSHOT_DIR", ".ares_cache/snapshots")
+SNAPSHOT_DIR_MAX_BYTES = 4 * 1024 * 1024 * 1024
+
+# How long a resolved branch head is trusted before asking GitHub again
+HEAD_CACHE_TTL_SECONDS = 300
+
+# How long repository metadata (description, language, stars, forks) is
+# served from the disk cache; stars and forks change without new commits
+METADATA_CACHE_TTL_SECONDS = 600
+
+# Minimum time between branch head checks while a session is querying.
+# On a new head, only paths changed since the cached commit are refreshed.
+HEAD_CHECK_INTERVAL_SECONDS = 60
+
+# GitHub lists at most this many files in a compare; beyond it the tree
+# is re-fetched instead of patched
+COMPARE_MAX_FILES = 300
+
+# FAISS is OPTIONAL and OFF by default. When on, SEARCH_CODE queries use a
+# chunk-level vector index, persisted per commit under VECTOR_INDEX_DIR
+# (least recently used commits are removed beyond the byte budget).
+ENABLE_VECTORSTORE = os.getenv("ARES_VECTORSTORE", "0") == "1"
+VECTOR_INDEX_DIR = os.getenv("ARES_VECTOR_INDEX_DIR", ".ares_cache/vectors")
+VECTOR_INDEX_DIR_MAX_BYTES = 1024 * 1024 * 1024
+
+# Local sentence-transformers model for embeddings (e.g.
+# "sentence-transformers/all-MiniLM-L6-v2"). Unset, or when the package is
+# missing, identifiers are feature-hashed into HASH_EMBEDDING_DIM dims.
+EMBEDDING_MODEL = os.getenv("ARES_EMBEDDING_MODEL")
+HASH_EMBEDDING_DIM = 512
+
+# Lines per indexed chunk, lines shared by neighbouring chunks, chunks
+# embedded per batch, and files returned per search
+SEARCH_CHUNK_LINES = 40
+SEARCH_CHUNK_OVERLAP = 10
+SEARCH_EMBED_BATCH = 256
+SEARCH_TOP_K = 5
+
+# Trigram index behind GREP_CODE (always on; built on the first grep and
+# stored per commit, least recently used commits removed beyond the byte
+# budget), context lines around each match, and the maximum matching lines
+# returned
+TRIGRAM_INDEX_DIR = os.getenv("ARES_TRIGRAM_INDEX_DIR", ".ares_cache/trigrams")
+TRIGRAM_INDEX_DIR_MAX_BYTES = 1024 * 1024 * 1024
+GREP_CONTEXT_LINES = 2
+GREP_MAX_MATCHES = 200
+
+# Per-answer span tracing: spans kept per trace (beyond that they only
+# feed the aggregates), an optional JSON-lines file receiving every
+# finished trace, and an optional port serving Prometheus text at /metrics
+# (on loopback unless ARES_METRICS_HOST says otherwise; it has no auth)
+ENABLE_TRACING = os.getenv("ARES_TRACING", "1") == "1"
+TRACE_MAX_SPANS = 500
+TRACE_LOG_PATH = os.getenv("ARES_TRACE_LOG")
+METRICS_PORT = int(os.getenv("ARES_METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("ARES_METRICS_HOST", "127.0.0.1")
+
+# Headless service (python -m service): bind address, queries answered at
+# once, repositories whose session caches are kept warm (least recently
+# used are dropped), the largest request body accepted, and an optional key
+# clients must send as "Authorization: Bearer <key>"
+SERVICE_HOST = os.getenv("ARES_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("ARES_SERVICE_PORT", "8080"))
+SERVICE_WORKERS = 16
+SERVICE_MAX_REPOS = 32
+SERVICE_MAX_BODY_BYTES = 64 * 1024
+SERVICE_API_KEY = os.getenv("ARES_SERVICE_API_KEY")
+
+# Offline benchmark (python -m bench): where baselines are saved, and when
+# a run counts as a regression against one: p50 latency more than
+# BENCH_REGRESSION_THRESHOLD slower (and by at least BENCH_MIN_REGRESSION_MS),
+# or any growth in GitHub API or LLM calls
+BENCH_BASELINE_DIR = os.getenv("ARES_BENCH_DIR", "bench/baselines")
+BENCH_REGRESSION_THRESHOLD = 0.2
+BENCH_MIN_REGRESSION_MS = 5
 
 STRICT_INTENT_MODE = True
+
+# Rule-based intent routing; the LLM classifier is only used when the
+# rules are less confident than this
+FAST_INTENT_CLASSIFIER = True
+FAST_INTENT_MIN_CONFIDENCE = 0.8
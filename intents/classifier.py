@@ -1,10 +1,20 @@
 import re
 import json
+import threading
 from enum import Enum
 from typing import Optional
 from pydantic import BaseModel, Field
 
-from config.prompts import INTENT_CLASSIFIER_PROMPT
+from config.prompts import INTENT_CLASSIFIER_PROMPT, SEARCH_CODE_INTENT, SEARCH_CODE_RULE
+from config.settings import (
+    ENABLE_VECTORSTORE,
+    FAST_INTENT_CLASSIFIER,
+    FAST_INTENT_MIN_CONFIDENCE,
+)
+from intents.rules import classify_by_rules
+from storage.response_cache import intent_cache
+from utils import tracing
+from utils.token_utils import count_tokens
 
 
 
@@ -14,7 +24,15 @@ class Intent(str, Enum):
     EXPLAIN_CODE = "EXPLAIN_CODE"
     EXPLAIN_CODE_SLICE = "EXPLAIN_CODE_SLICE"
     CODE_METRICS = "CODE_METRICS"
+    REPO_METRICS = "REPO_METRICS"
     DEPENDENCY_GRAPH = "DEPENDENCY_GRAPH"
+    IMPORTED_BY = "IMPORTED_BY"
+    IMPORT_CYCLES = "IMPORT_CYCLES"
+    SEARCH_CODE = "SEARCH_CODE"
+    GREP_CODE = "GREP_CODE"
+    FIND_SYMBOL = "FIND_SYMBOL"
+    SHOW_SYMBOL = "SHOW_SYMBOL"
+    EXPLAIN_SYMBOL = "EXPLAIN_SYMBOL"
     REPO_SUMMARY = "REPO_SUMMARY"
     GET_OWNER_INFO = "GET_OWNER_INFO"
 
@@ -33,6 +51,14 @@ class IntentEntities(BaseModel):
         default=None,
         description="End line number for code slice"
     )
+    query: Optional[str] = Field(
+        default=None,
+        description="What to look for in the code, for searches and grep"
+    )
+    symbol: Optional[str] = Field(
+        default=None,
+        description="Function, method or class name if one is mentioned"
+    )
 
 
 class IntentResult(BaseModel):
@@ -52,14 +78,97 @@ def _extract_json(text: str) -> dict:
     return json.loads(match.group())
 
 
-def classify_intent(llm, user_query: str) -> IntentResult:
+# SEARCH_CODE is only offered to the LLM when the vector index can answer it
+_CLASSIFIER_PROMPT = (
+    INTENT_CLASSIFIER_PROMPT
+    .replace("{SEARCH_CODE_INTENT}", SEARCH_CODE_INTENT if ENABLE_VECTORSTORE else "")
+    .replace("{SEARCH_CODE_RULE}", SEARCH_CODE_RULE if ENABLE_VECTORSTORE else "")
+)
+
+
+# fast_path: answered by the rules; cache: an earlier LLM classification
+# reused; llm: llm.invoke actually ran
+_stats = {"fast_path": 0, "cache": 0, "llm": 0}
+_stats_lock = threading.Lock()
+
+
+def _record(route: str):
+    with _stats_lock:
+        _stats[route] += 1
+
+
+def classifier_stats() -> dict:
+    with _stats_lock:
+        total = sum(_stats.values())
+        return {
+            **_stats,
+            "fast_path_rate": _stats["fast_path"] / total if total else 0.0,
+        }
+
+
+def fast_classify(user_query: str, path_index: dict = None):
+    """
+    Rule-based classification. Returns (IntentResult or None, confidence).
+    """
+    intent, entities, confidence = classify_by_rules(
+        user_query, path_index, semantic_search=ENABLE_VECTORSTORE
+    )
+    if intent is None:
+        return None, confidence
+
+    result = IntentResult(
+        intent=Intent(intent),
+        entities=IntentEntities(**entities),
+    )
+    return result, confidence
+
+
+def classify_intent(llm, user_query: str, path_index: dict = None) -> IntentResult:
+    """
+    path_index (basename -> [paths]) lets the rule-based fast path verify
+    filenames; the LLM is only called when the rules are unsure.
+    """
+    with tracing.span("classify_intent") as span:
+        result = _classify(llm, user_query, path_index, span)
+        span.set(intent=result.intent.value)
+        return result
+
+
+def _classify(llm, user_query, path_index, span) -> IntentResult:
+    if FAST_INTENT_CLASSIFIER:
+        result, confidence = fast_classify(user_query, path_index)
+        if result is not None and confidence >= FAST_INTENT_MIN_CONFIDENCE:
+            _record("fast_path")
+            span.set(route="rules")
+            return result
+
+    cache_key = (
+        getattr(llm, "model", type(llm).__name__),
+        " ".join(user_query.split()),
+    )
+    cached = intent_cache.get(cache_key)
+    if cached is not None:
+        _record("cache")
+        span.set(route="cache")
+        return cached
+
     messages = [
-        {"role": "system", "content": INTENT_CLASSIFIER_PROMPT},
+        {"role": "system", "content": _CLASSIFIER_PROMPT},
         {"role": "user", "content": user_query},
     ]
 
-    response = llm.invoke(messages)
-    raw = response.content
+    _record("llm")
+    span.set(route="llm")
+    prompt_tokens = sum(count_tokens(message["content"]) for message in messages)
+    with tracing.span(
+        "llm.invoke", model=cache_key[0], prompt_tokens=prompt_tokens
+    ) as llm_span:
+        response = llm.invoke(messages)
+        raw = response.content
+        completion_tokens = count_tokens(raw) if isinstance(raw, str) else 0
+        llm_span.set(completion_tokens=completion_tokens)
+    tracing.count("llm.prompt_tokens", prompt_tokens)
+    tracing.count("llm.completion_tokens", completion_tokens)
 
     try:
  
@@ -83,7 +192,9 @@ def classify_intent(llm, user_query: str) -> IntentResult:
         else:
             raise TypeError(f"Unsupported response.content type: {type(raw)}")
 
-        return IntentResult.model_validate(data)
+        result = IntentResult.model_validate(data)
+        intent_cache.set(cache_key, result)
+        return result
 
     except Exception as e:
         raise ValueError(
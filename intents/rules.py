@@ -0,0 +1,321 @@
+
+import re
+
+#rules
+# Deterministic pre-classifier. Obvious queries ("show tree",
+# "explain agent_a.py lines 10-40") are routed without an LLM call; anything
+# it is unsure about gets a low confidence and falls through to the LLM.
+
+_TREE = re.compile(
+    r"\b(tree|structure|layout|folders?|directories|directory|list (all )?files)\b"
+)
+_SUMMARY = re.compile(
+    r"\b(summary|summari[sz]e|overview|what is this (repo|repository|project)"
+    r"|what does this (repo|repository|project) do|about this (repo|repository|project))\b"
+)
+_OWNER = re.compile(
+    r"\b(owner|owns|owned|maintainer|who (made|created|built|wrote))\b"
+)
+_METRICS = re.compile(
+    r"\b(metrics?|complexity|stats|statistics|loc|how (many|long|big)|count)\b"
+)
+# the whole-repo crawl only on an explicit repository-wide metrics ask;
+# "how many contributors does this repo have" is left to the LLM
+_REPO_SCOPE = r"\b(repo|repository|project|codebase)\b"
+_REPO_MEASURE = r"\b(metrics?|complexity|loc|lines of code)\b"
+_REPO_METRICS = re.compile(
+    _REPO_SCOPE + ".*" + _REPO_MEASURE + "|" + _REPO_MEASURE + ".*" + _REPO_SCOPE
+)
+_HOTSPOTS = re.compile(
+    r"\b(hotspots?|most complex|largest files|biggest files)\b"
+)
+_IMPORTED_BY = re.compile(
+    r"\b((what|which|who)( \w+)? (imports?|uses?|depends? on)|imported by"
+    r"|dependents|importers|usages? of)\b"
+)
+_CYCLES = re.compile(
+    r"\b(circular|cycles?|cyclic)\b"
+)
+_DEPENDENCIES = re.compile(
+    r"\b(imports?|importing|dependenc(y|ies)|depends?)\b"
+)
+_EXPLAIN = re.compile(
+    r"\b(explain|describe|summari[sz]e|what does|how does|walk me through|understand)\b"
+)
+_SHOW = re.compile(
+    r"\b(show|display|print|open|view|cat|see|contents?|source|code)\b"
+)
+_SEARCH = re.compile(
+    r"\b(search( for)?|where (is|are|do|does)|which files?|find (the )?"
+    r"(code|files?|places?|where)|look(ing)? for|locate)\b"
+)
+_GREP = re.compile(
+    r"\b(grep|occurrences?|usages?|references?|used|referenced|called"
+    r"|mentioned|appears?)\b"
+)
+_QUOTED = re.compile(r"`([^`]+)`|\"([^\"]+)\"|(?<!\S)(/\S.*?/i?)(?!\S)")
+_GREP_BARE = re.compile(
+    r"\bgrep\s+(?:for\s+)?(\S+)"
+    r"|\bwhere (?:is|are) (\S+) (?:used|referenced|called|set)\b",
+    re.IGNORECASE,
+)
+
+_IDENTIFIER = r"`?([A-Za-z_][\w.]*\w)(?:\(\))?`?"
+_DEFINITION = re.compile(
+    r"\bwhere (?:is|are) (?:the )?(?:function |class |method )?" + _IDENTIFIER
+    + r" (?:defined|declared|implemented)\b"
+    r"|\b(?:definition of|jump to|go to|goto)(?: the)?(?: definition of)?"
+    r"(?: the)?(?: function| class| method)? " + _IDENTIFIER + r"(?!\w)",
+    re.IGNORECASE,
+)
+_SYMBOL_KIND = re.compile(
+    r"\b(?:function|class|method|def|symbol)\s+(?:(?:called|named)\s+)?"
+    + _IDENTIFIER + r"(?!\w)",
+    re.IGNORECASE,
+)
+# words that follow "function" / "class" in plain English ("the class in
+# app.py") and are never taken as the symbol's name
+_SYMBOL_STOPWORDS = {
+    "a", "an", "and", "are", "at", "by", "does", "for", "from", "here",
+    "in", "inside", "is", "it", "of", "on", "or", "that", "the", "there",
+    "these", "this", "those", "to", "which", "with", "within",
+}
+_SYMBOL_CALL = re.compile(r"`?([A-Za-z_][\w.]*)\(\)`?")
+
+_LINE_RANGES = (
+    re.compile(r"\blines?\s*(\d+)\s*(?:-|–|to|through|until|and)\s*(\d+)"),
+    re.compile(r"\bl(\d+)\s*-\s*l?(\d+)\b"),
+    re.compile(r"\S:(\d+)\s*-\s*(\d+)\b"),
+)
+_SINGLE_LINE = re.compile(r"\bline\s*(\d+)\b")
+
+_FILENAME = re.compile(r"[\w./-]*\w\.[A-Za-z0-9]+")
+_TOKEN_STRIP = ".,;:!?()[]{}'\"`"
+
+HIGH_CONFIDENCE = 0.95
+MEDIUM_CONFIDENCE = 0.85
+LOW_CONFIDENCE = 0.4
+
+
+def extract_line_range(query: str):
+    text = query.lower()
+    for pattern in _LINE_RANGES:
+        match = pattern.search(text)
+        if match:
+            start, end = int(match.group(1)), int(match.group(2))
+            return min(start, end), max(start, end)
+
+    match = _SINGLE_LINE.search(text)
+    if match:
+        line = int(match.group(1))
+        return line, line
+
+    return None, None
+
+
+def extract_search_query(query: str):
+    """
+    The part of a search request after its trigger phrase, e.g.
+    "where is the rate limit handled" -> "the rate limit handled".
+    """
+    match = _SEARCH.search(query.lower())
+    terms = query[match.end():] if match else query
+    return terms.strip(" ?.!:\"'") or query.strip()
+
+
+def _looks_like_identifier(name: str) -> bool:
+    return "_" in name or "." in name or not name.islower()
+
+
+def extract_symbol(query: str):
+    """
+    (symbol name, certain) for "where is X defined", "function X", "X()"
+    and the like; (None, False) if the query names no symbol. Plain
+    lower-case words ("where is auth defined") are not certain.
+    """
+    match = _SYMBOL_CALL.search(query)
+    if match:
+        return match.group(1), True
+
+    match = _DEFINITION.search(query) or next(
+        (
+            match for match in _SYMBOL_KIND.finditer(query)
+            if match.group(1).lower() not in _SYMBOL_STOPWORDS
+        ),
+        None,
+    )
+    if match:
+        name = next(group for group in match.groups() if group)
+        return name, _looks_like_identifier(name) or f"`{name}`" in query
+
+    return None, False
+
+
+def extract_grep_pattern(query: str):
+    """
+    The exact text to grep for: a `quoted` or "quoted" string, a /regex/,
+    or the word after "grep" / in "where is X used". None if there is none.
+    """
+    match = _QUOTED.search(query)
+    if match:
+        return next(group for group in match.groups() if group)
+
+    match = _GREP_BARE.search(query)
+    if match:
+        return next(group for group in match.groups() if group).strip("?.!,")
+
+    return None
+
+
+def _is_module_name(token: str, path_index: dict) -> bool:
+    """
+    True for a dotted Python module name such as utils.github_client that
+    maps to a file (or package) in the path index.
+    """
+    if "." not in token or "/" in token:
+        return False
+
+    module_path = token.replace(".", "/")
+    name = module_path.rpartition("/")[2]
+
+    for suffix, basename in (
+        (module_path + ".py", name + ".py"),
+        (module_path + "/__init__.py", "__init__.py"),
+    ):
+        for path in path_index.get(basename, []):
+            if path == suffix or path.endswith("/" + suffix):
+                return True
+    return False
+
+
+def extract_filename(query: str, path_index: dict = None):
+    """
+    Return (filename, verified). verified is True when the name resolves
+    against the repo path index (basename -> [paths]).
+    """
+    fallback = None
+
+    for raw in query.split():
+        token = raw.strip(_TOKEN_STRIP)
+        # drop a trailing ":10-40" style line suffix
+        token = token.split(":", 1)[0]
+        if not token:
+            continue
+
+        if path_index is not None:
+            basename = token.rstrip("/").rpartition("/")[2]
+            if basename in path_index:
+                return token, True
+
+            if _is_module_name(token, path_index):
+                return token, True
+
+        if fallback is None and _FILENAME.fullmatch(token):
+            fallback = token
+
+    return fallback, False
+
+
+def classify_by_rules(query: str, path_index: dict = None, semantic_search: bool = True):
+    """
+    Return (intent_name, entities, confidence).
+    intent_name is None when no rule applies. Without semantic_search,
+    "where is ..." questions are left to the LLM rather than routed to
+    SEARCH_CODE.
+    """
+    text = query.lower()
+    filename, verified = extract_filename(query, path_index)
+    start_line, end_line = extract_line_range(query)
+
+    entities = {
+        "filename": filename,
+        "start_line": start_line,
+        "end_line": end_line,
+        "query": None,
+        "symbol": None,
+    }
+
+    if _CYCLES.search(text) and _DEPENDENCIES.search(text):
+        return "IMPORT_CYCLES", entities, HIGH_CONFIDENCE
+
+    symbol, certain = extract_symbol(query)
+    if symbol and not (verified and symbol == filename):
+        if _DEFINITION.search(query):
+            intent = "FIND_SYMBOL"
+        elif _EXPLAIN.search(text):
+            intent = "EXPLAIN_SYMBOL"
+        elif _SHOW.search(text):
+            intent = "SHOW_SYMBOL"
+        else:
+            intent = None
+
+        if intent:
+            entities["symbol"] = symbol
+            if not verified:
+                entities["filename"] = None
+            return intent, entities, HIGH_CONFIDENCE if certain else LOW_CONFIDENCE
+
+    pattern = extract_grep_pattern(query)
+    if pattern and not (verified and pattern == filename) and (
+        _GREP.search(text) or _SEARCH.search(text)
+    ):
+        entities["query"] = pattern
+        if not verified:
+            # the quoted text itself may have looked like a filename
+            entities["filename"] = None
+        return "GREP_CODE", entities, HIGH_CONFIDENCE
+
+    if filename and _IMPORTED_BY.search(text):
+        confidence = HIGH_CONFIDENCE if verified else LOW_CONFIDENCE
+        return "IMPORTED_BY", entities, confidence
+
+    if filename:
+        specific = [
+            name for name, pattern in (
+                ("CODE_METRICS", _METRICS),
+                ("DEPENDENCY_GRAPH", _DEPENDENCIES),
+                ("EXPLAIN_CODE", _EXPLAIN),
+            )
+            if pattern.search(text)
+        ]
+
+        if len(specific) > 1:
+            return specific[0], entities, LOW_CONFIDENCE
+
+        if specific:
+            intent = specific[0]
+            if intent == "EXPLAIN_CODE" and start_line is not None:
+                intent = "EXPLAIN_CODE_SLICE"
+        elif _SHOW.search(text):
+            intent = "SHOW_FILE_CODE"
+        else:
+            return "SHOW_FILE_CODE", entities, LOW_CONFIDENCE
+
+        confidence = HIGH_CONFIDENCE if verified else MEDIUM_CONFIDENCE
+        if path_index is not None and not verified:
+            # a filename-looking token that is not in the repo
+            confidence = LOW_CONFIDENCE
+        return intent, entities, confidence
+
+    matched = [
+        name for name, pattern in (
+            ("SHOW_REPO_TREE", _TREE),
+            ("REPO_SUMMARY", _SUMMARY),
+            ("GET_OWNER_INFO", _OWNER),
+            ("REPO_METRICS", _REPO_METRICS),
+            ("SEARCH_CODE", _SEARCH if semantic_search else None),
+        )
+        if pattern is not None and pattern.search(text)
+    ]
+    if "REPO_METRICS" not in matched and _HOTSPOTS.search(text):
+        matched.append("REPO_METRICS")
+    if "SEARCH_CODE" in matched:
+        entities["query"] = extract_search_query(query)
+
+    if len(matched) == 1:
+        return matched[0], entities, HIGH_CONFIDENCE
+
+    if matched:
+        return matched[0], entities, LOW_CONFIDENCE
+
+    return None, entities, 0.0
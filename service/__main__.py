@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from service.engine import AresService
+from service.http_api import error_status, serve
+from config.settings import SERVICE_HOST, SERVICE_PORT, SERVICE_WORKERS, SNAPSHOT_MODE
+
+#service cli
+#   python -m service serve [--host H] [--port P] [--workers N]
+#   python -m service ask owner/name "query" ...   (or --file queries.txt, - for stdin)
+#
+# "ask" answers a batch of queries against one repository in a single
+# process, so they share warm caches, and prints one JSON object per query
+# in input order. It exits 1 if any query failed.
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m service",
+        description="Run ARES without Streamlit.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    server = commands.add_parser("serve", help="start the HTTP API")
+    server.add_argument("--host", default=SERVICE_HOST)
+    server.add_argument("--port", type=int, default=SERVICE_PORT)
+    server.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="queries answered at once")
+    server.add_argument("--no-prefetch", action="store_true", help="do not warm up newly seen repositories")
+
+    batch = commands.add_parser("ask", help="answer queries about one repository")
+    batch.add_argument("repo", help="owner/name")
+    batch.add_argument("queries", nargs="*", help="queries; see also --file")
+    batch.add_argument("--file", help="read one query per line from this file (- for stdin)")
+    batch.add_argument("--concurrency", type=int, default=4, help="queries answered at once")
+    batch.add_argument("--snapshot", action="store_true", default=SNAPSHOT_MODE)
+    return parser.parse_args(argv)
+
+
+def _read_queries(args) -> list:
+    queries = list(args.queries)
+    if args.file:
+        stream = sys.stdin if args.file == "-" else open(args.file)
+        with stream:
+            queries.extend(line.strip() for line in stream)
+    return [query for query in queries if query]
+
+
+def _ask(args) -> int:
+    owner, _, name = args.repo.partition("/")
+    if not owner or not name:
+        print('repo must look like "owner/name"', file=sys.stderr)
+        return 2
+
+    queries = _read_queries(args)
+    if not queries:
+        print("No queries given", file=sys.stderr)
+        return 2
+
+    # the batch is over before a warm-up would pay off
+    service = AresService(prefetch=False)
+
+    def answer(query):
+        try:
+            return service.answer(owner, name, query, snapshot=args.snapshot)
+        except Exception as e:
+            return {
+                "repo": args.repo,
+                "query": query,
+                "error": str(e) or type(e).__name__,
+                "status": int(error_status(e)),
+            }
+
+    failed = False
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        for result in executor.map(answer, queries):
+            failed |= "error" in result
+            print(json.dumps(result), flush=True)
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    if args.command == "ask":
+        return _ask(args)
+
+    service = AresService(prefetch=False) if args.no_prefetch else AresService()
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
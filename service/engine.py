@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+
+from agents.agent_a import AgentA
+from intents.classifier import classifier_stats
+from storage.blob_store import blob_stats
+from storage.disk_cache import disk_stats
+from storage.response_cache import explanation_cache, intent_cache
+from storage.session_cache import use_session
+from storage.single_flight import repo_flights, single_flight_stats
+from tools.prefetch_tools import PrefetchJob
+from utils import tracing
+from utils.fetch_scheduler import fetch_stats
+from utils.github_client import init_repo
+from utils.llm_client import get_llm
+from config.settings import (
+    ENABLE_PREFETCH,
+    GITHUB_TOKEN,
+    SERVICE_MAX_REPOS,
+    SNAPSHOT_MODE,
+)
+
+#service engine
+# ARES without Streamlit. The LLM and GitHub clients live for the whole
+# process, and each repository gets one long-lived session (its own cache
+# mapping and AgentA) that every request for it shares, so concurrent
+# requests answer from the same warm tree, path index and file refs.
+
+
+class RepoSession:
+    """
+    Cache mapping, context and agent of one repository.
+    """
+
+    def __init__(self, ctx, llm):
+        self.ctx = ctx
+        self.state = {}
+        self.agent = AgentA(llm, ctx)
+        self.prefetch_job = None
+        self.queries = 0
+
+
+class AresService:
+    def __init__(self, llm=None, max_repos: int = SERVICE_MAX_REPOS, prefetch: bool = ENABLE_PREFETCH):
+        self.llm = llm or get_llm()
+        self.max_repos = max_repos
+        self.prefetch = prefetch
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def session(
+        self,
+        owner: str,
+        name: str,
+        snapshot: bool = SNAPSHOT_MODE,
+        token: str = GITHUB_TOKEN,
+    ) -> RepoSession:
+        """
+        The shared session for owner/name, created (and warmed up in the
+        background) on first use.
+        """
+        key = (hash(token), owner.lower(), name.lower(), snapshot)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+                return session
+
+        # resolving the repo is a GitHub call; keep it outside the lock and
+        # let concurrent first requests share it
+        ctx = repo_flights.do(
+            ("service", key), lambda: init_repo(owner, name, token, snapshot)
+        )
+
+        evicted = []
+        with self._lock:
+            session = self._sessions.get(key)
+            created = session is None
+            if created:
+                session = self._sessions[key] = RepoSession(ctx, self.llm)
+                while len(self._sessions) > self.max_repos:
+                    evicted.append(self._sessions.popitem(last=False)[1])
+            self._sessions.move_to_end(key)
+
+        for old in evicted:
+            if old.prefetch_job is not None:
+                old.prefetch_job.cancel()
+
+        if created and self.prefetch:
+            with use_session(session.state):
+                session.prefetch_job = PrefetchJob(ctx).start()
+        return session
+
+    def answer(
+        self,
+        owner: str,
+        name: str,
+        query: str,
+        snapshot: bool = SNAPSHOT_MODE,
+        on_chunk=None,
+    ) -> dict:
+        """
+        Answer query about owner/name. With on_chunk, explanations are
+        streamed to on_chunk(text) as they arrive (other answers arrive as
+        one chunk). Errors from the agents propagate.
+        """
+        session = self.session(owner, name, snapshot)
+        with self._lock:
+            session.queries += 1
+
+        start = time.perf_counter()
+        with use_session(session.state), tracing.trace(
+            "query", repo=session.ctx.full_name
+        ) as query_trace:
+            response = session.agent.handle_query(query, stream=on_chunk is not None)
+            if isinstance(response, str):
+                if on_chunk is not None:
+                    on_chunk(response)
+            else:
+                parts = []
+                for chunk in response:
+                    parts.append(chunk)
+                    on_chunk(chunk)
+                response = "".join(parts)
+
+        handled = query_trace.find("handle_query") if query_trace is not None else None
+        return {
+            "repo": session.ctx.full_name,
+            "query": query,
+            "intent": handled.attrs.get("intent") if handled is not None else None,
+            "answer": response,
+            "ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            repos = [
+                {
+                    "repo": session.ctx.full_name,
+                    "snapshot": session.ctx.snapshot,
+                    "queries": session.queries,
+                    "prefetch": (
+                        session.prefetch_job.status()
+                        if session.prefetch_job is not None else None
+                    ),
+                }
+                for session in self._sessions.values()
+            ]
+        return {
+            "repos": repos,
+            "blobs": blob_stats(),
+            "disk": disk_stats(),
+            "github": fetch_stats(),
+            "coalesced": single_flight_stats(),
+            "intents": classifier_stats(),
+            "llm_cache": {
+                "explanations": explanation_cache.stats(),
+                "intents": intent_cache.stats(),
+            },
+        }
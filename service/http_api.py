@@ -0,0 +1,324 @@
+import asyncio
+import functools
+import hmac
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+from github import GithubException
+from requests import HTTPError as UpstreamHTTPError
+
+from utils import tracing
+from utils.fetch_scheduler import RateLimitWaitError
+from config.settings import (
+    SERVICE_API_KEY,
+    SERVICE_MAX_BODY_BYTES,
+    SERVICE_WORKERS,
+)
+
+#http api
+# A small asyncio HTTP/1.1 server over AresService. The tools block, so
+# queries run on a pool of SERVICE_WORKERS threads; the event loop only
+# reads requests and writes responses, so a slow answer never holds up
+# other clients or health checks. Streamed answers use chunked encoding.
+#
+#   POST /v1/query  {"repo": "owner/name", "query": "...", "stream": false, "snapshot": false}
+#   GET  /v1/stats  cache, GitHub and LLM statistics
+#   GET  /healthz
+#   GET  /metrics   Prometheus text (utils.tracing)
+
+_DONE = object()
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class _Disconnected(Exception):
+    """
+    Raised in the worker when the client of a streamed answer went away.
+    """
+
+
+def _upstream_status(error: Exception):
+    """
+    HTTP status GitHub answered with, for errors from PyGithub or from the
+    raw fetch path; None for anything else.
+    """
+    if isinstance(error, GithubException):
+        return error.status
+    if isinstance(error, UpstreamHTTPError) and error.response is not None:
+        return error.response.status_code
+    return None
+
+
+def error_status(error: Exception) -> int:
+    if isinstance(error, HttpError):
+        return error.status
+    if isinstance(error, FileNotFoundError):
+        return HTTPStatus.NOT_FOUND
+    if isinstance(error, RateLimitWaitError):
+        return HTTPStatus.SERVICE_UNAVAILABLE
+    if isinstance(error, (GithubException, UpstreamHTTPError)):
+        status = _upstream_status(error)
+        return status if status and 400 <= status < 500 else HTTPStatus.BAD_GATEWAY
+    if isinstance(error, ValueError):
+        return HTTPStatus.BAD_REQUEST
+    return HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, GithubException):
+        return f"GitHub error {error.status}: {(error.data or {}).get('message', '')}".strip()
+    if isinstance(error, UpstreamHTTPError) and error.response is not None:
+        return f"GitHub error {error.response.status_code}: {error.response.reason or ''}".strip()
+    return str(error) or type(error).__name__
+
+
+def _query_request(body: bytes) -> dict:
+    try:
+        request = json.loads(body or b"{}")
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Body must be JSON")
+    if not isinstance(request, dict):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+
+    owner, _, name = str(request.get("repo") or "").partition("/")
+    query = request.get("query")
+    if not owner or not name or "/" in name:
+        raise HttpError(HTTPStatus.BAD_REQUEST, '"repo" must look like "owner/name"')
+    if not isinstance(query, str) or not query.strip():
+        raise HttpError(HTTPStatus.BAD_REQUEST, '"query" must be a non-empty string')
+
+    return {
+        "owner": owner,
+        "name": name,
+        "query": query,
+        "stream": bool(request.get("stream", False)),
+        "snapshot": request.get("snapshot"),
+    }
+
+
+class ApiServer:
+    def __init__(self, service, workers: int = SERVICE_WORKERS, api_key: str = SERVICE_API_KEY):
+        self.service = service
+        self.api_key = api_key
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query")
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    def _call(self, fn, *args, **kwargs):
+        # the worker starts from a copy of the request's context
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(
+            self._executor, functools.partial(copy_context().run, fn, *args, **kwargs)
+        )
+
+    # ---- HTTP plumbing ----
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line.strip():
+            return None
+
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HttpError(HTTPStatus.LENGTH_REQUIRED, "Send a Content-Length body")
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > SERVICE_MAX_BODY_BYTES:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+
+        body = await reader.readexactly(length) if length else b""
+        keep_alive = (
+            headers.get("connection", "").lower() != "close"
+            and version.upper() == "HTTP/1.1"
+        )
+        return method.upper(), urlsplit(target).path, headers, body, keep_alive
+
+    @staticmethod
+    def _head(status: int, content_type: str, keep_alive: bool, length: int = None) -> bytes:
+        lines = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            f"Content-Type: {content_type}",
+            "Connection: " + ("keep-alive" if keep_alive else "close"),
+            f"Content-Length: {length}" if length is not None else "Transfer-Encoding: chunked",
+        ]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _send(self, writer, status: int, payload, keep_alive: bool, content_type: str = None):
+        if isinstance(payload, (bytes, str)):
+            body = payload.encode() if isinstance(payload, str) else payload
+            content_type = content_type or "text/plain; charset=utf-8"
+        else:
+            body = json.dumps(payload, default=str).encode()
+            content_type = "application/json"
+        writer.write(self._head(status, content_type, keep_alive, len(body)) + body)
+        await writer.drain()
+
+    async def _send_error(self, writer, error: Exception, keep_alive: bool):
+        await self._send(writer, error_status(error), {"error": _error_message(error)}, keep_alive)
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    await self._send_error(writer, e, False)
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body, keep_alive = request
+                try:
+                    await self._dispatch(writer, method, path, headers, body, keep_alive)
+                except HttpError as e:
+                    await self._send_error(writer, e, keep_alive)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    # ---- routes ----
+
+    def _authorized(self, headers: dict) -> bool:
+        if not self.api_key:
+            return True
+        return hmac.compare_digest(
+            headers.get("authorization", ""), f"Bearer {self.api_key}"
+        )
+
+    async def _dispatch(self, writer, method, path, headers, body, keep_alive):
+        path = path.rstrip("/") or "/"
+
+        if path == "/healthz":
+            await self._send(writer, HTTPStatus.OK, {"status": "ok"}, keep_alive)
+            return
+
+        if not self._authorized(headers):
+            raise HttpError(HTTPStatus.UNAUTHORIZED, "Missing or wrong API key")
+
+        routes = {
+            "/metrics": ("GET", self._metrics),
+            "/v1/stats": ("GET", self._stats),
+            "/v1/query": ("POST", self._query),
+        }
+        if path not in routes:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"No route {path}")
+        allowed, handler = routes[path]
+        if method != allowed:
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"{path} only accepts {allowed}")
+
+        await handler(writer, body, keep_alive)
+
+    async def _metrics(self, writer, body, keep_alive):
+        await self._send(
+            writer, HTTPStatus.OK, tracing.prometheus_text(), keep_alive,
+            "text/plain; version=0.0.4",
+        )
+
+    async def _stats(self, writer, body, keep_alive):
+        await self._send(writer, HTTPStatus.OK, await self._call(self.service.stats), keep_alive)
+
+    async def _query(self, writer, body, keep_alive):
+        request = _query_request(body)
+        kwargs = {}
+        if request["snapshot"] is not None:
+            kwargs["snapshot"] = bool(request["snapshot"])
+
+        if not request["stream"]:
+            try:
+                result = await self._call(
+                    self.service.answer,
+                    request["owner"], request["name"], request["query"], **kwargs,
+                )
+            except Exception as e:
+                await self._send_error(writer, e, keep_alive)
+                return
+            await self._send(writer, HTTPStatus.OK, result, keep_alive)
+            return
+
+        await self._stream_query(writer, request, kwargs, keep_alive)
+
+    async def _stream_query(self, writer, request, kwargs, keep_alive):
+        """
+        Chunks are written as the worker produces them. Until the first
+        chunk an error still gets a proper status; after it, the error is
+        appended to the text.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        disconnected = False
+
+        def on_chunk(text):
+            if disconnected:
+                raise _Disconnected()
+            loop.call_soon_threadsafe(chunks.put_nowait, text)
+
+        work = self._call(
+            self.service.answer,
+            request["owner"], request["name"], request["query"],
+            on_chunk=on_chunk, **kwargs,
+        )
+        work.add_done_callback(lambda _: chunks.put_nowait(_DONE))
+
+        started = False
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is _DONE:
+                    break
+                if not started:
+                    writer.write(self._head(HTTPStatus.OK, "text/plain; charset=utf-8", keep_alive))
+                    started = True
+                if chunk:
+                    data = chunk.encode()
+                    writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    await writer.drain()
+
+            if work.cancelled():
+                error = HttpError(HTTPStatus.SERVICE_UNAVAILABLE, "Query was cancelled")
+            else:
+                error = work.exception()
+            if error is not None and not started:
+                await self._send_error(writer, error, keep_alive)
+                return
+            if not started:
+                writer.write(self._head(HTTPStatus.OK, "text/plain; charset=utf-8", keep_alive))
+            if error is not None:
+                data = f"\n[error] {_error_message(error)}\n".encode()
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except ConnectionError:
+            disconnected = True
+            raise
+
+
+async def serve(service, host: str, port: int, workers: int = SERVICE_WORKERS):
+    server = await ApiServer(service, workers).start(host, port)
+    addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"ARES service listening on {addresses}", flush=True)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,98 @@
+
+import sys
+import threading
+from collections import OrderedDict
+
+from config.settings import BLOB_CACHE_MAX_BYTES
+from utils import tracing
+
+#blob store
+class BlobStore:
+    """
+    Process-wide, content-addressed file store shared by all sessions.
+
+    Entries are keyed by (repo full name, git blob sha), so a file is held
+    once no matter how many sessions read it. The least recently used
+    entries are evicted once the byte budget is exceeded.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, repo: str, sha: str):
+        key = (repo, sha)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        tracing.count("cache.blob.miss" if entry is None else "cache.blob.hit")
+        return entry[0] if entry is not None else None
+
+    def put(self, repo: str, sha: str, content: str):
+        key = (repo, sha)
+        size = sys.getsizeof(content)
+
+        # never let one blob flush the whole store
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+
+            self._entries[key] = (content, size)
+            self._size += size
+
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_store = BlobStore(BLOB_CACHE_MAX_BYTES)
+
+
+def get_blob(repo: str, sha: str):
+    return _store.get(repo, sha)
+
+
+def put_blob(repo: str, sha: str, content: str):
+    _store.put(repo, sha, content)
+
+
+def clear_blobs():
+    _store.clear()
+
+
+def blob_stats() -> dict:
+    return _store.stats()
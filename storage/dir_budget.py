@@ -0,0 +1,79 @@
+import os
+import shutil
+
+#dir budget
+# Snapshots and the vector and trigram indexes are written once per commit
+# into a directory of their own and never modified afterwards. Loading one
+# touches its mtime; after each save, the least recently used directories
+# of that kind are removed until the total fits its byte budget, as the
+# SQLite tier and the large-file store do for their entries.
+
+
+def touch(directory: str):
+    """
+    Mark a commit directory as used now.
+    """
+    try:
+        os.utime(directory)
+    except OSError:
+        pass
+
+
+def _size(directory: str) -> int:
+    total = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _commit_dirs(root: str, depth: int) -> list:
+    """
+    Directories depth levels below root, skipping unfinished ".partial-"
+    work directories.
+    """
+    level = [root]
+    for _ in range(depth):
+        below = []
+        for directory in level:
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                continue
+            below.extend(
+                os.path.join(directory, name) for name in names
+                if not name.startswith(".partial-")
+                and os.path.isdir(os.path.join(directory, name))
+            )
+        level = below
+    return level
+
+
+def prune_dirs(root: str, depth: int, max_bytes: int, keep: str):
+    """
+    Remove the least recently used commit directories (depth levels below
+    root, never keep) once together they exceed max_bytes. Files that are
+    memory-mapped stay readable until they are unmapped.
+    """
+    keep = os.path.realpath(keep)
+    total = 0
+    candidates = []
+    for directory in _commit_dirs(root, depth):
+        size = _size(directory)
+        total += size
+        if os.path.realpath(directory) == keep:
+            continue
+        try:
+            used = os.stat(directory).st_mtime
+        except OSError:
+            continue
+        candidates.append((used, size, directory))
+
+    for _, size, directory in sorted(candidates):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(directory, ignore_errors=True)
+        total -= size
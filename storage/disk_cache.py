@@ -0,0 +1,173 @@
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config.settings import (
+    ENABLE_DISK_CACHE,
+    DISK_CACHE_PATH,
+    DISK_CACHE_MAX_BYTES,
+)
+from utils import tracing
+
+#disk cache
+# Optional SQLite tier under the in-memory caches. Entries are keyed by
+# immutable ids (commit / blob sha), so they never need invalidating and
+# survive app restarts. WAL mode lets several worker processes share the
+# same file; each thread gets its own connection.
+
+_local = threading.local()
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+)
+"""
+
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+
+    directory = os.path.dirname(DISK_CACHE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(DISK_CACHE_PATH, timeout=30, isolation_level=None)
+    # auto_vacuum only takes effect on a fresh database
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(_SCHEMA)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+    )
+    _local.conn = conn
+    return conn
+
+
+def disk_get(kind: str, key: str, max_age: float = None):
+    """
+    Return the stored value, or None if missing, disabled or older than
+    max_age seconds.
+    """
+    if not ENABLE_DISK_CACHE:
+        return None
+
+    try:
+        conn = _connect()
+        row = conn.execute(
+            "SELECT value, created FROM entries WHERE kind = ? AND key = ?",
+            (kind, key),
+        ).fetchone()
+        if row is None:
+            tracing.count("cache.disk.miss")
+            return None
+
+        value, created = row
+        now = time.time()
+        if max_age is not None and now - created > max_age:
+            tracing.count("cache.disk.miss")
+            return None
+
+        conn.execute(
+            "UPDATE entries SET accessed = ? WHERE kind = ? AND key = ?",
+            (now, kind, key),
+        )
+        tracing.count("cache.disk.hit")
+        return json.loads(value)
+    except sqlite3.Error:
+        # the disk tier is best-effort; fall through to the network
+        return None
+
+
+def disk_put(kind: str, key: str, value):
+    if not ENABLE_DISK_CACHE:
+        return
+
+    payload = json.dumps(value)
+    size = len(payload)
+    if size > DISK_CACHE_MAX_BYTES:
+        return
+
+    now = time.time()
+    try:
+        conn = _connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries "
+            "(kind, key, value, size, created, accessed) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, key, payload, size, now, now),
+        )
+        _enforce_size_cap(conn)
+    except sqlite3.Error:
+        pass
+
+
+def _enforce_size_cap(conn):
+    """
+    Evict least recently accessed entries down to 90% of the cap, then
+    return the freed pages to the filesystem.
+    """
+    # cheap O(1) check before summing the table
+    (pages,) = conn.execute("PRAGMA page_count").fetchone()
+    (page_size,) = conn.execute("PRAGMA page_size").fetchone()
+    if pages * page_size <= DISK_CACHE_MAX_BYTES:
+        return
+
+    (total,) = conn.execute(
+        "SELECT COALESCE(SUM(size), 0) FROM entries"
+    ).fetchone()
+    if total <= DISK_CACHE_MAX_BYTES:
+        return
+
+    target = int(DISK_CACHE_MAX_BYTES * 0.9)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            "SELECT kind, key, size FROM entries ORDER BY accessed"
+        )
+        doomed = []
+        for kind, key, size in rows:
+            if total <= target:
+                break
+            doomed.append((kind, key))
+            total -= size
+
+        conn.executemany(
+            "DELETE FROM entries WHERE kind = ? AND key = ?",
+            doomed,
+        )
+        conn.execute("COMMIT")
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+
+    conn.execute("PRAGMA incremental_vacuum")
+
+
+def disk_stats() -> dict:
+    if not ENABLE_DISK_CACHE:
+        return {"enabled": False}
+
+    try:
+        entries, total = _connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+    except sqlite3.Error:
+        return {"enabled": True, "error": True}
+
+    return {
+        "enabled": True,
+        "entries": entries,
+        "bytes": total,
+        "max_bytes": DISK_CACHE_MAX_BYTES,
+    }
@@ -1,22 +1,29 @@
-
-import streamlit as st
+from storage.session_cache import session_state, writes_cancelled
 
 #file cache
+# Holds only (repo, blob sha) references per session; the content itself
+# lives once per process in storage.blob_store.
 def _ensure_file_cache():
-    if "file_cache" not in st.session_state:
-        st.session_state.file_cache = {}
+    return session_state().setdefault("file_cache", {})
 
 
 def get_file_cached(path: str):
-    _ensure_file_cache()
-    return st.session_state.file_cache.get(path)
+    return _ensure_file_cache().get(path)
+
+
+def set_file_cached(path: str, ref: tuple):
+    if writes_cancelled():
+        return
+    _ensure_file_cache()[path] = ref
 
 
-def set_file_cached(path: str, content: str):
-    _ensure_file_cache()
-    st.session_state.file_cache[path] = content
+def drop_file_cached(path: str):
+    state = session_state()
+    if "file_cache" in state:
+        state["file_cache"].pop(path, None)
 
 
 def clear_file_cache():
-    if "file_cache" in st.session_state:
-        del st.session_state.file_cache
+    state = session_state()
+    if "file_cache" in state:
+        del state["file_cache"]
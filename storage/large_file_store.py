@@ -0,0 +1,177 @@
+import mmap
+import os
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+
+from utils.fetch_scheduler import github_stream
+from config.settings import (
+    LARGE_FILE_DIR,
+    LARGE_FILE_DIR_MAX_BYTES,
+    LARGE_FILE_MAX_OPEN,
+)
+
+#large file store
+# Files over MAX_FILE_SIZE_KB are never decoded as a whole. Their bytes are
+# streamed from the Git blob API into a content-addressed file on local
+# disk and read back through mmap. Line offsets are indexed lazily, only
+# as far as the lines that were asked for.
+
+_CHUNK_BYTES = 1024 * 1024
+
+
+class LargeFile:
+    """
+    Read-only, memory-mapped view of one blob with line-range access.
+    """
+
+    def __init__(self, local_path: str):
+        self.path = local_path
+        with open(local_path, "rb") as f:
+            self.size = os.fstat(f.fileno()).st_size
+            self._map = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if self.size else None
+            )
+
+        # byte offset at which each line starts, filled in on demand
+        self._offsets = array("Q", [0])
+        self._indexed = self.size == 0
+        self._line_count = 0 if self.size == 0 else None
+        self._lock = threading.Lock()
+
+    def _index_until(self, line: int):
+        while len(self._offsets) < line and not self._indexed:
+            newline = self._map.find(b"\n", self._offsets[-1])
+            if newline == -1 or newline + 1 >= self.size:
+                self._indexed = True
+                self._line_count = len(self._offsets)
+                break
+            self._offsets.append(newline + 1)
+
+    def line_count(self) -> int:
+        with self._lock:
+            if self._line_count is None:
+                count = 0
+                for start in range(0, self.size, _CHUNK_BYTES):
+                    count += self._map[start:start + _CHUNK_BYTES].count(b"\n")
+                if self._map[self.size - 1:self.size] != b"\n":
+                    count += 1
+                self._line_count = count
+            return self._line_count
+
+    def read_lines(self, start_line: int, end_line: int) -> str:
+        """
+        Lines start_line..end_line (1-based, inclusive) as text.
+        """
+        with self._lock:
+            self._index_until(end_line + 1)
+            if self.size == 0 or start_line > len(self._offsets):
+                return ""
+            begin = self._offsets[start_line - 1]
+            end = (
+                self._offsets[end_line]
+                if end_line < len(self._offsets) else self.size
+            )
+
+        text = self._map[begin:end].decode("utf-8", errors="replace")
+        return text.removesuffix("\n").removesuffix("\r")
+
+
+_handles = OrderedDict()
+_handles_lock = threading.Lock()
+
+
+def _local_path(repo_full_name: str, sha: str) -> str:
+    return os.path.join(LARGE_FILE_DIR, repo_full_name.replace("/", "__"), sha)
+
+
+def _prune(keep: str):
+    """
+    Drop the least recently used blobs (never keep) once the directory
+    exceeds its byte budget. Open handles keep their mapping until released.
+    """
+    files = []
+    for root, _, names in os.walk(LARGE_FILE_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            if path == keep or name.startswith(".partial-"):
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_atime, stat.st_size, path))
+
+    total = os.path.getsize(keep) + sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= LARGE_FILE_DIR_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def _download_blob(repo, sha: str, token: str, target: str):
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+
+    fd, partial = tempfile.mkstemp(dir=directory, prefix=".partial-")
+    try:
+        with os.fdopen(fd, "wb") as f, github_stream(
+            f"{repo.url}/git/blobs/{sha}", token
+        ) as response:
+            for chunk in response.iter_content(chunk_size=_CHUNK_BYTES):
+                f.write(chunk)
+        os.replace(partial, target)
+    except Exception:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+    _prune(target)
+
+
+def open_large_file(repo_full_name: str, sha: str, local_path: str) -> LargeFile:
+    """
+    Map an existing local copy of a blob (e.g. from a snapshot).
+    """
+    key = (repo_full_name, sha)
+    with _handles_lock:
+        handle = _handles.get(key)
+        if handle is not None:
+            _handles.move_to_end(key)
+            return handle
+
+    handle = LargeFile(local_path)
+
+    with _handles_lock:
+        handle = _handles.setdefault(key, handle)
+        _handles.move_to_end(key)
+        while len(_handles) > LARGE_FILE_MAX_OPEN:
+            _handles.popitem(last=False)
+    return handle
+
+
+def fetch_large_file(repo, repo_full_name: str, sha: str, token: str) -> LargeFile:
+    """
+    Stream the blob to local disk unless it is already there, then map it.
+    """
+    local_path = _local_path(repo_full_name, sha)
+    with _handles_lock:
+        is_open = (repo_full_name, sha) in _handles
+
+    if not is_open and not os.path.exists(local_path):
+        _download_blob(repo, sha, token, local_path)
+    return open_large_file(repo_full_name, sha, local_path)
+
+
+def close_large_files():
+    """
+    Forget every mapped file; the next read maps it again.
+    """
+    with _handles_lock:
+        _handles.clear()
@@ -0,0 +1,79 @@
+
+import threading
+import time
+from collections import OrderedDict
+
+from config.settings import (
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES,
+    INTENT_CACHE_MAX_ENTRIES,
+    METRICS_CACHE_MAX_ENTRIES,
+)
+from utils import tracing
+
+#response cache
+class ResponseCache:
+    """
+    Process-wide LRU cache with a per-entry TTL for LLM results.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, name: str = "response"):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                entry = None
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        tracing.count(f"cache.{self.name}.{'miss' if entry is None else 'hit'}")
+        return entry[1] if entry is not None else None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+explanation_cache = ResponseCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS, "explanations")
+intent_cache = ResponseCache(INTENT_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS, "intents")
+
+# metrics of a blob never change, the TTL only bounds staleness of the
+# metrics engine itself across deploys
+metrics_cache = ResponseCache(METRICS_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS, "metrics")
+
+# symbol definitions per blob, produced by the same pass as its metrics
+symbols_cache = ResponseCache(METRICS_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS, "symbols")
+
+# parsed imports per blob, reused when the import graph is rebuilt
+imports_cache = ResponseCache(METRICS_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS, "imports")
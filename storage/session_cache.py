@@ -1,22 +1,98 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
 
-import streamlit as st
+from utils import tracing
 
 #session_cache
+# Per-session state lives in a plain mapping. Under `streamlit run` that is
+# st.session_state; headless callers (the HTTP service, CLI, benchmarks)
+# bind their own dict with use_session(), so Streamlit is only imported
+# when nothing is bound.
+_bound_state = ContextVar("ares_session_state", default=None)
+_write_cancel = ContextVar("ares_session_write_cancel", default=None)
+
+
+def session_state():
+    """
+    The current session's mapping: the one bound with use_session(), else
+    Streamlit's session_state.
+    """
+    state = _bound_state.get()
+    if state is not None:
+        return state
+
+    import streamlit as st
+    return st.session_state
+
+
+@contextmanager
+def use_session(state: dict):
+    """
+    Make state the session for the caches within the block (and for thread
+    pools that carry the context, e.g. tracing.in_context).
+    """
+    token = _bound_state.set(state)
+    try:
+        yield state
+    finally:
+        _bound_state.reset(token)
+
+
+@contextmanager
+def cancellable_writes(cancel_event):
+    """
+    Drop set_cached calls within the block once cancel_event is set, so a
+    cancelled background job cannot refill a session that was cleared.
+    """
+    token = _write_cancel.set(cancel_event)
+    try:
+        yield
+    finally:
+        _write_cancel.reset(token)
+
+
+def writes_cancelled() -> bool:
+    cancel_event = _write_cancel.get()
+    return cancel_event is not None and cancel_event.is_set()
+
+
 def _ensure_cache():
-    if "repo_cache" not in st.session_state:
-        st.session_state.repo_cache = {}
+    return session_state().setdefault("repo_cache", {})
 
 
 def get_cached(key: str):
-    _ensure_cache()
-    return st.session_state.repo_cache.get(key)
+    value = _ensure_cache().get(key)
+    tracing.count("cache.session.miss" if value is None else "cache.session.hit")
+    return value
 
 
 def set_cached(key: str, value):
-    _ensure_cache()
-    st.session_state.repo_cache[key] = value
+    if writes_cancelled():
+        return
+    _ensure_cache()[key] = value
 
 
 def clear_cache():
-    if "repo_cache" in st.session_state:
-        del st.session_state.repo_cache
+    state = session_state()
+    if "repo_cache" in state:
+        del state["repo_cache"]
+
+
+def start_session_thread(target, name: str = None) -> threading.Thread:
+    """
+    Start target in a daemon thread that can use this session's caches.
+    A bound session is carried over in the thread's context; Streamlit only
+    exposes session_state to threads carrying the script run context.
+    """
+    if _bound_state.get() is not None:
+        thread = threading.Thread(
+            target=copy_context().run, args=(target,), name=name, daemon=True
+        )
+    else:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        add_script_run_ctx(thread, get_script_run_ctx())
+    thread.start()
+    return thread
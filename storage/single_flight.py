@@ -0,0 +1,120 @@
+import threading
+
+from utils import tracing
+from utils.fetch_scheduler import is_background
+from config.settings import SINGLE_FLIGHT_WAIT_SECONDS
+
+#single flight
+# Concurrent callers asking for the same thing (two sessions, or a session
+# and its prefetch job) share one in-flight fetch or LLM completion instead
+# of each doing its own. Only calls that overlap in time are coalesced;
+# results are kept by the caches, not here. Waits are bounded, and a
+# foreground caller never waits on a background (prefetch) leader, which
+# only gets PREFETCH_CONCURRENCY fetch slots.
+
+
+class _Call:
+    def __init__(self, background: bool):
+        self.background = background
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.shared = 0
+
+    def join(self, key):
+        """
+        (call, leader). The leader runs the work and hands its outcome to
+        finish(); everyone else waits on result(call). A foreground caller
+        finding a background leader becomes the leader of a new call.
+        """
+        background = is_background()
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None or (call.background and not background):
+                call = self._calls[key] = _Call(background)
+                self.calls += 1
+                return call, True
+            self.shared += 1
+        tracing.count("single_flight.shared")
+        return call, False
+
+    def finish(self, key, call, value=None, error=None):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.value = value
+        call.error = error
+        call.done.set()
+
+    def wait(self, call, timeout: float = SINGLE_FLIGHT_WAIT_SECONDS) -> bool:
+        """
+        Wait for the leader; False if it did not finish within timeout.
+        """
+        if call.done.wait(timeout):
+            return True
+        tracing.count("single_flight.timeout")
+        return False
+
+    def result(self, call):
+        """
+        The leader's value, or its exception re-raised. None when the
+        leader gave up without a result or did not finish in time.
+        """
+        if not self.wait(call):
+            return None
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def do(self, key, fn):
+        """
+        fn() once for all concurrent callers with the same key.
+        """
+        call, leader = self.join(key)
+        if not leader:
+            if self.wait(call):
+                return self.result(call)
+            # the leader is stuck; do not hold this caller with it
+            return fn()
+
+        try:
+            value = fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "shared": self.shared,
+                "in_flight": len(self._calls),
+            }
+
+
+# blob and file content reads
+file_flights = SingleFlight()
+
+# branch heads, trees, compares, README, requirements and snapshots
+repo_flights = SingleFlight()
+
+# LLM explanations, keyed like explanation_cache
+llm_flights = SingleFlight()
+
+
+def single_flight_stats() -> dict:
+    return {
+        "files": file_flights.stats(),
+        "repo": repo_flights.stats(),
+        "llm": llm_flights.stats(),
+    }
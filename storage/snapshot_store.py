@@ -0,0 +1,134 @@
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tarfile
+import tempfile
+
+from storage.dir_budget import prune_dirs, touch
+from utils.fetch_scheduler import github_stream, run
+from config.settings import SNAPSHOT_DIR, SNAPSHOT_DIR_MAX_BYTES
+
+#snapshot store
+# Whole-repo snapshots: one tarball download per commit, extracted to local
+# disk and read back through mmap. Extraction happens in a temp directory
+# that is renamed into place, so concurrent workers never see a partial
+# snapshot. Old commits are pruned to SNAPSHOT_DIR_MAX_BYTES.
+
+_MANIFEST = "manifest.json"
+_FILES = "files"
+
+
+def _snapshot_dir(repo_full_name: str, sha: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, repo_full_name.replace("/", "__"), sha)
+
+
+def _git_blob_sha(data: bytes) -> str:
+    header = f"blob {len(data)}\0".encode()
+    return hashlib.sha1(header + data).hexdigest()
+
+
+def _download(url: str, target):
+    # the archive link is pre-signed; it needs no token
+    with github_stream(url, accept="*/*") as response:
+        for chunk in response.iter_content(chunk_size=1024 * 1024):
+            target.write(chunk)
+
+
+def _extract(archive_path: str, destination: str) -> dict:
+    """
+    Extract regular files, dropping the archive's top-level
+    "<owner>-<repo>-<sha>/" directory. Returns path -> [blob sha, size].
+    """
+    manifest = {}
+    files_root = os.path.join(destination, _FILES)
+
+    with tarfile.open(archive_path, "r:gz") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+
+            _, _, path = member.name.partition("/")
+            parts = path.split("/")
+            if not path or any(part in ("", ".", "..") for part in parts):
+                continue
+
+            data = archive.extractfile(member).read()
+            target = os.path.join(files_root, *parts)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(data)
+
+            manifest[path] = [_git_blob_sha(data), len(data)]
+
+    return manifest
+
+
+def ensure_snapshot(repo, repo_full_name: str, sha: str) -> dict:
+    """
+    Download and extract the tarball for sha unless it is already on disk.
+    Returns the manifest (path -> [blob sha, size]).
+    """
+    manifest = load_manifest(repo_full_name, sha)
+    if manifest is not None:
+        return manifest
+
+    final_dir = _snapshot_dir(repo_full_name, sha)
+    parent = os.path.dirname(final_dir)
+    os.makedirs(parent, exist_ok=True)
+
+    work_dir = tempfile.mkdtemp(dir=parent, prefix=".partial-")
+    try:
+        archive_path = os.path.join(work_dir, "archive.tar.gz")
+        with open(archive_path, "wb") as f:
+            _download(run(repo.get_archive_link, "tarball", ref=sha), f)
+
+        manifest = _extract(archive_path, work_dir)
+        os.remove(archive_path)
+
+        with open(os.path.join(work_dir, _MANIFEST), "w") as f:
+            json.dump(manifest, f)
+
+        try:
+            os.rename(work_dir, final_dir)
+        except OSError:
+            # another worker finished the same snapshot first
+            shutil.rmtree(work_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+
+    prune_dirs(SNAPSHOT_DIR, 2, SNAPSHOT_DIR_MAX_BYTES, keep=final_dir)
+    return load_manifest(repo_full_name, sha)
+
+
+def load_manifest(repo_full_name: str, sha: str):
+    directory = _snapshot_dir(repo_full_name, sha)
+    try:
+        with open(os.path.join(directory, _MANIFEST)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    touch(directory)
+    return manifest
+
+
+def snapshot_file_path(repo_full_name: str, sha: str, path: str) -> str:
+    return os.path.join(_snapshot_dir(repo_full_name, sha), _FILES, *path.split("/"))
+
+
+def read_snapshot_bytes(repo_full_name: str, sha: str, path: str):
+    """
+    Memory-mapped read of one file; None if the snapshot or file is missing.
+    """
+    local_path = snapshot_file_path(repo_full_name, sha, path)
+    try:
+        with open(local_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[:]
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from storage.dir_budget import prune_dirs, touch
+from config.settings import TRIGRAM_INDEX_DIR, TRIGRAM_INDEX_DIR_MAX_BYTES
+
+#trigram index
+# Inverted index from byte trigrams to the files containing them, kept as
+# three flat numpy arrays (CSR): sorted trigram keys, offsets into the
+# postings, and file ids. Content is ASCII-lowercased before indexing, so
+# one index narrows down both case-sensitive and case-insensitive
+# searches. Saved per commit as .npy files that are memory-mapped on load;
+# old commits are pruned to TRIGRAM_INDEX_DIR_MAX_BYTES.
+
+_EMPTY = np.empty(0, dtype=np.uint32)
+
+
+def trigrams_of(data: bytes) -> np.ndarray:
+    """
+    Sorted unique trigrams of data, each packed into one uint32.
+    """
+    if len(data) < 3:
+        return _EMPTY
+    codes = np.frombuffer(data.lower(), dtype=np.uint8).astype(np.uint32)
+    return np.unique((codes[:-2] << 16) | (codes[1:-1] << 8) | codes[2:])
+
+
+def _compress(trigrams: np.ndarray, postings: np.ndarray):
+    """
+    (trigram, file id) pairs -> (keys, offsets, postings), postings sorted
+    by file id within each trigram.
+    """
+    order = np.lexsort((postings, trigrams))
+    trigrams = trigrams[order]
+    postings = postings[order]
+    keys, starts = np.unique(trigrams, return_index=True)
+    offsets = np.append(starts, len(trigrams)).astype(np.int64)
+    return keys, offsets, postings
+
+
+class TrigramIndex:
+    def __init__(self, paths, keys, offsets, postings):
+        self.paths = paths
+        self.keys = keys
+        self.offsets = offsets
+        self.postings = postings
+
+    @classmethod
+    def build(cls, documents) -> "TrigramIndex":
+        """
+        documents: [(path, content bytes)].
+        """
+        paths = [path for path, _ in documents]
+        per_file = [trigrams_of(data) for _, data in documents]
+        return cls(paths, *cls._pairs_to_csr(per_file, 0))
+
+    @staticmethod
+    def _pairs_to_csr(per_file, first_id, trigrams=_EMPTY, postings=_EMPTY):
+        lengths = [len(t) for t in per_file]
+        new_trigrams = np.concatenate([trigrams, *per_file]).astype(np.uint32)
+        new_postings = np.concatenate([
+            postings,
+            np.repeat(
+                np.arange(first_id, first_id + len(per_file), dtype=np.uint32),
+                lengths,
+            ),
+        ]).astype(np.uint32)
+        return _compress(new_trigrams, new_postings)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def _posting_list(self, trigram: int) -> np.ndarray:
+        i = np.searchsorted(self.keys, trigram)
+        if i == len(self.keys) or self.keys[i] != trigram:
+            return _EMPTY
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def candidates(self, trigrams) -> list:
+        """
+        Paths containing every trigram, or all paths if none are given.
+        """
+        trigrams = np.unique(np.asarray(trigrams, dtype=np.uint32))
+        if not len(trigrams):
+            return list(self.paths)
+
+        # intersect the shortest posting lists first
+        lists = sorted((self._posting_list(t) for t in trigrams), key=len)
+        result = lists[0]
+        for postings in lists[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, postings, assume_unique=True)
+        return [self.paths[i] for i in result.tolist()]
+
+    def patched(self, removed, documents) -> "TrigramIndex":
+        """
+        New index without the removed paths and with documents added
+        (or replaced), without re-reading any unchanged file.
+        """
+        replaced = set(removed) | {path for path, _ in documents}
+        keep = np.array(
+            [path not in replaced for path in self.paths], dtype=bool
+        )
+        remap = np.cumsum(keep, dtype=np.int64) - 1
+
+        counts = np.diff(self.offsets)
+        trigrams = np.repeat(self.keys, counts)
+        mask = keep[self.postings]
+        postings = remap[self.postings[mask]].astype(np.uint32)
+
+        paths = [path for path, kept in zip(self.paths, keep.tolist()) if kept]
+        per_file = [trigrams_of(data) for _, data in documents]
+        csr = self._pairs_to_csr(per_file, len(paths), trigrams[mask], postings)
+        return TrigramIndex(paths + [path for path, _ in documents], *csr)
+
+
+def _index_dir(repo_full_name: str, sha: str) -> str:
+    return os.path.join(TRIGRAM_INDEX_DIR, repo_full_name.replace("/", "__"), sha)
+
+
+def save_trigram_index(repo_full_name: str, sha: str, index: TrigramIndex):
+    final_dir = _index_dir(repo_full_name, sha)
+    if os.path.exists(final_dir):
+        return
+
+    parent = os.path.dirname(final_dir)
+    os.makedirs(parent, exist_ok=True)
+    work_dir = tempfile.mkdtemp(dir=parent, prefix=".partial-")
+
+    for name in ("keys", "offsets", "postings"):
+        np.save(os.path.join(work_dir, f"{name}.npy"), getattr(index, name))
+    with open(os.path.join(work_dir, "paths.json"), "w") as f:
+        json.dump(index.paths, f)
+
+    try:
+        os.rename(work_dir, final_dir)
+    except OSError:
+        # another worker saved the same commit first
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    prune_dirs(TRIGRAM_INDEX_DIR, 2, TRIGRAM_INDEX_DIR_MAX_BYTES, keep=final_dir)
+
+
+def load_trigram_index(repo_full_name: str, sha: str):
+    directory = _index_dir(repo_full_name, sha)
+    try:
+        with open(os.path.join(directory, "paths.json")) as f:
+            paths = json.load(f)
+    except FileNotFoundError:
+        return None
+    touch(directory)
+
+    arrays = [
+        np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+        for name in ("keys", "offsets", "postings")
+    ]
+    return TrigramIndex(paths, *arrays)
@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+
+import faiss
+import numpy as np
+
+from storage.dir_budget import prune_dirs, touch
+from config.settings import VECTOR_INDEX_DIR, VECTOR_INDEX_DIR_MAX_BYTES
+
+#vector store
+# Chunk-level FAISS index for one commit. Vectors are normalised, so an
+# inner-product index ranks by cosine similarity; the IDMap lets a refresh
+# remove the chunks of changed files instead of rebuilding everything.
+# Indexes are persisted per (repo, commit, embedder) and never modified
+# on disk afterwards; old ones are pruned to VECTOR_INDEX_DIR_MAX_BYTES.
+
+
+class VectorIndex:
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        # chunk id -> (path, start line, end line)
+        self.chunks = {}
+        self.next_id = 0
+        self.build_seconds = 0.0
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    def files(self) -> int:
+        return len({path for path, _, _ in self.chunks.values()})
+
+    def add(self, chunks, vectors: np.ndarray):
+        """
+        chunks: [(path, start line, end line)], one per row of vectors.
+        """
+        if not chunks:
+            return
+        ids = np.arange(self.next_id, self.next_id + len(chunks), dtype=np.int64)
+        self.index.add_with_ids(vectors, ids)
+        for chunk_id, chunk in zip(ids.tolist(), chunks):
+            self.chunks[chunk_id] = tuple(chunk)
+        self.next_id += len(chunks)
+
+    def remove_paths(self, paths):
+        stale = [
+            chunk_id for chunk_id, (path, _, _) in self.chunks.items()
+            if path in paths
+        ]
+        if not stale:
+            return
+        self.index.remove_ids(np.array(stale, dtype=np.int64))
+        for chunk_id in stale:
+            del self.chunks[chunk_id]
+
+    def search(self, vector: np.ndarray, k: int):
+        """
+        [(score, path, start line, end line)], best first.
+        """
+        if not len(self):
+            return []
+        scores, ids = self.index.search(vector.reshape(1, -1), min(k, len(self)))
+        return [
+            (float(score), *self.chunks[chunk_id])
+            for score, chunk_id in zip(scores[0].tolist(), ids[0].tolist())
+            if chunk_id != -1
+        ]
+
+    def copy(self) -> "VectorIndex":
+        clone = VectorIndex(self.dim)
+        clone.index = faiss.clone_index(self.index)
+        clone.chunks = dict(self.chunks)
+        clone.next_id = self.next_id
+        clone.build_seconds = self.build_seconds
+        return clone
+
+
+def _index_dir(repo_full_name: str, sha: str, embedder: str) -> str:
+    return os.path.join(
+        VECTOR_INDEX_DIR, repo_full_name.replace("/", "__"), embedder, sha
+    )
+
+
+def save_vector_index(repo_full_name: str, sha: str, embedder: str, index: VectorIndex):
+    final_dir = _index_dir(repo_full_name, sha, embedder)
+    if os.path.exists(final_dir):
+        return
+
+    parent = os.path.dirname(final_dir)
+    os.makedirs(parent, exist_ok=True)
+    work_dir = tempfile.mkdtemp(dir=parent, prefix=".partial-")
+
+    faiss.write_index(index.index, os.path.join(work_dir, "index.faiss"))
+    with open(os.path.join(work_dir, "chunks.json"), "w") as f:
+        json.dump({
+            "dim": index.dim,
+            "next_id": index.next_id,
+            "build_seconds": index.build_seconds,
+            "chunks": [[chunk_id, *chunk] for chunk_id, chunk in index.chunks.items()],
+        }, f)
+
+    try:
+        os.rename(work_dir, final_dir)
+    except OSError:
+        # another worker saved the same commit first
+        for name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, name))
+        os.rmdir(work_dir)
+
+    prune_dirs(VECTOR_INDEX_DIR, 3, VECTOR_INDEX_DIR_MAX_BYTES, keep=final_dir)
+
+
+def load_vector_index(repo_full_name: str, sha: str, embedder: str):
+    directory = _index_dir(repo_full_name, sha, embedder)
+    try:
+        with open(os.path.join(directory, "chunks.json")) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    touch(directory)
+
+    index = VectorIndex(meta["dim"])
+    index.index = faiss.read_index(os.path.join(directory, "index.faiss"))
+    index.chunks = {
+        chunk_id: (path, start, end)
+        for chunk_id, path, start, end in meta["chunks"]
+    }
+    index.next_id = meta["next_id"]
+    index.build_seconds = meta["build_seconds"]
+    return index
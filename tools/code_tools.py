@@ -1,6 +1,26 @@
 from utils.language_utils import detect_language_from_path
+from utils.token_utils import count_tokens
+from storage.response_cache import explanation_cache, metrics_cache, symbols_cache
+from storage.single_flight import llm_flights
+from utils import tracing
+from tools.metrics_tools import analyze_file
+from config.prompts import CHUNK_EXPLAIN_PROMPT, MERGE_EXPLANATIONS_PROMPT
+from config.settings import (
+    EXPLAIN_CHUNK_TOKENS,
+    EXPLAIN_TOKEN_BUDGET,
+    EXPLAIN_CONCURRENCY,
+)
+from concurrent.futures import ThreadPoolExecutor
 import ast
+import hashlib
+import time
 
+# one pool for the chunk and merge calls of every explanation in the
+# process, so concurrent requests share EXPLAIN_CONCURRENCY LLM calls
+# instead of each starting their own
+_explain_pool = ThreadPoolExecutor(
+    max_workers=EXPLAIN_CONCURRENCY, thread_name_prefix="explain"
+)
 
 
 def detect_language(path: str) -> str:
@@ -8,18 +28,41 @@ def detect_language(path: str) -> str:
 
 
 
-def code_metrics(content: str, language: str) -> dict:
-    if language != "python":
-        raise NotImplementedError("Metrics only supported for Python")
+def code_metrics(content: str, language: str, blob_sha: str = None) -> dict:
+    """
+    Metrics for one file, cached per blob sha (content hash if unknown).
+    """
+    if blob_sha is None:
+        blob_sha = hashlib.sha1(content.encode()).hexdigest()
 
-    tree = ast.parse(content)
+    key = (blob_sha, language)
+    cached = metrics_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    metrics, symbols = analyze_file(content, language)
+    metrics_cache.set(key, metrics)
+    symbols_cache.set(key, symbols)
+    return dict(metrics)
+
+
+def code_symbols(content: str, language: str, blob_sha: str = None) -> list:
+    """
+    Symbol definitions of one file, cached per blob sha alongside its
+    metrics.
+    """
+    if blob_sha is None:
+        blob_sha = hashlib.sha1(content.encode()).hexdigest()
 
-    return {
-        "lines": len(content.splitlines()),
-        "functions": sum(isinstance(n, ast.FunctionDef) for n in ast.walk(tree)),
-        "classes": sum(isinstance(n, ast.ClassDef) for n in ast.walk(tree)),
-        "imports": sum(isinstance(n, (ast.Import, ast.ImportFrom)) for n in ast.walk(tree)),
-    }
+    key = (blob_sha, language)
+    cached = symbols_cache.get(key)
+    if cached is not None:
+        return list(cached)
+
+    metrics, symbols = analyze_file(content, language)
+    metrics_cache.set(key, metrics)
+    symbols_cache.set(key, symbols)
+    return list(symbols)
 
 
 def format_metrics(metrics: dict) -> str:
@@ -27,20 +70,388 @@ def format_metrics(metrics: dict) -> str:
 
 
 
-def explain_code(content, language, llm, system_prompt):
+def _explanation_key(llm, system_prompt, content, blob_sha, line_range):
+    """
+    (model, system prompt hash, blob sha, slice range). The content hash
+    stands in for the blob sha when the caller does not know it.
+    """
+    model = _model_name(llm)
+    prompt_hash = hashlib.sha256(system_prompt.encode()).hexdigest()
+    if blob_sha is None:
+        blob_sha = hashlib.sha1(content.encode()).hexdigest()
+    return (model, prompt_hash, blob_sha, line_range)
+
+
+def _model_name(llm) -> str:
+    return getattr(llm, "model", type(llm).__name__)
+
+
+def _prompt_tokens(messages) -> int:
+    return sum(count_tokens(message["content"]) for message in messages)
+
+
+def _invoke(llm, messages) -> str:
+    """
+    llm.invoke traced with its token counts.
+    """
+    prompt_tokens = _prompt_tokens(messages)
+    with tracing.span(
+        "llm.invoke", model=_model_name(llm), prompt_tokens=prompt_tokens
+    ) as span:
+        answer = llm.invoke(messages).content
+        completion_tokens = count_tokens(answer)
+        span.set(completion_tokens=completion_tokens)
+    tracing.count("llm.prompt_tokens", prompt_tokens)
+    tracing.count("llm.completion_tokens", completion_tokens)
+    return answer
+
+
+def _stream(llm, messages):
+    """
+    llm.stream traced with its token counts once the stream completes.
+    """
+    started = time.perf_counter()
+    prompt_tokens = _prompt_tokens(messages)
+    parts = []
+    for chunk in llm.stream(messages):
+        parts.append(chunk)
+        yield chunk
+
+    completion_tokens = count_tokens("".join(parts))
+    tracing.record(
+        "llm.stream",
+        started,
+        model=_model_name(llm),
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+    )
+    tracing.count("llm.prompt_tokens", prompt_tokens)
+    tracing.count("llm.completion_tokens", completion_tokens)
+
+
+def _shared_answer(key, compute):
+    """
+    compute() once for concurrent identical requests; the answer is cached.
+    """
+    def complete():
+        answer = compute()
+        explanation_cache.set(key, answer)
+        return answer
+
+    answer = llm_flights.do(key, complete)
+    if answer is None:
+        # joined a stream that was abandoned before it finished
+        answer = complete()
+    return answer
+
+
+def _shared_stream(key, chunks, suffix=""):
+    """
+    Yield chunks() (then suffix) as they are generated and cache the full
+    text once the stream completes. An identical request made meanwhile
+    waits for that text instead of starting its own completion.
+    """
+    call, leader = llm_flights.join(key)
+    if not leader:
+        answer = llm_flights.result(call)
+        if answer is not None:
+            yield answer
+            return
+        call = None
+
+    parts = []
+    try:
+        for chunk in chunks():
+            parts.append(chunk)
+            yield chunk
+        if suffix:
+            parts.append(suffix)
+            yield suffix
+    except BaseException as e:
+        if call is not None:
+            # an abandoned stream hands waiters nothing; they compute their own
+            error = None if isinstance(e, GeneratorExit) else e
+            llm_flights.finish(key, call, error=error)
+        raise
+
+    answer = "".join(parts)
+    explanation_cache.set(key, answer)
+    if call is not None:
+        llm_flights.finish(key, call, answer)
+
+
+def _cached_invoke(llm, messages, key):
+    cached = explanation_cache.get(key)
+    if cached is not None:
+        return cached
+
+    return _shared_answer(key, lambda: _invoke(llm, messages))
+
+
+def _cached_stream(llm, messages, key):
+    """
+    Yield the answer as it is generated; the full text is cached only once
+    the stream completes.
+    """
+    cached = explanation_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    if not hasattr(llm, "stream"):
+        yield _shared_answer(key, lambda: _invoke(llm, messages))
+        return
+
+    yield from _shared_stream(key, lambda: _stream(llm, messages))
+
+
+def _pack_lines(lines, first_line, max_tokens):
+    """
+    Greedily pack lines into (start_line, end_line, text) chunks of at
+    most max_tokens each.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    start = first_line
+
+    for offset, line in enumerate(lines):
+        tokens = count_tokens(line) + 1
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append((start, start + len(current) - 1, "\n".join(current)))
+            start = first_line + offset
+            current = []
+            current_tokens = 0
+        current.append(line)
+        current_tokens += tokens
+
+    if current:
+        chunks.append((start, start + len(current) - 1, "\n".join(current)))
+    return chunks
+
+
+def _python_segments(content):
+    """
+    Line ranges that start at each top-level statement (decorators
+    included), so chunks never cut a function or class in half.
+    """
+    tree = ast.parse(content)
+    starts = [1]
+    for node in tree.body:
+        decorators = getattr(node, "decorator_list", [])
+        start = min([node.lineno] + [d.lineno for d in decorators])
+        if start > starts[-1]:
+            starts.append(start)
+
+    total = len(content.splitlines())
+    ends = [start - 1 for start in starts[1:]] + [total]
+    return list(zip(starts, ends))
+
+
+def chunk_code(content, language, max_tokens, first_line=1):
+    """
+    Split content into (start_line, end_line, text) chunks of at most
+    max_tokens. Python is split on top-level statement boundaries; other
+    languages (and oversized statements) are split on line boundaries.
+    """
+    lines = content.splitlines()
+
+    if language != "python":
+        return _pack_lines(lines, first_line, max_tokens)
+
+    try:
+        segments = _python_segments(content)
+    except SyntaxError:
+        return _pack_lines(lines, first_line, max_tokens)
+
+    chunks = []
+    current_start = None
+    current_end = None
+    current_tokens = 0
+
+    def flush():
+        if current_start is not None:
+            text = "\n".join(lines[current_start - 1:current_end])
+            chunks.append(
+                (current_start + first_line - 1, current_end + first_line - 1, text)
+            )
+
+    for start, end in segments:
+        text = "\n".join(lines[start - 1:end])
+        tokens = count_tokens(text)
+
+        if tokens > max_tokens:
+            flush()
+            current_start = None
+            current_tokens = 0
+            chunks.extend(
+                _pack_lines(lines[start - 1:end], start + first_line - 1, max_tokens)
+            )
+            continue
+
+        if current_start is not None and current_tokens + tokens > max_tokens:
+            flush()
+            current_start = None
+            current_tokens = 0
+
+        if current_start is None:
+            current_start = start
+        current_end = end
+        current_tokens += tokens
+
+    flush()
+    return chunks
+
+
+def _explain_chunks(chunks, llm, system_prompt, blob_sha):
+    """
+    Map step: explain every chunk concurrently. Each chunk is cached on
+    its own, so a later explanation of the same blob reuses them.
+    """
+    total = len(chunks)
+
+    def explain(indexed):
+        index, (start, end, text) = indexed
+        header = CHUNK_EXPLAIN_PROMPT.format(
+            index=index + 1,
+            total=total,
+            start_line=start,
+            end_line=end,
+        )
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": header + text},
+        ]
+        key = _explanation_key(llm, system_prompt, text, blob_sha, ("chunk", start, end))
+        return _cached_invoke(llm, messages, key)
+
+    return list(_explain_pool.map(tracing.in_context(explain), enumerate(chunks)))
+
+
+def _merge_messages(system_prompt, partials):
+    body = "\n\n".join(
+        f"--- Part {i + 1} ---\n{text}" for i, text in enumerate(partials)
+    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": MERGE_EXPLANATIONS_PROMPT + body},
+    ]
+
+
+def _reduce_partials(partials, llm, system_prompt):
+    """
+    Merge partial explanations in groups until they fit into one final
+    merge request.
+    """
+    while len(partials) > 1 and count_tokens("\n\n".join(partials)) > EXPLAIN_CHUNK_TOKENS:
+        groups = []
+        current = []
+        current_tokens = 0
+        for text in partials:
+            tokens = count_tokens(text)
+            if current and current_tokens + tokens > EXPLAIN_CHUNK_TOKENS:
+                groups.append(current)
+                current = []
+                current_tokens = 0
+            current.append(text)
+            current_tokens += tokens
+        groups.append(current)
+
+        # nothing left to combine
+        if len(groups) == len(partials):
+            break
+
+        def merge(group):
+            key = _explanation_key(llm, system_prompt, "\n\n".join(group), None, "merge")
+            return _cached_invoke(llm, _merge_messages(system_prompt, group), key)
+
+        partials = list(_explain_pool.map(tracing.in_context(merge), groups))
+
+    return partials
+
+
+def _budget_note(chunks, explained, tokens_used):
+    note = (
+        f"\n\n---\nToken budget: ~{tokens_used:,} of {EXPLAIN_TOKEN_BUDGET:,} "
+        f"input tokens across {len(explained)} chunk(s), "
+        f"lines {explained[0][0]}-{explained[-1][1]}."
+    )
+    if len(explained) < len(chunks):
+        note += (
+            f" Lines {chunks[len(explained)][0]}-{chunks[-1][1]} exceeded the "
+            f"budget and were not explained."
+        )
+    return note
+
+
+def _explain_large(content, language, llm, system_prompt, key, blob_sha, first_line, stream):
+    """
+    Map-reduce explanation for content over EXPLAIN_CHUNK_TOKENS.
+    """
+    cached = explanation_cache.get(key)
+    if cached is not None:
+        return iter([cached]) if stream else cached
+
+    chunks = chunk_code(content, language, EXPLAIN_CHUNK_TOKENS, first_line)
+
+    explained = []
+    tokens_used = 0
+    for chunk in chunks:
+        tokens = count_tokens(chunk[2])
+        if explained and tokens_used + tokens > EXPLAIN_TOKEN_BUDGET:
+            break
+        explained.append(chunk)
+        tokens_used += tokens
+
+    partials = _explain_chunks(explained, llm, system_prompt, blob_sha)
+    partials = _reduce_partials(partials, llm, system_prompt)
+    messages = _merge_messages(system_prompt, partials)
+    note = _budget_note(chunks, explained, tokens_used)
+
+    if not stream:
+        return _shared_answer(key, lambda: _invoke(llm, messages) + note)
+
+    if not hasattr(llm, "stream"):
+        return iter([_shared_answer(key, lambda: _invoke(llm, messages) + note)])
+
+    return _shared_stream(key, lambda: _stream(llm, messages), note)
+
+
+def explain_code(content, language, llm, system_prompt, blob_sha=None, stream=False):
+    key = _explanation_key(llm, system_prompt, content, blob_sha, None)
+
+    if count_tokens(content) > EXPLAIN_CHUNK_TOKENS:
+        return _explain_large(
+            content, language, llm, system_prompt, key, blob_sha, 1, stream
+        )
+
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": content},
     ]
-    return llm.invoke(messages).content
+    if stream:
+        return _cached_stream(llm, messages, key)
+    return _cached_invoke(llm, messages, key)
 
 
-def explain_code_slice(content, language, start_line, end_line, llm, system_prompt):
-    lines = content.splitlines()
-    slice_content = "\n".join(lines[start_line - 1:end_line])
+def explain_code_slice(slice_content, language, start_line, end_line, llm, system_prompt, blob_sha=None, stream=False):
+    """
+    slice_content holds only lines start_line..end_line of the file, so
+    large files never have to be loaded whole.
+    """
+    key = _explanation_key(
+        llm, system_prompt, slice_content, blob_sha, (start_line, end_line)
+    )
+
+    if count_tokens(slice_content) > EXPLAIN_CHUNK_TOKENS:
+        return _explain_large(
+            slice_content, language, llm, system_prompt, key, blob_sha, start_line, stream
+        )
 
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": slice_content},
     ]
-    return llm.invoke(messages).content
+    if stream:
+        return _cached_stream(llm, messages, key)
+    return _cached_invoke(llm, messages, key)
@@ -1,5 +1,8 @@
 
 import ast
+import sys
+from array import array
+from collections import deque
 
 
 def extract_imports(content: str, language: str):
@@ -30,3 +33,236 @@ def format_dependency_graph(graph):
     for dep in graph["direct_dependencies"]:
         lines.append(f"- {dep}")
     return "\n".join(lines)
+
+
+def extract_module_imports(content: str):
+    """
+    Every import statement in a Python file as (module, level, names):
+    `import a.b` -> ("a.b", 0, []), `from ..c import d` -> ("c", 2, ["d"]).
+    """
+    tree = ast.parse(content)
+    imports = []
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for n in node.names:
+                imports.append((n.name, 0, []))
+        elif isinstance(node, ast.ImportFrom):
+            imports.append((
+                node.module or "",
+                node.level,
+                [n.name for n in node.names if n.name != "*"],
+            ))
+
+    return imports
+
+
+def module_name_for_path(path: str):
+    """
+    "utils/github_client.py" -> "utils.github_client",
+    "pkg/__init__.py" -> "pkg". A leading src/ directory is dropped.
+    """
+    if not path.endswith(".py"):
+        return None
+
+    parts = path[:-3].split("/")
+    if parts[0] == "src" and len(parts) > 1:
+        parts = parts[1:]
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts) if parts else None
+
+
+def resolve_import(module: str, level: int, names, importer: str, is_package: bool, known: set):
+    """
+    Resolve one import to the in-repo modules it refers to.
+    Returns (internal modules, external top-level name or None).
+    """
+    if level:
+        base = importer.split(".") if is_package else importer.split(".")[:-1]
+        if level > 1:
+            base = base[:-(level - 1)] if level - 1 <= len(base) else []
+        target = ".".join(base + ([module] if module else []))
+    else:
+        target = module
+
+    resolved = set()
+
+    # `from pkg import submodule` imports the submodule itself
+    for name in names:
+        candidate = f"{target}.{name}" if target else name
+        if candidate in known:
+            resolved.add(candidate)
+
+    # otherwise the longest known prefix of the module path
+    parts = target.split(".") if target and not resolved else []
+    while parts:
+        candidate = ".".join(parts)
+        if candidate in known:
+            resolved.add(candidate)
+            break
+        parts.pop()
+
+    if resolved or level:
+        return resolved, None
+    return resolved, module.split(".")[0]
+
+
+class ImportGraph:
+    """
+    Module-level import graph stored as compact adjacency arrays.
+
+    Nodes are module names; internal modules come first, followed by
+    external (stdlib / third-party) top-level names. Forward and reverse
+    edges are kept in CSR form: the neighbours of node i are
+    targets[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, modules: dict, edges: dict):
+        """
+        modules: internal module name -> path
+        edges: internal module name -> set of imported node names
+        """
+        internal = sorted(modules)
+        external = sorted(
+            {t for targets in edges.values() for t in targets} - set(modules)
+        )
+
+        self.nodes = internal + external
+        self.index = {name: i for i, name in enumerate(self.nodes)}
+        self.paths = modules
+        self._modules_by_path = {path: name for name, path in modules.items()}
+        self.internal_count = len(internal)
+
+        forward = [[] for _ in self.nodes]
+        reverse = [[] for _ in self.nodes]
+        for source, targets in edges.items():
+            i = self.index[source]
+            for target in targets:
+                j = self.index[target]
+                forward[i].append(j)
+                reverse[j].append(i)
+
+        self._forward = self._compact(forward)
+        self._reverse = self._compact(reverse)
+
+    @staticmethod
+    def _compact(adjacency):
+        offsets = array("I", [0])
+        targets = array("I")
+        for neighbours in adjacency:
+            targets.extend(sorted(neighbours))
+            offsets.append(len(targets))
+        return offsets, targets
+
+    def _neighbours(self, csr, i):
+        offsets, targets = csr
+        return targets[offsets[i]:offsets[i + 1]]
+
+    def is_internal(self, name: str) -> bool:
+        i = self.index.get(name)
+        return i is not None and i < self.internal_count
+
+    def classify(self, name: str) -> str:
+        if self.is_internal(name):
+            return "internal"
+        if name in sys.stdlib_module_names:
+            return "stdlib"
+        return "third-party"
+
+    def module_for_path(self, path: str):
+        return self._modules_by_path.get(path)
+
+    def dependencies(self, name: str) -> list:
+        i = self.index.get(name)
+        if i is None:
+            return []
+        return [self.nodes[j] for j in self._neighbours(self._forward, i)]
+
+    def dependents(self, name: str) -> list:
+        i = self.index.get(name)
+        if i is None:
+            return []
+        return [self.nodes[j] for j in self._neighbours(self._reverse, i)]
+
+    def _closure(self, csr, name):
+        start = self.index.get(name)
+        if start is None:
+            return []
+
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            for j in self._neighbours(csr, i):
+                if j not in seen:
+                    seen.add(j)
+                    queue.append(j)
+
+        seen.discard(start)
+        return sorted(self.nodes[i] for i in seen)
+
+    def transitive_dependencies(self, name: str) -> list:
+        return self._closure(self._forward, name)
+
+    def transitive_dependents(self, name: str) -> list:
+        return self._closure(self._reverse, name)
+
+    def cycles(self) -> list:
+        """
+        Strongly connected components of internal modules that form an
+        import cycle (Tarjan's algorithm, iterative).
+        """
+        counter = 0
+        index = {}
+        low = {}
+        on_stack = set()
+        stack = []
+        components = []
+
+        for root in range(self.internal_count):
+            if root in index:
+                continue
+
+            work = [(root, 0)]
+            while work:
+                node, child_pos = work.pop()
+                if child_pos == 0:
+                    index[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack.add(node)
+
+                neighbours = self._neighbours(self._forward, node)
+                recurse = False
+                for pos in range(child_pos, len(neighbours)):
+                    nxt = neighbours[pos]
+                    if nxt >= self.internal_count:
+                        continue
+                    if nxt not in index:
+                        work.append((node, pos + 1))
+                        work.append((nxt, 0))
+                        recurse = True
+                        break
+                    if nxt in on_stack:
+                        low[node] = min(low[node], index[nxt])
+                if recurse:
+                    continue
+
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    self_loop = node in neighbours
+                    if len(component) > 1 or self_loop:
+                        components.append(sorted(self.nodes[i] for i in component))
+
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+
+        return sorted(components)
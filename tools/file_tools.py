@@ -1,20 +1,252 @@
-from utils.github_client import get_repo
 from storage.file_cache import get_file_cached, set_file_cached
+from storage.session_cache import get_cached
+from storage.blob_store import get_blob, put_blob
+from storage.disk_cache import disk_get, disk_put
+from storage.snapshot_store import read_snapshot_bytes, snapshot_file_path
+from storage.large_file_store import open_large_file, fetch_large_file
+from storage.single_flight import file_flights
+from tools.repo_tools import get_blob_sha, get_file_size, get_head_sha
+from utils.fetch_scheduler import github_stream, imap, run
+from utils.tracing import traced
 from config.settings import MAX_FILE_SIZE_KB
 #file tools
 
-def get_file_content(path: str) -> str:
-    cached = get_file_cached(path)
-    if cached:
+
+class FileTooLargeError(ValueError):
+    """
+    The file is over MAX_FILE_SIZE_KB; it can still be read by line range.
+    """
+
+    def __init__(self, size: int, blob_sha: str = None):
+        super().__init__(
+            f"File too large: {size / 1024:.2f} KB. "
+            f"Ask for a line range instead, e.g. lines 1-200."
+        )
+        self.size = size
+        self.blob_sha = blob_sha
+
+
+def _snapshot_content(ctx, path: str):
+    """
+    Read path from the local snapshot, or None when the snapshot does not
+    hold the current version of the file (e.g. it changed in a newer commit).
+    """
+    # resolving the blob sha loads the snapshot on first use
+    current_sha = get_blob_sha(ctx, path)
+
+    snapshot = get_cached(f"snapshot:{ctx.full_name}")
+    if not snapshot:
+        return None
+
+    blob_sha = snapshot["blobs"].get(path)
+    if blob_sha is None or blob_sha != current_sha:
+        return None
+
+    data = read_snapshot_bytes(ctx.full_name, snapshot["sha"], path)
+    if data is None:
+        return None
+
+    if len(data) > MAX_FILE_SIZE_KB * 1024:
+        raise FileTooLargeError(len(data), blob_sha)
+
+    return data.decode()
+
+
+def _read_blob(ctx, sha: str) -> str:
+    """
+    Text of one blob: blob store, then disk cache, then the raw blob API.
+    Touches no session state, so it is safe in fetch worker threads.
+    """
+    cached = get_blob(ctx.full_name, sha)
+    if cached is not None:
         return cached
+    return file_flights.do(("blob", ctx.full_name, sha), lambda: _load_blob(ctx, sha))
+
+
+def _load_blob(ctx, sha: str) -> str:
+    # another caller may have stored it since the caller looked
+    cached = get_blob(ctx.full_name, sha)
+    if cached is None:
+        cached = disk_get("blob", f"{ctx.full_name}:{sha}")
+        if cached is not None:
+            put_blob(ctx.full_name, sha, cached)
+    if cached is not None:
+        return cached
+
+    content = _download_small_blob(ctx, sha).decode()
+    put_blob(ctx.full_name, sha, content)
+    disk_put("blob", f"{ctx.full_name}:{sha}", content)
+    return content
+
+
+def _download_small_blob(ctx, sha: str) -> bytes:
+    """
+    Stream the raw blob, giving up as soon as it passes MAX_FILE_SIZE_KB so
+    a large file of unknown size is not held in memory only to be
+    downloaded again by _open_large.
+    """
+    limit = MAX_FILE_SIZE_KB * 1024
+    data = bytearray()
+    with github_stream(f"{ctx.repo.url}/git/blobs/{sha}", ctx.token) as response:
+        length = response.headers.get("Content-Length")
+        if length is not None and int(length) > limit:
+            raise FileTooLargeError(int(length), sha)
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            data += chunk
+            if len(data) > limit:
+                raise FileTooLargeError(int(length or len(data)), sha)
+    return bytes(data)
+
+
+@traced("file_tools.get_file_content")
+def get_file_content(ctx, path: str) -> str:
+    repo = ctx.repo
+
+    size = get_file_size(ctx, path)
+    if size is not None and size > MAX_FILE_SIZE_KB * 1024:
+        raise FileTooLargeError(size, get_blob_sha(ctx, path))
 
-    repo = get_repo()
-    file = repo.get_contents(path)
+    if ctx.snapshot:
+        content = _snapshot_content(ctx, path)
+        if content is not None:
+            return content
 
-    size_kb = file.size / 1024
-    if size_kb > MAX_FILE_SIZE_KB:
-        raise ValueError(f"File too large: {size_kb:.2f} KB")
+    ref = get_file_cached(path)
+    if ref and ref[0] == ctx.full_name:
+        sha = ref[1]
+    else:
+        sha = get_blob_sha(ctx, path)
+
+    if sha:
+        content = _read_blob(ctx, sha)
+        set_file_cached(path, (ctx.full_name, sha))
+        return content
+
+    head = get_head_sha(ctx)
+    file = file_flights.do(
+        ("contents", ctx.full_name, head, path),
+        lambda: run(repo.get_contents, path, ref=head),
+    )
+
+    if file.size > MAX_FILE_SIZE_KB * 1024:
+        raise FileTooLargeError(file.size, file.sha)
 
     content = file.decoded_content.decode()
-    set_file_cached(path, content)
+    put_blob(ctx.full_name, file.sha, content)
+    disk_put("blob", f"{ctx.full_name}:{file.sha}", content)
+    set_file_cached(path, (ctx.full_name, file.sha))
     return content
+
+
+def iter_file_contents(ctx, paths):
+    """
+    (path, content) for each path in order, with content None for files
+    that are too large or not text. Blobs missing from the caches are
+    fetched FETCH_CONCURRENCY at a time ahead of the consumer.
+    """
+    if ctx.snapshot:
+        # local reads; nothing to overlap
+        for path in paths:
+            try:
+                yield path, get_file_content(ctx, path)
+            except (ValueError, UnicodeDecodeError):
+                yield path, None
+        return
+
+    def load(job):
+        path, sha, size = job
+        try:
+            if sha is None:
+                # the only case that needs session state; resolved below
+                return path, sha, None
+            if size is not None and size > MAX_FILE_SIZE_KB * 1024:
+                return path, sha, None
+            return path, sha, _read_blob(ctx, sha)
+        except (ValueError, UnicodeDecodeError):
+            return path, sha, None
+
+    jobs = (
+        (path, get_blob_sha(ctx, path), get_file_size(ctx, path))
+        for path in paths
+    )
+    for path, sha, content in imap(load, jobs):
+        if sha is None:
+            try:
+                content = get_file_content(ctx, path)
+            except (ValueError, UnicodeDecodeError):
+                content = None
+        elif content is not None:
+            set_file_cached(path, (ctx.full_name, sha))
+        yield path, content
+
+
+def _open_large(ctx, path: str, blob_sha: str):
+    if ctx.snapshot:
+        snapshot = get_cached(f"snapshot:{ctx.full_name}")
+        if snapshot and snapshot["blobs"].get(path) == blob_sha:
+            try:
+                return open_large_file(
+                    ctx.full_name,
+                    blob_sha,
+                    snapshot_file_path(ctx.full_name, snapshot["sha"], path),
+                )
+            except OSError:
+                # the snapshot directory was pruned since it was recorded
+                pass
+
+    return file_flights.do(
+        ("large", ctx.full_name, blob_sha),
+        lambda: fetch_large_file(ctx.repo, ctx.full_name, blob_sha, ctx.token),
+    )
+
+
+def _slice_lines(content: str, start_line: int, end_line: int) -> str:
+    """
+    Lines start_line..end_line of content, without splitting the whole text.
+    """
+    begin = 0
+    for _ in range(start_line - 1):
+        newline = content.find("\n", begin)
+        if newline == -1:
+            return ""
+        begin = newline + 1
+
+    end = begin
+    for _ in range(end_line - start_line + 1):
+        newline = content.find("\n", end)
+        if newline == -1:
+            end = len(content)
+            break
+        end = newline + 1
+
+    return content[begin:end].removesuffix("\n").removesuffix("\r")
+
+
+def _line_count(content: str) -> int:
+    if not content:
+        return 0
+    return content.count("\n") + (not content.endswith("\n"))
+
+
+@traced("file_tools.get_file_lines")
+def get_file_lines(ctx, path: str, start_line: int, end_line: int):
+    """
+    (text of lines start_line..end_line, total line count), 1-based and
+    inclusive. Files over MAX_FILE_SIZE_KB are read from a memory-mapped
+    local copy instead of being decoded whole.
+    """
+    if start_line < 1 or end_line < start_line:
+        raise ValueError(f"Invalid line range: {start_line}-{end_line}")
+
+    try:
+        content = get_file_content(ctx, path)
+    except FileTooLargeError as e:
+        large = _open_large(ctx, path, e.blob_sha)
+        text, total = large.read_lines(start_line, end_line), large.line_count()
+    else:
+        text, total = _slice_lines(content, start_line, end_line), _line_count(content)
+
+    if start_line > total:
+        raise ValueError(f"'{path}' has only {total} lines")
+
+    return text, total
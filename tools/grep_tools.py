@@ -0,0 +1,334 @@
+import os
+import re
+import time
+
+from tools import file_tools, repo_tools
+from storage.session_cache import get_cached, set_cached
+from storage.trigram_index import (
+    TrigramIndex,
+    load_trigram_index,
+    save_trigram_index,
+    trigrams_of,
+)
+from config.settings import (
+    MAX_FILE_SIZE_KB,
+    GREP_CONTEXT_LINES,
+    GREP_MAX_MATCHES,
+)
+
+#grep tools
+# Literal / regex search across the repository. A trigram index narrows
+# the files down to those that can contain a match; only those are read
+# (from the blob store) and scanned with the regex.
+
+_BINARY_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".ico", ".bmp", ".webp", ".pdf",
+    ".zip", ".gz", ".tar", ".whl", ".jar", ".class", ".pyc", ".so",
+    ".dll", ".exe", ".bin", ".woff", ".woff2", ".ttf", ".eot", ".mp3",
+    ".mp4", ".mov", ".sqlite3", ".db",
+}
+
+
+def _indexable(entry) -> bool:
+    return (
+        entry["type"] == "file"
+        and (entry.get("size") or 0) <= MAX_FILE_SIZE_KB * 1024
+        and os.path.splitext(entry["path"].lower())[1] not in _BINARY_EXTENSIONS
+    )
+
+
+def _documents(ctx, paths, progress=None, cancel_event=None):
+    documents = []
+    contents = file_tools.iter_file_contents(ctx, paths)
+    for done, (path, content) in enumerate(contents, 1):
+        if cancel_event is not None and cancel_event.is_set():
+            raise ValueError("Search index build cancelled")
+        if content is not None:
+            documents.append((path, content.encode()))
+        if progress is not None:
+            progress(done, len(paths))
+    return documents
+
+
+def _patched_index(ctx, sha: str, progress, cancel_event):
+    delta = get_cached(f"delta:{sha}")
+    if not delta:
+        return None
+
+    base = get_cached(f"trigram_index:{delta['base']}")
+    if base is None:
+        base = load_trigram_index(ctx.full_name, delta["base"])
+    if base is None:
+        return None
+
+    indexable = {
+        entry["path"] for entry in repo_tools.get_tree_entries(ctx)
+        if _indexable(entry)
+    }
+    changed = sorted(path for path in delta["changed"] if path in indexable)
+    documents = _documents(ctx, changed, progress, cancel_event)
+    return base.patched(delta["changed"] | delta["removed"], documents)
+
+
+def get_trigram_index(ctx, progress=None, cancel_event=None) -> TrigramIndex:
+    """
+    Trigram index for the current commit: session cache, then disk, then a
+    patch of the previous commit's index, then a full build.
+    """
+    sha = repo_tools.get_head_sha(ctx)
+    key = f"trigram_index:{sha}"
+
+    cached = get_cached(key)
+    if cached is not None:
+        return cached
+
+    index = load_trigram_index(ctx.full_name, sha)
+    if index is None:
+        index = _patched_index(ctx, sha, progress, cancel_event)
+        if index is None:
+            paths = [
+                entry["path"] for entry in repo_tools.get_tree_entries(ctx)
+                if _indexable(entry)
+            ]
+            index = TrigramIndex.build(
+                _documents(ctx, paths, progress, cancel_event)
+            )
+        save_trigram_index(ctx.full_name, sha, index)
+
+    set_cached(key, index)
+    return index
+
+
+def compile_pattern(pattern: str):
+    """
+    "/regex/" or "/regex/i" is a regular expression; anything else is
+    searched literally.
+    """
+    if len(pattern) > 2 and pattern.startswith("/"):
+        body, _, suffix = pattern[1:].rpartition("/")
+        if body and suffix in ("", "i"):
+            flags = re.MULTILINE | (re.IGNORECASE if suffix else 0)
+            try:
+                return re.compile(body, flags)
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression: {e}") from e
+    return re.compile(re.escape(pattern), re.MULTILINE)
+
+
+_QUANTIFIER = re.compile(r"\{(\d*)(?:,\d*)?\}")
+
+
+def required_literals(regex) -> list:
+    """
+    Strings of 3+ characters that every match must contain, read from the
+    top level of the pattern source. Groups, classes, escapes such as \\d
+    and anything quantified end a run; a top-level alternation (or verbose
+    mode) yields nothing. Empty when none are certain.
+    """
+    pattern = regex.pattern
+    if regex.flags & re.VERBOSE:
+        return []
+
+    runs, current = [], []
+
+    def end_run():
+        if len(current) >= 3:
+            runs.append("".join(current))
+        current.clear()
+
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        i += 1
+
+        if char == "\\" and i < len(pattern):
+            escaped = pattern[i]
+            i += 1
+            if depth == 0:
+                if escaped.isalnum():
+                    # a class (\d), an anchor (\b) or a backreference
+                    end_run()
+                else:
+                    current.append(escaped)
+            continue
+
+        if char == "[":
+            # skip the class, including a leading "]" or "^]"
+            if i < len(pattern) and pattern[i] == "^":
+                i += 1
+            if i < len(pattern) and pattern[i] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+            if depth == 0:
+                end_run()
+            continue
+
+        if char == "(":
+            depth += 1
+            end_run()
+            continue
+        if char == ")":
+            depth = max(0, depth - 1)
+            continue
+        if depth:
+            continue
+
+        if char == "|":
+            return []
+
+        if char in "*?+{":
+            low = 1 if char == "+" else 0
+            if char == "{":
+                quantifier = _QUANTIFIER.match(pattern, i - 1)
+                if quantifier is None:
+                    # a literal "{"
+                    current.append(char)
+                    continue
+                low = int(quantifier.group(1) or 0)
+                i = quantifier.end()
+            if low == 0 and current:
+                current.pop()
+            end_run()
+            # lazy or possessive suffix
+            if i < len(pattern) and pattern[i] in "?+":
+                i += 1
+            continue
+
+        if char in ".^$":
+            end_run()
+            continue
+
+        current.append(char)
+
+    end_run()
+    return runs
+
+
+def _line_matches(content: str, regex, limit: int):
+    """
+    1-based numbers of the lines where a match starts, at most limit.
+    """
+    lines = []
+    line = 1
+    position = 0
+    for match in regex.finditer(content):
+        line += content.count("\n", position, match.start())
+        position = match.start()
+        if not lines or lines[-1] != line:
+            lines.append(line)
+            if len(lines) >= limit:
+                break
+    return lines
+
+
+def grep_code(ctx, pattern: str, path: str = None, progress=None, cancel_event=None) -> dict:
+    """
+    path:line matches of pattern, optionally within one file, with
+    GREP_CONTEXT_LINES lines of context and timings.
+    """
+    regex = compile_pattern(pattern)
+
+    if path is not None:
+        # one file: scan it directly instead of indexing the repository
+        started = time.perf_counter()
+        candidates = [path]
+        indexed = 1
+    else:
+        index = get_trigram_index(ctx, progress, cancel_event)
+        started = time.perf_counter()
+        literals = required_literals(regex)
+        if regex.flags & re.IGNORECASE:
+            # the index only folds ASCII case
+            literals = [literal for literal in literals if literal.isascii()]
+        trigrams = [
+            trigram
+            for literal in literals
+            for trigram in trigrams_of(literal.encode()).tolist()
+        ]
+        candidates = index.candidates(trigrams)
+        indexed = len(index)
+    narrowed = time.perf_counter()
+
+    files = []
+    total = 0
+    truncated = False
+    for candidate in candidates:
+        try:
+            content = file_tools.get_file_content(ctx, candidate)
+        except (ValueError, UnicodeDecodeError):
+            continue
+
+        lines = _line_matches(content, regex, GREP_MAX_MATCHES - total)
+        if not lines:
+            continue
+
+        files.append({"path": candidate, "lines": lines, "content": content})
+        total += len(lines)
+        if total >= GREP_MAX_MATCHES:
+            truncated = True
+            break
+    scanned = time.perf_counter()
+
+    return {
+        "pattern": pattern,
+        "files": files,
+        "matches": total,
+        "truncated": truncated,
+        "candidates": len(candidates),
+        "indexed_files": indexed,
+        "lookup_ms": (narrowed - started) * 1000,
+        "scan_ms": (scanned - narrowed) * 1000,
+    }
+
+
+def _context_blocks(lines, line_count):
+    """
+    Merge the context windows around matched lines into (start, end) blocks.
+    """
+    blocks = []
+    for line in lines:
+        start = max(1, line - GREP_CONTEXT_LINES)
+        end = min(line_count, line + GREP_CONTEXT_LINES)
+        if blocks and start <= blocks[-1][1] + 1:
+            blocks[-1] = (blocks[-1][0], end)
+        else:
+            blocks.append((start, end))
+    return blocks
+
+
+def format_grep_results(report: dict) -> str:
+    if not report["files"]:
+        return f"No matches for {report['pattern']}"
+
+    out = [f"Matches for {report['pattern']}:"]
+    for match in report["files"]:
+        # numbered by "\n" like _line_matches; splitlines() would also
+        # break on \r, \x0c, \u2028 and other separators
+        source = match["content"].split("\n")
+        matched = set(match["lines"])
+        if len(source) > 1 and not source[-1] and len(source) not in matched:
+            source.pop()
+
+        out.append("")
+        out.append(match["path"])
+        for start, end in _context_blocks(match["lines"], len(source)):
+            for number in range(start, end + 1):
+                marker = ":" if number in matched else "-"
+                text = source[number - 1].removesuffix("\r")
+                out.append(f"{number:>6}{marker} {text}")
+            out.append("    --")
+        out.pop()
+
+    out.append("")
+    summary = (
+        f"{report['matches']} matching line(s) in {len(report['files'])} file(s); "
+        f"{report['candidates']} of {report['indexed_files']} files scanned "
+        f"(index lookup {report['lookup_ms']:.1f} ms, scan {report['scan_ms']:.1f} ms)"
+    )
+    if report["truncated"]:
+        summary += f". Stopped after {GREP_MAX_MATCHES} lines."
+    out.append(summary)
+    return "\n".join(out)
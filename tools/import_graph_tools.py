@@ -0,0 +1,150 @@
+from tools import file_tools, repo_tools
+from tools.dependency_tools import (
+    ImportGraph,
+    extract_module_imports,
+    module_name_for_path,
+    resolve_import,
+)
+from storage.session_cache import get_cached, set_cached
+from storage.response_cache import imports_cache
+from config.settings import MAX_FILE_SIZE_KB
+#import graph tools
+
+def _file_imports(ctx, paths_by_blob: dict) -> dict:
+    """
+    blob sha -> raw imports for the given files, cached per blob so a
+    rebuild after a new commit only fetches and re-parses the files that
+    changed.
+    """
+    imports = {}
+    missing = {}
+    for blob_sha, path in paths_by_blob.items():
+        cached = imports_cache.get(blob_sha)
+        if cached is not None:
+            imports[blob_sha] = cached
+        else:
+            missing[path] = blob_sha
+
+    for path, content in file_tools.iter_file_contents(ctx, list(missing)):
+        try:
+            parsed = extract_module_imports(content) if content is not None else []
+        except SyntaxError:
+            parsed = []
+        imports_cache.set(missing[path], parsed)
+        imports[missing[path]] = parsed
+    return imports
+
+
+def cached_import_graph(ctx):
+    """
+    The import graph for the current commit if this session already built
+    it, else None. Never crawls the repository.
+    """
+    return get_cached(f"import_graph:{repo_tools.get_head_sha(ctx)}")
+
+
+def get_import_graph(ctx) -> ImportGraph:
+    """
+    Repository-wide Python module graph for the current commit.
+    """
+    sha = repo_tools.get_head_sha(ctx)
+    key = f"import_graph:{sha}"
+
+    cached = get_cached(key)
+    if cached:
+        return cached
+
+    modules = {}
+    blobs = {}
+    for entry in repo_tools.get_tree_entries(ctx):
+        if entry["type"] != "file":
+            continue
+        if (entry.get("size") or 0) > MAX_FILE_SIZE_KB * 1024:
+            continue
+        name = module_name_for_path(entry["path"])
+        if name and name not in modules:
+            modules[name] = entry["path"]
+            blobs[name] = entry["sha"]
+
+    known = set(modules)
+    imports = _file_imports(
+        ctx, {blobs[module]: path for module, path in modules.items()}
+    )
+    edges = {}
+    for module, path in modules.items():
+        is_package = path.endswith("__init__.py")
+        targets = set()
+        for imported, level, names in imports[blobs[module]]:
+            internal, external = resolve_import(
+                imported, level, names, module, is_package, known
+            )
+            targets |= internal
+            if external:
+                targets.add(external)
+        targets.discard(module)
+        edges[module] = targets
+
+    graph = ImportGraph(modules, edges)
+    set_cached(key, graph)
+    return graph
+
+
+def _grouped(graph: ImportGraph, names) -> dict:
+    groups = {"internal": [], "stdlib": [], "third-party": []}
+    for name in names:
+        groups[graph.classify(name)].append(name)
+    return groups
+
+
+def format_module_dependencies(graph: ImportGraph, module: str) -> str:
+    groups = _grouped(graph, graph.dependencies(module))
+    transitive = [
+        name for name in graph.transitive_dependencies(module)
+        if graph.is_internal(name)
+    ]
+
+    lines = [f"Module: {module}"]
+    for title, kind in (
+        ("Internal dependencies", "internal"),
+        ("Standard library", "stdlib"),
+        ("Third-party", "third-party"),
+    ):
+        lines.append(f"{title}:")
+        if groups[kind]:
+            lines.extend(f"- {name}" for name in groups[kind])
+        else:
+            lines.append("- none")
+
+    lines.append(f"Imported by: {len(graph.dependents(module))} module(s)")
+    lines.append(f"Transitive internal dependencies: {len(transitive)}")
+    return "\n".join(lines)
+
+
+def format_dependents(graph: ImportGraph, module: str) -> str:
+    direct = graph.dependents(module)
+    transitive = graph.transitive_dependents(module)
+
+    lines = [f"Modules importing {module}:"]
+    if direct:
+        lines.extend(f"- {name} ({graph.paths[name]})" for name in direct)
+    else:
+        lines.append("- none")
+
+    indirect = [name for name in transitive if name not in direct]
+    if indirect:
+        lines.append("")
+        lines.append("Indirectly, through those modules:")
+        lines.extend(f"- {name}" for name in indirect)
+
+    return "\n".join(lines)
+
+
+def format_cycles(graph: ImportGraph) -> str:
+    cycles = graph.cycles()
+    if not cycles:
+        return "No import cycles found between repository modules."
+
+    lines = [f"Import cycles found: {len(cycles)}"]
+    for members in cycles:
+        lines.append("- " + " <-> ".join(members))
+    return "\n".join(lines)
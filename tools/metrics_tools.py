@@ -0,0 +1,397 @@
+import ast
+
+from tree_sitter_languages import get_parser
+
+from utils.tracing import traced
+
+#metrics tools
+# Single-pass metrics engine. Python goes through the stdlib AST, the
+# other languages in utils.language_utils through tree-sitter. Either way
+# the syntax tree is walked exactly once, and the same walk records the
+# symbol definitions (qualified name, kind, start line, end line).
+
+_TREE_SITTER_NAMES = {
+    "javascript": "javascript",
+    "typescript": "typescript",
+    "java": "java",
+    "cpp": "cpp",
+    "c": "c",
+    "go": "go",
+    "rust": "rust",
+    "ruby": "ruby",
+    "php": "php",
+    "csharp": "c_sharp",
+}
+
+_LINE_COMMENT_PREFIXES = {
+    "python": ("#",),
+    "yaml": ("#",),
+    "css": ("/*", "*"),
+    "html": ("<!--",),
+}
+
+
+def _empty_metrics() -> dict:
+    return {
+        "lines": 0,
+        "functions": 0,
+        "classes": 0,
+        "imports": 0,
+        "blank_lines": 0,
+        "comment_lines": 0,
+        "code_lines": 0,
+        "async_functions": 0,
+        "cyclomatic_complexity": 1,
+        "max_function_complexity": 0,
+        "max_nesting_depth": 0,
+    }
+
+
+def _count_lines(content: str, metrics: dict, comment_prefixes=()):
+    for line in content.splitlines():
+        stripped = line.strip()
+        metrics["lines"] += 1
+        if not stripped:
+            metrics["blank_lines"] += 1
+        elif comment_prefixes and stripped.startswith(comment_prefixes):
+            metrics["comment_lines"] += 1
+
+
+# ---- Python (stdlib ast) ----
+
+_PY_BLOCKS = (
+    ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith,
+    ast.Try, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef,
+) + ((ast.Match, ast.TryStar) if hasattr(ast, "TryStar") else ())
+_PY_DECISIONS = (
+    ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler,
+) + ((ast.match_case,) if hasattr(ast, "match_case") else ())
+
+
+def _decision_points(node) -> int:
+    if isinstance(node, _PY_DECISIONS):
+        return 1
+    if isinstance(node, ast.BoolOp):
+        return len(node.values) - 1
+    if isinstance(node, ast.comprehension):
+        return 1 + len(node.ifs)
+    return 0
+
+
+def _python_symbol(node, scope):
+    """
+    (symbol, child scope) for a def / class node; scope is the enclosing
+    (qualified name, is class) or None at module level.
+    """
+    name = f"{scope[0]}.{node.name}" if scope else node.name
+    if isinstance(node, ast.ClassDef):
+        kind = "class"
+    else:
+        kind = "method" if scope and scope[1] else "function"
+
+    # decorators belong to the definition
+    start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+    return (name, kind, start, node.end_lineno), (name, kind == "class")
+
+
+def _python_metrics(content: str, symbols: list) -> dict:
+    metrics = _empty_metrics()
+    _count_lines(content, metrics, _LINE_COMMENT_PREFIXES["python"])
+
+    tree = ast.parse(content)
+
+    # complexity of each enclosing function; index 0 is module level
+    complexity = [0]
+    stack = [(tree, 0, False, None)]
+
+    while stack:
+        node, depth, leaving, scope = stack.pop()
+
+        if leaving:
+            score = 1 + complexity.pop()
+            metrics["max_function_complexity"] = max(
+                metrics["max_function_complexity"], score
+            )
+            continue
+
+        if isinstance(node, ast.FunctionDef):
+            metrics["functions"] += 1
+        elif isinstance(node, ast.AsyncFunctionDef):
+            metrics["functions"] += 1
+            metrics["async_functions"] += 1
+        elif isinstance(node, ast.ClassDef):
+            metrics["classes"] += 1
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            metrics["imports"] += 1
+
+        points = _decision_points(node)
+        complexity[-1] += points
+        metrics["cyclomatic_complexity"] += points
+
+        if isinstance(node, _PY_BLOCKS):
+            depth += 1
+            metrics["max_nesting_depth"] = max(metrics["max_nesting_depth"], depth)
+
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            symbol, scope = _python_symbol(node, scope)
+            symbols.append(symbol)
+
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            complexity.append(0)
+            stack.append((node, depth, True, scope))
+
+        stack.extend(
+            (child, depth, False, scope)
+            for child in reversed(list(ast.iter_child_nodes(node)))
+        )
+
+    metrics["code_lines"] = (
+        metrics["lines"] - metrics["blank_lines"] - metrics["comment_lines"]
+    )
+    return metrics
+
+
+# ---- Other languages (tree-sitter) ----
+
+_TS_FUNCTIONS = {
+    "function_definition", "function_declaration", "function_item",
+    "method_definition", "method_declaration", "constructor_declaration",
+    "arrow_function", "function", "function_expression",
+    "generator_function_declaration", "local_function_statement",
+    "method", "singleton_method",
+}
+_TS_CLASSES = {
+    "class_declaration", "class_definition", "class_specifier",
+    "struct_specifier", "struct_item", "enum_item", "trait_item",
+    "interface_declaration", "enum_declaration", "record_declaration",
+    "struct_declaration", "class", "module",
+}
+_TS_IMPORTS = {
+    "import_statement", "import_declaration", "preproc_include",
+    "use_declaration", "using_directive", "namespace_use_declaration",
+}
+_TS_DECISIONS = {
+    "if_statement", "if_expression", "for_statement", "for_in_statement",
+    "enhanced_for_statement", "for_each_statement", "foreach_statement",
+    "for_expression", "while_statement", "while_expression", "do_statement",
+    "loop_expression", "catch_clause", "switch_case", "case_statement",
+    "expression_case", "type_case", "match_arm", "conditional_expression",
+    "ternary_expression", "elif_clause", "else_if_clause",
+    "if", "elsif", "unless", "while", "until", "for", "when", "rescue",
+    "if_modifier", "unless_modifier", "while_modifier", "until_modifier",
+}
+_TS_BLOCKS = _TS_FUNCTIONS | _TS_CLASSES | {
+    "if_statement", "if_expression", "for_statement", "for_in_statement",
+    "enhanced_for_statement", "for_each_statement", "foreach_statement",
+    "for_expression", "while_statement", "while_expression", "do_statement",
+    "loop_expression", "try_statement", "switch_statement",
+    "expression_switch_statement", "type_switch_statement",
+    "match_expression", "if", "unless", "while", "until", "for", "case",
+    "begin",
+}
+_TS_BOOLEAN_OPERATORS = {"&&", "||", "and", "or"}
+_TS_COMMENTS = {"comment", "line_comment", "block_comment"}
+
+
+def _is_class(node) -> bool:
+    if node.type in _TS_CLASSES:
+        return True
+    # Go: `type T struct {...}` / `type I interface {...}`
+    return node.type == "type_spec" and any(
+        child.type in ("struct_type", "interface_type") for child in node.children
+    )
+
+
+_TS_NAME_CARRIERS = {
+    "variable_declarator", "assignment_expression", "pair",
+    "public_field_definition", "field_definition", "let_declaration",
+}
+_TS_DECLARATOR_NAMES = {
+    "identifier", "field_identifier", "qualified_identifier",
+    "destructor_name", "operator_name",
+}
+
+
+def _ts_symbol_name(node):
+    name = node.child_by_field_name("name")
+
+    # C / C++: the name sits inside nested declarators
+    if name is None and node.type == "function_definition":
+        name = node.child_by_field_name("declarator")
+        while name is not None and name.type not in _TS_DECLARATOR_NAMES:
+            name = name.child_by_field_name("declarator")
+
+    # anonymous functions assigned to a name: const f = () => {}
+    if name is None and node.parent is not None and node.parent.type in _TS_NAME_CARRIERS:
+        parent = node.parent
+        name = (
+            parent.child_by_field_name("name")
+            or parent.child_by_field_name("left")
+            or parent.child_by_field_name("key")
+            or parent.child_by_field_name("pattern")
+        )
+
+    return name.text.decode(errors="replace") if name is not None else None
+
+
+def _ts_symbol(node, scope, is_function):
+    """
+    (symbol or None, child scope) for a function / class node.
+    """
+    name = _ts_symbol_name(node)
+    if name is None:
+        return None, scope
+
+    # Go: func (t *T) M() is T.M
+    receiver = node.child_by_field_name("receiver") if node.type == "method_declaration" else None
+    if receiver is not None and scope is None:
+        receiver_type = next(
+            (
+                child for declaration in receiver.named_children
+                for child in declaration.named_children
+                if child.type in ("type_identifier", "pointer_type")
+            ),
+            None,
+        )
+        if receiver_type is not None:
+            scope = (receiver_type.text.decode(errors="replace").lstrip("*"), True)
+
+    qualified = f"{scope[0]}.{name}" if scope else name
+    if is_function:
+        kind = "method" if scope and scope[1] else "function"
+    else:
+        kind = "class"
+
+    symbol = (qualified, kind, node.start_point[0] + 1, node.end_point[0] + 1)
+    return symbol, (qualified, kind == "class")
+
+
+def _tree_sitter_metrics(content: str, language: str, symbols: list) -> dict:
+    metrics = _empty_metrics()
+    _count_lines(content, metrics)
+
+    parser = get_parser(_TREE_SITTER_NAMES[language])
+    tree = parser.parse(content.encode())
+
+    comment_lines = set()
+    complexity = [0]
+    stack = [(tree.root_node, 0, False, None)]
+
+    while stack:
+        node, depth, leaving, scope = stack.pop()
+
+        if leaving:
+            score = 1 + complexity.pop()
+            metrics["max_function_complexity"] = max(
+                metrics["max_function_complexity"], score
+            )
+            continue
+
+        node_type = node.type
+
+        # keyword tokens (e.g. Ruby's `if`) share names with statements
+        if not node.is_named:
+            if node_type in _TS_BOOLEAN_OPERATORS:
+                complexity[-1] += 1
+                metrics["cyclomatic_complexity"] += 1
+            continue
+
+        if node_type in _TS_COMMENTS:
+            comment_lines.update(
+                range(node.start_point[0], node.end_point[0] + 1)
+            )
+            continue
+
+        is_function = node_type in _TS_FUNCTIONS
+        is_class = False
+        if is_function:
+            metrics["functions"] += 1
+            if any(child.type == "async" for child in node.children) or any(
+                child.type == "function_modifiers" and b"async" in child.text
+                for child in node.children
+            ):
+                metrics["async_functions"] += 1
+        elif _is_class(node):
+            metrics["classes"] += 1
+            is_class = True
+        elif node_type in _TS_IMPORTS:
+            metrics["imports"] += 1
+        elif node_type == "impl_item":
+            # Rust: methods of `impl T` are qualified with T
+            impl_type = node.child_by_field_name("type")
+            if impl_type is not None:
+                scope = (impl_type.text.decode(errors="replace"), True)
+
+        if is_function or is_class:
+            symbol, scope = _ts_symbol(node, scope, is_function)
+            if symbol is not None:
+                symbols.append(symbol)
+
+        if node_type in _TS_DECISIONS:
+            complexity[-1] += 1
+            metrics["cyclomatic_complexity"] += 1
+
+        if node_type in _TS_BLOCKS:
+            depth += 1
+            metrics["max_nesting_depth"] = max(metrics["max_nesting_depth"], depth)
+
+        if is_function:
+            complexity.append(0)
+            stack.append((node, depth, True, scope))
+
+        stack.extend(
+            (child, depth, False, scope) for child in reversed(node.children)
+        )
+
+    metrics["comment_lines"] = len(comment_lines)
+    metrics["code_lines"] = (
+        metrics["lines"] - metrics["blank_lines"] - metrics["comment_lines"]
+    )
+    return metrics
+
+
+def _plain_metrics(content: str, language: str) -> dict:
+    metrics = {
+        "lines": 0,
+        "blank_lines": 0,
+        "comment_lines": 0,
+    }
+    _count_lines(content, metrics, _LINE_COMMENT_PREFIXES.get(language, ()))
+    metrics["code_lines"] = (
+        metrics["lines"] - metrics["blank_lines"] - metrics["comment_lines"]
+    )
+    return metrics
+
+
+@traced("metrics_tools.analyze_file")
+def analyze_file(content: str, language: str):
+    """
+    (metrics, symbols) for one file from a single syntax-tree traversal.
+    Data and markup languages only get line counts and no symbols.
+    """
+    symbols = []
+    if language == "python":
+        return _python_metrics(content, symbols), symbols
+
+    if language in _TREE_SITTER_NAMES:
+        return _tree_sitter_metrics(content, language, symbols), symbols
+
+    return _plain_metrics(content, language), symbols
+
+
+def collect_metrics(content: str, language: str) -> dict:
+    return analyze_file(content, language)[0]
+
+
+def collect_metrics_batch(batch):
+    """
+    Process-pool entry point:
+    [(path, language, content)] -> [(path, metrics or None, symbols or None)].
+    """
+    results = []
+    for path, language, content in batch:
+        try:
+            results.append((path, *analyze_file(content, language)))
+        except (SyntaxError, ValueError, RecursionError):
+            results.append((path, None, None))
+    return results
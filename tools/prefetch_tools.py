@@ -0,0 +1,174 @@
+import threading
+import time
+
+from tools import file_tools, repo_tools
+from tools.code_tools import detect_language
+from storage.session_cache import cancellable_writes, start_session_thread
+from utils import fetch_scheduler
+from config.settings import (
+    PREFETCH_BYTE_BUDGET,
+    PREFETCH_MAX_FILE_KB,
+    PREFETCH_MAX_FILES,
+)
+
+#prefetch tools
+# Speculative warm-up right after "Load Repository", so the first question
+# does not pay for the tree crawl, README and file downloads back to back.
+# Everything runs as background fetch work: it yields fetch slots to
+# foreground queries and stops between steps when cancelled.
+
+_ENTRY_POINTS = {
+    "__init__.py", "__main__.py", "app.py", "main.py", "cli.py", "server.py",
+    "manage.py", "setup.py", "index.js", "index.ts", "main.go", "main.rs",
+    "lib.rs",
+}
+
+_MANIFESTS = {
+    "requirements.txt", "pyproject.toml", "setup.cfg", "package.json",
+    "Cargo.toml", "go.mod", "Dockerfile", "Makefile",
+}
+
+_STEPS = (
+    ("tree", repo_tools.get_tree_entries),
+    ("path index", repo_tools.get_path_index),
+    ("README", repo_tools.get_readme),
+    ("metadata", repo_tools.get_repo_metadata),
+)
+
+
+def _likelihood(entry):
+    """
+    Sort key: entry points and manifests first, then shallow before deep,
+    then small before large.
+    """
+    path = entry["path"]
+    name = path.rpartition("/")[2]
+    return (
+        name not in _ENTRY_POINTS and name not in _MANIFESTS,
+        path.count("/"),
+        entry.get("size") or 0,
+        path,
+    )
+
+
+def prefetch_candidates(ctx) -> list:
+    """
+    Paths of the source files most likely to be asked about, within
+    PREFETCH_BYTE_BUDGET bytes and PREFETCH_MAX_FILES files.
+    """
+    entries = [
+        entry for entry in repo_tools.get_tree_entries(ctx)
+        if entry["type"] == "file"
+        and (entry.get("size") or 0) <= PREFETCH_MAX_FILE_KB * 1024
+        and (
+            detect_language(entry["path"]) != "unknown"
+            or entry["path"].rpartition("/")[2] in _MANIFESTS
+        )
+    ]
+
+    paths = []
+    budget = PREFETCH_BYTE_BUDGET
+    for entry in sorted(entries, key=_likelihood):
+        if len(paths) >= PREFETCH_MAX_FILES:
+            break
+        size = entry.get("size") or 0
+        if size > budget:
+            continue
+        paths.append(entry["path"])
+        budget -= size
+    return paths
+
+
+def warm_up(ctx, progress=None, cancel_event=None) -> int:
+    """
+    Fill the session and blob caches for ctx. progress(stage, done, total)
+    is called as steps and files complete. Returns the number of files
+    cached.
+    """
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    for stage, step in _STEPS:
+        if cancelled():
+            return 0
+        if progress is not None:
+            progress(stage, 0, 0)
+        try:
+            step(ctx)
+        except Exception:
+            # not fatal here; the query that needs it reports the error
+            pass
+
+    # a snapshot already holds every file locally
+    if ctx.snapshot or cancelled():
+        return 0
+
+    paths = prefetch_candidates(ctx)
+    cached = 0
+    contents = file_tools.iter_file_contents(ctx, paths)
+    for done, (_, content) in enumerate(contents, 1):
+        if cancelled():
+            break
+        cached += content is not None
+        if progress is not None:
+            progress("files", done, len(paths))
+    contents.close()
+    return cached
+
+
+class PrefetchJob:
+    """
+    warm_up for one session, on a background thread. The UI polls
+    status(); cancel() stops it, e.g. when another repository is loaded or
+    the session is cleared, and from then on it no longer writes to the
+    session cache.
+    """
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.cancel_event = threading.Event()
+        self.stage = "starting"
+        self.done = 0
+        self.total = 0
+        self.files = 0
+        self.finished = False
+        self.error = None
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self._thread = None
+
+    def start(self) -> "PrefetchJob":
+        self._thread = start_session_thread(
+            self._run, name=f"prefetch-{self.ctx.full_name}"
+        )
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _progress(self, stage, done, total):
+        self.stage, self.done, self.total = stage, done, total
+
+    def _run(self):
+        try:
+            with fetch_scheduler.background(), cancellable_writes(self.cancel_event):
+                self.files = warm_up(self.ctx, self._progress, self.cancel_event)
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.finished = True
+            self.finished_at = time.monotonic()
+
+    def status(self) -> dict:
+        end = self.finished_at if self.finished else time.monotonic()
+        return {
+            "repo": self.ctx.full_name,
+            "stage": self.stage,
+            "done": self.done,
+            "total": self.total,
+            "files": self.files,
+            "finished": self.finished,
+            "cancelled": self.cancel_event.is_set(),
+            "error": self.error,
+            "seconds": end - self.started_at,
+        }
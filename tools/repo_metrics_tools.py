@@ -0,0 +1,305 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from tools import file_tools, repo_tools
+from tools.code_tools import detect_language
+from tools.metrics_tools import collect_metrics_batch
+from storage.response_cache import metrics_cache, symbols_cache
+from config.settings import (
+    MAX_FILE_SIZE_KB,
+    REPO_METRICS_WORKERS,
+    REPO_METRICS_BATCH_SIZE,
+    REPO_METRICS_TOP_N,
+)
+
+#repo metrics tools
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class MetricsCancelled(Exception):
+    pass
+
+
+def _get_pool():
+    """
+    One process pool per server process, created on first use. Workers are
+    spawned rather than forked because the Streamlit server is threaded.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=REPO_METRICS_WORKERS or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _discard_pool(broken):
+    """
+    Forget a pool whose worker died (OOM, a crash in a parser), so the next
+    _get_pool() starts a fresh one.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_batch(pool, batch):
+    """
+    Submit batch, replacing the pool once if it is already broken.
+    Returns (future, pool used).
+    """
+    try:
+        return pool.submit(collect_metrics_batch, batch), pool
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        pool = _get_pool()
+        return pool.submit(collect_metrics_batch, batch), pool
+
+
+def _batch_results(future, pool, batch):
+    """
+    Results of one batch. If the pool broke, the batch is retried once in a
+    fresh pool; if that breaks too, its files are reported as skipped.
+    """
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        _discard_pool(pool)
+
+    retry, pool = _run_batch(_get_pool(), batch)
+    try:
+        return retry.result()
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        return [(path, None, None) for path, _, _ in batch]
+
+
+def _metric_sources(ctx):
+    """
+    (path, language, blob sha) for every file the metrics engine can read.
+    """
+    for entry in repo_tools.get_tree_entries(ctx):
+        if entry["type"] != "file":
+            continue
+        if (entry.get("size") or 0) > MAX_FILE_SIZE_KB * 1024:
+            continue
+        language = detect_language(entry["path"])
+        if language == "unknown":
+            continue
+        yield entry["path"], language, entry["sha"]
+
+
+def analyze_repo(ctx, progress=None, cancel_event=None) -> dict:
+    """
+    Metrics and symbol definitions for every source file in the
+    repository, parsed in parallel across CPU cores. Contents come from
+    the blob cache; per-file results are shared with code_tools via
+    metrics_cache / symbols_cache, so only new blobs are parsed.
+
+    progress(done, total) is called as files complete; setting
+    cancel_event stops the run and returns partial results.
+    """
+    sources = list(_metric_sources(ctx))
+    total = len(sources)
+    languages = {path: language for path, language, _ in sources}
+
+    per_file = {}
+    symbols = {}
+    shas = {}
+    skipped = 0
+    done = 0
+    cancelled = False
+    pending = set()
+    batches = {}
+    batch = []
+    pool = _get_pool()
+
+    def is_cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    def submit(batch):
+        nonlocal pool
+        future, pool = _run_batch(pool, batch)
+        batches[future] = (pool, batch)
+        pending.add(future)
+
+    def collect(futures):
+        nonlocal done, skipped
+        for future in futures:
+            pending.discard(future)
+            for path, metrics, file_symbols in _batch_results(future, *batches.pop(future)):
+                done += 1
+                if metrics is None:
+                    skipped += 1
+                    continue
+                key = (shas[path], languages[path])
+                per_file[path] = metrics
+                symbols[path] = file_symbols
+                metrics_cache.set(key, metrics)
+                symbols_cache.set(key, file_symbols)
+        if futures and progress is not None:
+            progress(done, total)
+
+    uncached = []
+    for path, language, sha in sources:
+        cached = metrics_cache.get((sha, language))
+        cached_symbols = symbols_cache.get((sha, language))
+        if cached is not None and cached_symbols is not None:
+            per_file[path] = cached
+            symbols[path] = cached_symbols
+            done += 1
+        else:
+            shas[path] = sha
+            uncached.append(path)
+
+    try:
+        for path, content in file_tools.iter_file_contents(ctx, uncached):
+            if is_cancelled():
+                cancelled = True
+                break
+
+            if content is None:
+                skipped += 1
+                done += 1
+                continue
+
+            language = languages[path]
+            batch.append((path, language, content))
+            if len(batch) >= REPO_METRICS_BATCH_SIZE:
+                submit(batch)
+                batch = []
+
+            # fold in finished batches while still fetching
+            collect([future for future in pending if future.done()])
+
+        if batch and not cancelled:
+            submit(batch)
+
+        for future in as_completed(list(pending)):
+            if is_cancelled():
+                cancelled = True
+                break
+            collect([future])
+    finally:
+        # also reached when the Streamlit script is interrupted by a rerun
+        for future in pending:
+            future.cancel()
+
+    if progress is not None:
+        progress(done, total)
+
+    return {
+        "metrics": per_file,
+        "symbols": symbols,
+        "languages": languages,
+        "skipped": skipped,
+        "cancelled": cancelled,
+    }
+
+
+def repo_metrics(ctx, progress=None, cancel_event=None, top_n=REPO_METRICS_TOP_N) -> dict:
+    """
+    Repository-wide rollups and hotspots; see analyze_repo.
+    """
+    analysis = analyze_repo(ctx, progress, cancel_event)
+
+    result = aggregate_metrics(analysis["metrics"], analysis["languages"], top_n)
+    result["skipped"] = analysis["skipped"]
+    result["cancelled"] = analysis["cancelled"]
+    return result
+
+
+def _rollup(groups: dict, key: str, metrics: dict):
+    group = groups.setdefault(key, {
+        "files": 0,
+        "lines": 0,
+        "code_lines": 0,
+        "functions": 0,
+        "classes": 0,
+        "cyclomatic_complexity": 0,
+    })
+    group["files"] += 1
+    for field in ("lines", "code_lines", "functions", "classes", "cyclomatic_complexity"):
+        group[field] += metrics.get(field, 0)
+
+
+def aggregate_metrics(per_file: dict, languages: dict, top_n: int) -> dict:
+    """
+    Per-directory (top level) and per-language rollups plus the top_n
+    hotspots by complexity and by size.
+    """
+    by_directory = {}
+    by_language = {}
+
+    for path, metrics in per_file.items():
+        directory = path.split("/", 1)[0] if "/" in path else "."
+        _rollup(by_directory, directory, metrics)
+        _rollup(by_language, languages[path], metrics)
+
+    def top(field):
+        ranked = sorted(
+            per_file.items(),
+            key=lambda item: item[1].get(field, 0),
+            reverse=True,
+        )
+        return [(path, metrics.get(field, 0)) for path, metrics in ranked[:top_n]]
+
+    totals = {"files": 0}
+    for group in by_language.values():
+        for field, value in group.items():
+            totals[field] = totals.get(field, 0) + value
+
+    return {
+        "totals": totals,
+        "by_directory": by_directory,
+        "by_language": by_language,
+        "hotspots_complexity": top("cyclomatic_complexity"),
+        "hotspots_size": top("lines"),
+    }
+
+
+def format_repo_metrics(report: dict) -> str:
+    totals = report["totals"]
+    lines = [
+        f"Files analysed: {totals.get('files', 0)}",
+        f"Lines: {totals.get('lines', 0)} ({totals.get('code_lines', 0)} code)",
+        f"Functions: {totals.get('functions', 0)}",
+        f"Classes: {totals.get('classes', 0)}",
+        f"Total cyclomatic complexity: {totals.get('cyclomatic_complexity', 0)}",
+    ]
+
+    if report.get("skipped"):
+        lines.append(f"Skipped (too large or unparsable): {report['skipped']}")
+    if report.get("cancelled"):
+        lines.append("Cancelled: results are partial.")
+
+    for title, groups in (
+        ("By directory", report["by_directory"]),
+        ("By language", report["by_language"]),
+    ):
+        lines.append("")
+        lines.append(f"{title}:")
+        for name, group in sorted(groups.items(), key=lambda g: -g[1]["lines"]):
+            lines.append(
+                f"- {name}: {group['files']} files, {group['lines']} lines, "
+                f"complexity {group['cyclomatic_complexity']}"
+            )
+
+    for title, hotspots in (
+        ("Most complex files", report["hotspots_complexity"]),
+        ("Largest files", report["hotspots_size"]),
+    ):
+        lines.append("")
+        lines.append(f"{title}:")
+        for path, value in hotspots:
+            lines.append(f"- {path}: {value}")
+
+    return "\n".join(lines)
@@ -1,7 +1,21 @@
 
-from utils.github_client import get_repo
+import time
+from urllib.parse import quote
+
 from storage.session_cache import get_cached, set_cached
-from config.settings import MAX_TREE_ENTRIES
+from storage.disk_cache import disk_get, disk_put
+from storage.file_cache import clear_file_cache, drop_file_cached
+from storage.snapshot_store import ensure_snapshot
+from storage.single_flight import repo_flights
+from utils.fetch_scheduler import github_get, map_all, run
+from utils.tracing import traced
+from config.settings import (
+    MAX_TREE_ENTRIES,
+    HEAD_CACHE_TTL_SECONDS,
+    METADATA_CACHE_TTL_SECONDS,
+    HEAD_CHECK_INTERVAL_SECONDS,
+    COMPARE_MAX_FILES,
+)
 #repo tools
 def _clean_readme(readme: str) -> str:
     """
@@ -59,38 +73,339 @@ def _clean_readme(readme: str) -> str:
     return "\n\n".join(paragraphs)
 
 
-def get_repo_tree(path="", depth=0):
-    # cache only at root
-    if path == "":
-        cached = get_cached("repo_tree")
-        if cached:
-            return cached
+def _fetch_head_sha(ctx) -> str:
+    """
+    Ask GitHub for the default branch head. The request carries the last
+    ETag, so an unmoved branch costs a 304 and no rate-limit quota.
+    """
+    repo = ctx.repo
+    url = f"{repo.url}/commits/{quote(repo.default_branch)}"
+    return repo_flights.do(
+        ("head", ctx.full_name),
+        lambda: github_get(
+            ctx, url, accept="application/vnd.github.sha", conditional=True
+        ).decode().strip(),
+    )
 
-    repo = get_repo()
-    contents = repo.get_contents(path)
 
-    tree = []
+def get_head_sha(ctx):
+    """
+    Commit sha of the default branch, resolved once per session.
+    """
+    key = f"head_sha:{ctx.full_name}"
 
-    for idx, item in enumerate(contents):
-        if idx >= MAX_TREE_ENTRIES:
-            break
+    cached = get_cached(key)
+    if cached:
+        return cached
+
+    sha = disk_get("head", ctx.full_name, max_age=HEAD_CACHE_TTL_SECONDS)
+    if not sha:
+        sha = _fetch_head_sha(ctx)
+        disk_put("head", ctx.full_name, sha)
+
+    set_cached(key, sha)
+    set_cached(f"head_checked:{ctx.full_name}", time.monotonic())
+    return sha
+
+
+def _git_order(entry):
+    """
+    Sort key reproducing git's recursive tree order (directories compare
+    as if their name ended in "/").
+    """
+    parts = entry["path"].split("/")
+    last = parts[-1] + ("/" if entry["type"] == "dir" else "")
+    return tuple(part + "/" for part in parts[:-1]) + (last,)
+
+
+def _patch_entries(entries, files):
+    """
+    Apply compare-API file changes to a flat entry list.
+    Returns (new entries, changed paths, removed paths).
+    """
+    by_path = {entry["path"]: entry for entry in entries}
+    changed = set()
+    removed = set()
+
+    for file in files:
+        if file.status == "removed":
+            old_path = file.filename
+        elif file.status == "renamed":
+            old_path = file.previous_filename
+        else:
+            old_path = None
+
+        if old_path and by_path.pop(old_path, None) is not None:
+            removed.add(old_path)
+
+        if file.status != "removed":
+            by_path[file.filename] = {
+                "path": file.filename,
+                "type": "file",
+                "sha": file.sha,
+                "size": None,
+            }
+            changed.add(file.filename)
+            removed.discard(file.filename)
+
+    return _with_directories(by_path), changed, removed
+
+
+def _with_directories(by_path):
+    """
+    Add directory entries for every file's parents, drop directories left
+    empty, and return the entries in git order.
+    """
+    parents = set()
+    for path, entry in by_path.items():
+        if entry["type"] == "file":
+            parts = path.split("/")
+            parents.update("/".join(parts[:i]) for i in range(1, len(parts)))
+
+    for path in [p for p, e in by_path.items() if e["type"] == "dir" and p not in parents]:
+        del by_path[path]
+    for path in parents - set(by_path):
+        by_path[path] = {"path": path, "type": "dir", "sha": None, "size": None}
+
+    return sorted(by_path.values(), key=_git_order)
+
+
+def _snapshot_entries(ctx, sha):
+    manifest = repo_flights.do(
+        ("snapshot", ctx.full_name, sha),
+        lambda: ensure_snapshot(ctx.repo, ctx.full_name, sha),
+    )
+
+    # file reads stay on this snapshot for every blob that a later commit
+    # did not change
+    set_cached(f"snapshot:{ctx.full_name}", {
+        "sha": sha,
+        "blobs": {path: blob_sha for path, (blob_sha, _) in manifest.items()},
+    })
+
+    return _with_directories({
+        path: {"path": path, "type": "file", "sha": blob_sha, "size": size}
+        for path, (blob_sha, size) in manifest.items()
+    })
+
+
+def _carry_over(key_prefix, old_sha, new_sha):
+    cached = get_cached(f"{key_prefix}:{old_sha}")
+    if cached:
+        set_cached(f"{key_prefix}:{new_sha}", cached)
+
+
+def _compare_files(repo, base, head):
+    comparison = repo.compare(base, head)
+    return comparison.status, list(comparison.files)
+
+
+@traced("repo_tools.refresh_head")
+def refresh_head(ctx, force: bool = False):
+    """
+    Check whether the default branch moved since the caches were built.
+
+    Checks are throttled to one per HEAD_CHECK_INTERVAL_SECONDS. When the
+    head moved, the compare API tells which paths changed; only their
+    blobs are evicted and the tree entries, path index and blob map are
+    patched in place of a full re-crawl. The change set is recorded under
+    "delta:<new sha>" for derived indexes to patch themselves.
+
+    Returns the new head sha, or None if nothing changed.
+    """
+    old_sha = get_head_sha(ctx)
+    checked_key = f"head_checked:{ctx.full_name}"
+
+    checked_at = get_cached(checked_key) or 0
+    if not force and time.monotonic() - checked_at < HEAD_CHECK_INTERVAL_SECONDS:
+        return None
+    set_cached(checked_key, time.monotonic())
+
+    new_sha = _fetch_head_sha(ctx)
+    if new_sha == old_sha:
+        return None
+
+    disk_put("head", ctx.full_name, new_sha)
+    set_cached(f"head_sha:{ctx.full_name}", new_sha)
+
+    old_entries = get_cached(f"tree_entries:{old_sha}")
+    if not old_entries:
+        # nothing built yet for the old commit; load lazily from scratch
+        clear_file_cache()
+        return new_sha
+
+    status, files = repo_flights.do(
+        ("compare", ctx.full_name, old_sha, new_sha),
+        lambda: run(_compare_files, ctx.repo, old_sha, new_sha),
+    )
+    # only a fast-forward lists every difference between the two heads;
+    # otherwise changes that lived only on the old head would survive
+    if status != "ahead" or len(files) >= COMPARE_MAX_FILES:
+        clear_file_cache()
+        return new_sha
+
+    old_blobs = get_cached(f"blob_shas:{old_sha}") or {}
+    entries, changed, removed = _patch_entries(old_entries, files)
+
+    # superseded blobs stay in the shared store for sessions still pinned
+    # to the old head; the LRU evicts them once unused
+    for path in changed | removed:
+        drop_file_cached(path)
+
+    set_cached(f"tree_entries:{new_sha}", entries)
+    disk_put("tree", f"{ctx.full_name}@{new_sha}", entries)
+
+    old_index = get_cached(f"path_index:{old_sha}")
+    if old_index:
+        set_cached(
+            f"path_index:{new_sha}",
+            _patch_path_index(old_index, changed, removed),
+        )
+
+    if old_blobs:
+        blobs = dict(old_blobs)
+        for path in removed:
+            blobs.pop(path, None)
+        for file in files:
+            if file.filename in changed:
+                blobs[file.filename] = file.sha
+        set_cached(f"blob_shas:{new_sha}", blobs)
+
+    if not any(path.rpartition("/")[2].lower().startswith("readme") for path in changed | removed):
+        _carry_over("readme", old_sha, new_sha)
+
+    set_cached(f"delta:{new_sha}", {
+        "base": old_sha,
+        "changed": changed,
+        "removed": removed,
+    })
+    return new_sha
+
+
+def _fetch_tree_entries(repo, tree_sha, prefix=""):
+    """
+    Flat, pre-ordered list of entries below tree_sha.
+
+    One recursive trees request covers the whole repository; only when
+    GitHub truncates that response do we list each directory on its own,
+    one level of the tree at a time with the directories of a level
+    fetched concurrently.
+    """
+    git_tree = run(repo.get_git_tree, tree_sha, recursive=True)
+    if not git_tree.raw_data.get("truncated"):
+        return [_tree_entry(element, prefix) for element in git_tree.tree]
+
+    children = {}
+    level = [(tree_sha, prefix)]
+    while level:
+        listings = map_all(lambda item: run(repo.get_git_tree, item[0]).tree, level)
+        next_level = []
+        for (_, dir_prefix), elements in zip(level, listings):
+            children[dir_prefix] = [_tree_entry(e, dir_prefix) for e in elements]
+            next_level.extend(
+                (entry["sha"], entry["path"] + "/")
+                for entry in children[dir_prefix]
+                if entry["type"] == "dir"
+            )
+        level = next_level
+
+    def walk(dir_prefix):
+        for entry in children[dir_prefix]:
+            yield entry
+            if entry["type"] == "dir":
+                yield from walk(entry["path"] + "/")
+
+    return list(walk(prefix))
+
+
+def _tree_entry(element, prefix=""):
+    return {
+        "path": prefix + element.path,
+        "type": "dir" if element.type == "tree" else "file",
+        "sha": element.sha,
+        "size": element.size,
+    }
+
+
+def _load_tree_entries(repo, sha, disk_key):
+    entries = disk_get("tree", disk_key)
+    if entries is None:
+        entries = _fetch_tree_entries(repo, sha)
+        disk_put("tree", disk_key, entries)
+    return entries
+
+
+@traced("repo_tools.get_tree_entries")
+def get_tree_entries(ctx):
+    """
+    Flat list of every path in the repository at the current commit.
+    """
+    sha = get_head_sha(ctx)
+    key = f"tree_entries:{sha}"
+
+    cached = get_cached(key)
+    if cached:
+        return cached
+
+    if ctx.snapshot:
+        entries = _snapshot_entries(ctx, sha)
+        set_cached(key, entries)
+        return entries
+
+    repo = ctx.repo
+    disk_key = f"{ctx.full_name}@{sha}"
+
+    entries = repo_flights.do(
+        ("tree", disk_key), lambda: _load_tree_entries(repo, sha, disk_key)
+    )
+
+    set_cached(key, entries)
+    return entries
+
+
+def _build_tree(entries):
+    """
+    Nest flat tree entries into {"name", "path", "type", "children"} nodes,
+    keeping at most MAX_TREE_ENTRIES per directory.
+    """
+    root = []
+    children_of = {"": root}
+
+    for entry in entries:
+        parent, _, name = entry["path"].rpartition("/")
+        siblings = children_of.get(parent)
+
+        # parent was dropped by the entry cap
+        if siblings is None or len(siblings) >= MAX_TREE_ENTRIES:
+            continue
 
         node = {
-            "name": item.name,
-            "path": item.path,
-            "type": item.type,
+            "name": name,
+            "path": entry["path"],
+            "type": entry["type"],
         }
 
-        if item.type == "dir":
-            node["children"] = get_repo_tree(item.path, depth + 1)
+        if entry["type"] == "dir":
+            node["children"] = []
+            children_of[entry["path"]] = node["children"]
         else:
             node["children"] = None
 
-        tree.append(node)
+        siblings.append(node)
+
+    return root
+
 
-    if path == "":
-        set_cached("repo_tree", tree)
+def get_repo_tree(ctx):
+    sha = get_head_sha(ctx)
+    key = f"repo_tree:{sha}"
 
+    cached = get_cached(key)
+    if cached:
+        return cached
+
+    tree = _build_tree(get_tree_entries(ctx))
+    set_cached(key, tree)
     return tree
 
 def format_repo_tree(tree, prefix=""):
@@ -117,57 +432,184 @@ def format_repo_tree(tree, prefix=""):
 
 
 
-def find_file_path(filename: str):
-    repo = get_repo()
-    matches = []
+def _build_path_index(entries):
+    """
+    basename -> [paths] for every file in the tree.
+    """
+    index = {}
+    for entry in entries:
+        if entry["type"] != "file":
+            continue
+        name = entry["path"].rpartition("/")[2]
+        index.setdefault(name, []).append(entry["path"])
+    return index
+
+
+def _patch_path_index(index, changed, removed):
+    index = dict(index)
+    for path in changed | removed:
+        name = path.rpartition("/")[2]
+        paths = [p for p in index.get(name, []) if p != path]
+        if path in changed:
+            paths.append(path)
+        if paths:
+            index[name] = paths
+        else:
+            index.pop(name, None)
+    return index
+
+
+def get_path_index(ctx):
+    sha = get_head_sha(ctx)
+    key = f"path_index:{sha}"
+
+    cached = get_cached(key)
+    if cached:
+        return cached
 
-    def walk(path=""):
-        contents = repo.get_contents(path)
-        for item in contents:
-            if item.type == "file" and item.name == filename:
-                matches.append(item.path)
-            elif item.type == "dir":
-                walk(item.path)
+    index = _build_path_index(get_tree_entries(ctx))
+    set_cached(key, index)
+    return index
+
+
+def get_blob_sha(ctx, path: str):
+    """
+    Git blob sha of path at the current commit, or None if unknown.
+    """
+    sha = get_head_sha(ctx)
+    key = f"blob_shas:{sha}"
+
+    shas = get_cached(key)
+    if not shas:
+        shas = {
+            entry["path"]: entry["sha"]
+            for entry in get_tree_entries(ctx)
+            if entry["type"] == "file"
+        }
+        set_cached(key, shas)
+
+    return shas.get(path)
+
+
+def get_file_size(ctx, path: str):
+    """
+    Size in bytes of path at the current commit, or None if unknown
+    (e.g. a file changed since the tree was fetched).
+    """
+    sha = get_head_sha(ctx)
+    key = f"file_sizes:{sha}"
+
+    sizes = get_cached(key)
+    if not sizes:
+        sizes = {
+            entry["path"]: entry["size"]
+            for entry in get_tree_entries(ctx)
+            if entry["type"] == "file"
+        }
+        set_cached(key, sizes)
+
+    return sizes.get(path)
+
+
+def _match_path(index: dict, query: str):
+    candidates = index.get(query.rpartition("/")[2], [])
+
+    if "/" not in query:
+        return list(candidates)
+
+    return [
+        path for path in candidates
+        if path == query or path.endswith("/" + query)
+    ]
+
+
+@traced("repo_tools.find_file_path")
+def find_file_path(ctx, filename: str):
+    """
+    Resolve a bare filename, a trailing path (e.g. "agents/agent_a.py")
+    or a dotted Python module name (e.g. "utils.github_client") against
+    the path index.
+    """
+    query = filename.strip().removeprefix("./").strip("/")
+    if not query:
+        return []
+
+    index = get_path_index(ctx)
+    matches = _match_path(index, query)
+
+    if not matches and "." in query and "/" not in query:
+        module_path = query.replace(".", "/")
+        matches = (
+            _match_path(index, module_path + ".py")
+            or _match_path(index, module_path + "/__init__.py")
+        )
 
-    walk("")
     return matches
 
 
 
-def get_readme():
-    cached = get_cached("readme")
+def _load_readme(repo, sha, disk_key):
+    readme = disk_get("readme", disk_key)
+    if readme is None:
+        readme = run(repo.get_readme, ref=sha).decoded_content.decode()
+        disk_put("readme", disk_key, readme)
+    return readme
+
+
+@traced("repo_tools.get_readme")
+def get_readme(ctx):
+    sha = get_head_sha(ctx)
+    key = f"readme:{sha}"
+
+    cached = get_cached(key)
     if cached:
         return cached
 
-    repo = get_repo()
-    readme = repo.get_readme().decoded_content.decode()
-    set_cached("readme", readme)
+    repo = ctx.repo
+    disk_key = f"{ctx.full_name}@{sha}"
+
+    readme = repo_flights.do(
+        ("readme", disk_key), lambda: _load_readme(repo, sha, disk_key)
+    )
+
+    set_cached(key, readme)
     return readme
 
 
-def get_requirements():
+def get_requirements(ctx):
     try:
-        repo = get_repo()
-        req = repo.get_contents("requirements.txt")
+        repo = ctx.repo
+        sha = get_head_sha(ctx)
+        req = repo_flights.do(
+            ("requirements", ctx.full_name, sha),
+            lambda: run(repo.get_contents, "requirements.txt", ref=sha),
+        )
         return req.decoded_content.decode()
     except Exception:
         return None
 
 
 
-def get_repo_metadata():
-    repo = get_repo()
-    return {
-        "name": repo.name,
-        "description": repo.description,
-        "language": repo.language,
-        "stars": repo.stargazers_count,
-        "forks": repo.forks_count,
-    }
+def get_repo_metadata(ctx):
+    repo = ctx.repo
+
+    # keyed by repository, not commit: stars and forks move on quiet repos too
+    metadata = disk_get("metadata", ctx.full_name, max_age=METADATA_CACHE_TTL_SECONDS)
+    if metadata is None:
+        metadata = {
+            "name": repo.name,
+            "description": repo.description,
+            "language": repo.language,
+            "stars": repo.stargazers_count,
+            "forks": repo.forks_count,
+        }
+        disk_put("metadata", ctx.full_name, metadata)
+
+    return metadata
 
 
-def get_owner_info():
-    repo = get_repo()
+def get_owner_info(ctx):
+    repo = ctx.repo
     owner = repo.owner
     return f"""
 Owner: {owner.login}
@@ -0,0 +1,208 @@
+import time
+
+from tools import file_tools, repo_tools
+from tools.code_tools import detect_language
+from storage.session_cache import get_cached, set_cached
+from storage.vector_store import VectorIndex, load_vector_index, save_vector_index
+from utils.embedding_utils import embed_texts, embedder_name, embedding_dim
+from config.settings import (
+    ENABLE_VECTORSTORE,
+    MAX_FILE_SIZE_KB,
+    SEARCH_CHUNK_LINES,
+    SEARCH_CHUNK_OVERLAP,
+    SEARCH_EMBED_BATCH,
+    SEARCH_TOP_K,
+)
+
+#search tools
+# Semantic code search. Every source file is cut into overlapping line
+# windows, embedded in batches and kept in a FAISS index per commit. After
+# a refresh, only the chunks of the files in "delta:<sha>" are replaced.
+
+
+def _indexable(entry) -> bool:
+    return (
+        entry["type"] == "file"
+        and (entry.get("size") or 0) <= MAX_FILE_SIZE_KB * 1024
+        and detect_language(entry["path"]) != "unknown"
+    )
+
+
+def chunk_file(path: str, content: str):
+    """
+    [((path, start line, end line), text)] in windows of SEARCH_CHUNK_LINES
+    lines. The path is part of the text so file names are searchable too.
+    """
+    lines = content.splitlines()
+    step = SEARCH_CHUNK_LINES - SEARCH_CHUNK_OVERLAP
+    chunks = []
+    for start in range(0, max(len(lines), 1), step):
+        window = lines[start:start + SEARCH_CHUNK_LINES]
+        if not any(line.strip() for line in window):
+            continue
+        end = start + len(window)
+        chunks.append(((path, start + 1, end), path + "\n" + "\n".join(window)))
+        if end >= len(lines):
+            break
+    return chunks
+
+
+def _add_files(ctx, index: VectorIndex, paths, progress=None, cancel_event=None):
+    """
+    Chunk, embed and add paths, SEARCH_EMBED_BATCH chunks at a time.
+    """
+    pending_chunks, pending_texts = [], []
+
+    def flush():
+        if pending_texts:
+            index.add(pending_chunks, embed_texts(pending_texts))
+            pending_chunks.clear()
+            pending_texts.clear()
+
+    contents = file_tools.iter_file_contents(ctx, paths)
+    for done, (path, content) in enumerate(contents, 1):
+        if cancel_event is not None and cancel_event.is_set():
+            raise ValueError("Search index build cancelled")
+
+        if content:
+            for chunk, text in chunk_file(path, content):
+                pending_chunks.append(chunk)
+                pending_texts.append(text)
+            if len(pending_texts) >= SEARCH_EMBED_BATCH:
+                flush()
+
+        if progress is not None:
+            progress(done, len(paths))
+
+    flush()
+
+
+def _patched_index(ctx, sha: str, embedder: str, progress, cancel_event):
+    """
+    Copy of the previous commit's index with only changed files re-embedded,
+    or None when there is no delta or no index to start from.
+    """
+    delta = get_cached(f"delta:{sha}")
+    if not delta:
+        return None
+
+    base = get_cached(f"search_index:{delta['base']}")
+    if base is None:
+        base = load_vector_index(ctx.full_name, delta["base"], embedder)
+    if base is None:
+        return None
+
+    index = base.copy()
+    index.remove_paths(delta["changed"] | delta["removed"])
+
+    indexable = {
+        entry["path"] for entry in repo_tools.get_tree_entries(ctx)
+        if _indexable(entry)
+    }
+    changed = sorted(path for path in delta["changed"] if path in indexable)
+    _add_files(ctx, index, changed, progress, cancel_event)
+    return index
+
+
+def get_search_index(ctx, progress=None, cancel_event=None) -> VectorIndex:
+    """
+    Chunk index for the current commit: session cache, then disk, then a
+    patch of the previous commit's index, then a full build.
+    """
+    if not ENABLE_VECTORSTORE:
+        raise ValueError(
+            "Semantic search is disabled. Set ENABLE_VECTORSTORE to enable it."
+        )
+
+    sha = repo_tools.get_head_sha(ctx)
+    key = f"search_index:{sha}"
+
+    cached = get_cached(key)
+    if cached is not None:
+        return cached
+
+    embedder = embedder_name()
+    index = load_vector_index(ctx.full_name, sha, embedder)
+
+    if index is None:
+        started = time.perf_counter()
+        index = _patched_index(ctx, sha, embedder, progress, cancel_event)
+
+        if index is None:
+            paths = [
+                entry["path"] for entry in repo_tools.get_tree_entries(ctx)
+                if _indexable(entry)
+            ]
+            index = VectorIndex(embedding_dim())
+            _add_files(ctx, index, paths, progress, cancel_event)
+
+        index.build_seconds = time.perf_counter() - started
+        save_vector_index(ctx.full_name, sha, embedder, index)
+
+    set_cached(key, index)
+    return index
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def semantic_search(ctx, query: str, top_k: int = SEARCH_TOP_K, progress=None, cancel_event=None) -> dict:
+    """
+    Best matching files for query, each with its best line ranges, plus
+    latency of the embedding and search steps.
+    """
+    index = get_search_index(ctx, progress, cancel_event)
+
+    started = time.perf_counter()
+    vector = embed_texts([query])[0]
+    embedded = time.perf_counter()
+    hits = index.search(vector, top_k * 4)
+    searched = time.perf_counter()
+
+    # hits are best first, so the first hit of a file carries its score
+    files = {}
+    for score, path, start, end in hits:
+        match = files.setdefault(path, {"path": path, "score": score, "ranges": []})
+        if len(match["ranges"]) < 3:
+            match["ranges"].append((start, end))
+
+    results = sorted(files.values(), key=lambda m: -m["score"])[:top_k]
+    for match in results:
+        match["ranges"] = _merge_ranges(match["ranges"])
+
+    return {
+        "query": query,
+        "results": results,
+        "chunks": len(index),
+        "files": index.files(),
+        "embed_ms": (embedded - started) * 1000,
+        "search_ms": (searched - embedded) * 1000,
+        "build_seconds": index.build_seconds,
+    }
+
+
+def format_search_results(report: dict) -> str:
+    if not report["results"]:
+        return f"No matches found for: {report['query']}"
+
+    lines = [f"Top matches for: {report['query']}"]
+    for rank, match in enumerate(report["results"], 1):
+        ranges = ", ".join(f"{start}-{end}" for start, end in match["ranges"])
+        lines.append(
+            f"{rank}. {match['path']}  lines {ranges}  (score {match['score']:.2f})"
+        )
+
+    lines.append("")
+    lines.append(
+        f"Searched {report['chunks']:,} chunks from {report['files']:,} files: "
+        f"embedding {report['embed_ms']:.1f} ms, search {report['search_ms']:.1f} ms "
+        f"(index built in {report['build_seconds']:.1f} s)"
+    )
+    return "\n".join(lines)
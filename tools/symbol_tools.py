@@ -0,0 +1,120 @@
+import os
+
+from tools import code_tools, file_tools, repo_tools
+from tools.dependency_tools import module_name_for_path
+from tools.repo_metrics_tools import analyze_repo
+from storage.session_cache import get_cached, set_cached
+#symbol tools
+
+class SymbolIndex:
+    """
+    Definitions of every function, method and class in the repository,
+    looked up by plain name ("handle_query"), qualified name
+    ("AgentA.handle_query") or module-qualified name
+    ("agents.agent_a.AgentA.handle_query"). Lookups ignore case, but exact
+    case matches win.
+    """
+
+    def __init__(self, symbols_by_path: dict):
+        self.definitions = []
+        self._by_qualname = {}
+        self._by_name = {}
+
+        for path in sorted(symbols_by_path):
+            module = module_name_for_path(path) or os.path.splitext(path)[0].replace("/", ".")
+            for qualname, kind, start, end in symbols_by_path[path]:
+                position = len(self.definitions)
+                self.definitions.append({
+                    "name": qualname,
+                    "kind": kind,
+                    "path": path,
+                    "module": module,
+                    "start_line": start,
+                    "end_line": end,
+                })
+                self._by_qualname.setdefault(qualname.lower(), []).append(position)
+                short = qualname.rpartition(".")[2].lower()
+                self._by_name.setdefault(short, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.definitions)
+
+    def lookup(self, name: str, path: str = None) -> list:
+        name = name.strip().strip("`").removesuffix("()")
+        key = name.lower()
+
+        positions = self._by_qualname.get(key) or self._by_name.get(key, [])
+        if not positions and "." in key:
+            short = key.rpartition(".")[2]
+            positions = [
+                i for i in self._by_name.get(short, [])
+                if f"{self.definitions[i]['module']}.{self.definitions[i]['name']}".lower().endswith(key)
+            ]
+
+        matches = [self.definitions[i] for i in positions]
+        if path is not None:
+            matches = [d for d in matches if d["path"] == path]
+
+        exact = [
+            d for d in matches
+            if d["name"] == name or d["name"].endswith("." + name)
+            or f"{d['module']}.{d['name']}".endswith(name)
+        ]
+        return exact or matches
+
+
+def get_symbol_index(ctx, progress=None, cancel_event=None) -> SymbolIndex:
+    """
+    Symbol table for the current commit, built from the same parse as the
+    repository metrics; only blobs not seen before are parsed.
+    """
+    sha = repo_tools.get_head_sha(ctx)
+    key = f"symbol_index:{sha}"
+
+    cached = get_cached(key)
+    if cached is not None:
+        return cached
+
+    analysis = analyze_repo(ctx, progress, cancel_event)
+    if analysis["cancelled"]:
+        raise ValueError("Symbol index build cancelled")
+
+    index = SymbolIndex(analysis["symbols"])
+    set_cached(key, index)
+    return index
+
+
+def get_file_symbol_index(ctx, path: str) -> SymbolIndex:
+    """
+    Symbols to look a name up in: the whole-repo index when it is already
+    built, else only path's definitions, parsed from that one file.
+    """
+    cached = get_cached(f"symbol_index:{repo_tools.get_head_sha(ctx)}")
+    if cached is not None:
+        return cached
+
+    content = file_tools.get_file_content(ctx, path)
+    symbols = code_tools.code_symbols(
+        content,
+        code_tools.detect_language(path),
+        blob_sha=repo_tools.get_blob_sha(ctx, path),
+    )
+    return SymbolIndex({path: symbols})
+
+
+def format_location(definition: dict) -> str:
+    return (
+        f"{definition['path']}:{definition['start_line']}-{definition['end_line']}"
+    )
+
+
+def format_definitions(name: str, definitions: list) -> str:
+    if not definitions:
+        return f"No definition found for '{name}'"
+
+    lines = [f"Definitions of {name}:"]
+    lines.extend(
+        f"- {d['name']} ({d['kind']}) {format_location(d)}"
+        for d in definitions
+    )
+    return "\n".join(lines)
@@ -0,0 +1,120 @@
+import hashlib
+import math
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+from config.settings import EMBEDDING_MODEL, HASH_EMBEDDING_DIM
+
+# Text embeddings for semantic search. A local sentence-transformers model
+# is used when EMBEDDING_MODEL is set and the package is installed;
+# otherwise identifiers and words are feature-hashed into a fixed-size
+# vector, which needs no model download and runs offline.
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z0-9_]*")
+_SUBWORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+_STOP_WORDS = frozenset(
+    "a an and are as at be by do does for from how i if in is it of on or "
+    "the this that to what where which who with self def return import "
+    "none true false class pass".split()
+)
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def _get_model():
+    global _model
+    if not EMBEDDING_MODEL or SentenceTransformer is None:
+        return None
+    with _model_lock:
+        if _model is None:
+            _model = SentenceTransformer(EMBEDDING_MODEL)
+        return _model
+
+
+def embedder_name() -> str:
+    """
+    Identifies the vector space; indexes built by another embedder are
+    not comparable.
+    """
+    if _get_model() is not None:
+        return EMBEDDING_MODEL.replace("/", "__")
+    return f"hashed-{HASH_EMBEDDING_DIM}"
+
+
+def embedding_dim() -> int:
+    model = _get_model()
+    if model is not None:
+        return model.get_sentence_embedding_dimension()
+    return HASH_EMBEDDING_DIM
+
+
+def _features(text: str):
+    """
+    Lower-cased words plus the parts of snake_case / camelCase identifiers.
+    """
+    for word in _WORD.findall(text):
+        lowered = word.lower()
+        if lowered not in _STOP_WORDS:
+            yield lowered
+        parts = [part.lower() for part in _SUBWORD.findall(word)]
+        if len(parts) > 1:
+            for part in parts:
+                if part not in _STOP_WORDS and len(part) > 1:
+                    yield part
+
+
+# identifiers repeat across files, but a large repository has an open-ended
+# vocabulary, so the memo is bounded
+@lru_cache(maxsize=1 << 16)
+def _bucket(feature: str):
+    """
+    Stable (column, sign) for a feature; Python's hash() is salted per
+    process, which would break indexes persisted to disk.
+    """
+    digest = int.from_bytes(
+        hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little"
+    )
+    return digest % HASH_EMBEDDING_DIM, 1.0 if digest >> 63 else -1.0
+
+
+def _hashed_embeddings(texts) -> np.ndarray:
+    rows, cols, values = [], [], []
+    for row, text in enumerate(texts):
+        for feature, count in Counter(_features(text)).items():
+            col, sign = _bucket(feature)
+            rows.append(row)
+            cols.append(col)
+            values.append(sign * (1.0 + math.log(count)))
+
+    vectors = np.zeros((len(texts), HASH_EMBEDDING_DIM), dtype=np.float32)
+    np.add.at(vectors, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), values)
+    return vectors
+
+
+def embed_texts(texts) -> np.ndarray:
+    """
+    L2-normalised float32 matrix, one row per text, so inner product is
+    cosine similarity.
+    """
+    model = _get_model()
+    if model is not None:
+        vectors = np.asarray(
+            model.encode(list(texts), batch_size=64, show_progress_bar=False),
+            dtype=np.float32,
+        )
+    else:
+        vectors = _hashed_embeddings(texts)
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.maximum(norms, 1e-12, out=norms)
+    vectors /= norms
+    return vectors
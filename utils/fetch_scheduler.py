@@ -0,0 +1,453 @@
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from github import GithubException, RateLimitExceededException
+
+from utils import tracing
+
+from config.settings import (
+    FETCH_CONCURRENCY,
+    PREFETCH_CONCURRENCY,
+    FETCH_MAX_RETRIES,
+    FETCH_BACKOFF_BASE_SECONDS,
+    FETCH_BACKOFF_MAX_SECONDS,
+    FETCH_RATE_LIMIT_RESERVE,
+    FETCH_MAX_RATE_LIMIT_WAIT_SECONDS,
+    FETCH_TIMEOUT_SECONDS,
+    ETAG_CACHE_MAX_ENTRIES,
+)
+
+#fetch scheduler
+# The one place GitHub traffic goes through: at most FETCH_CONCURRENCY
+# requests in flight, one pooled HTTP session, ETag revalidation for
+# mutable endpoints, a pause when the rate limit is nearly used up and
+# retries with jittered exponential backoff. Worker threads must not touch
+# st.session_state, so work handed to imap / map_all only takes plain
+# arguments (urls, shas).
+#
+# Work started inside background() (prefetch) runs on its own small pool,
+# holds at most PREFETCH_CONCURRENCY slots and only takes a free slot when
+# no foreground request is waiting for one.
+
+RAW = "application/vnd.github.raw+json"
+JSON = "application/vnd.github+json"
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimitWaitError(RuntimeError):
+    """
+    The rate-limit quota is down to the reserve and will not reset within
+    FETCH_MAX_RATE_LIMIT_WAIT_SECONDS; raised to foreground callers instead
+    of blocking them until the window resets.
+    """
+
+    def __init__(self, reset_in: float):
+        super().__init__(
+            f"GitHub rate limit nearly used up; it resets in about "
+            f"{max(1, round(reset_in / 60))} min. Try again then."
+        )
+        self.reset_in = reset_in
+
+
+class _Retry(Exception):
+    def __init__(self, delay=None):
+        self.delay = delay
+
+
+class FetchScheduler:
+    def __init__(self, concurrency: int, background_concurrency: int):
+        self.concurrency = concurrency
+        self.background_concurrency = min(background_concurrency, concurrency)
+        self._slots = threading.Condition()
+        self._active = 0
+        self._active_background = 0
+        self._foreground_waiting = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="fetch"
+        )
+        self._background_executor = ThreadPoolExecutor(
+            max_workers=self.background_concurrency, thread_name_prefix="prefetch"
+        )
+        self._local = threading.local()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._etags = OrderedDict()
+        self._lock = threading.Lock()
+        self._quota = threading.Condition(self._lock)
+        self._remaining = None
+        self._reset_at = 0.0
+        self._paused_until = 0.0
+
+        self.requests = 0
+        self.retries = 0
+        self.not_modified = 0
+        self.rate_limit_waits = 0
+
+    # ---- rate limit ----
+
+    def _note_headers(self, headers):
+        if not headers:
+            return
+        remaining = headers.get("x-ratelimit-remaining") or headers.get("X-RateLimit-Remaining")
+        reset = headers.get("x-ratelimit-reset") or headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        self._note_quota(int(remaining), float(reset))
+
+    def _note_requester(self, fn, args):
+        """
+        Quota seen by the PyGithub client behind fn (a bound method of a
+        GitHub object, or a function taking one first). PyGithub reads the
+        rate-limit headers of every response it gets.
+        """
+        owner = getattr(fn, "__self__", None) or (args[0] if args else None)
+        requester = getattr(owner, "_requester", None)
+        limits = getattr(requester, "rate_limiting", None)
+        reset = getattr(requester, "rate_limiting_resettime", None)
+        if not limits or not reset or limits[0] < 0:
+            return
+        self._note_quota(int(limits[0]), float(reset))
+
+    def _note_quota(self, remaining: int, reset: float):
+        with self._quota:
+            self._remaining = remaining
+            self._reset_at = reset
+            if self._remaining > FETCH_RATE_LIMIT_RESERVE:
+                self._paused_until = 0.0
+                self._quota.notify_all()
+            elif self._reset_at > time.time():
+                self._paused_until = self._reset_at + 1
+        tracing.gauge("github.rate_limit_remaining", remaining)
+
+    def _wait_for_quota(self, revalidation: bool = False):
+        """
+        Hold every caller while the quota is down to the reserve. The pause
+        is shared: it ends when the window resets or when fresh headers show
+        quota again. Foreground callers wait at most
+        FETCH_MAX_RATE_LIMIT_WAIT_SECONDS, else get RateLimitWaitError;
+        ETag revalidations (answered by a free 304) do not wait.
+        """
+        if revalidation:
+            return
+        deadline = (
+            None if self.is_background()
+            else time.time() + FETCH_MAX_RATE_LIMIT_WAIT_SECONDS
+        )
+        with self._quota:
+            waited = False
+            while True:
+                now = time.time()
+                if self._paused_until <= now:
+                    low = (
+                        self._remaining is not None
+                        and self._remaining <= FETCH_RATE_LIMIT_RESERVE
+                        and self._reset_at > now
+                    )
+                    if not low:
+                        self._paused_until = 0.0
+                        return
+                    self._paused_until = self._reset_at + 1
+                if deadline is not None and self._paused_until > deadline:
+                    raise RateLimitWaitError(self._paused_until - now)
+                if not waited:
+                    self.rate_limit_waits += 1
+                    waited = True
+                self._quota.wait(self._paused_until - now)
+
+    def _backoff(self, attempt: int, at_least: float = None) -> float:
+        delay = random.uniform(
+            0, min(FETCH_BACKOFF_MAX_SECONDS, FETCH_BACKOFF_BASE_SECONDS * 2 ** attempt)
+        )
+        if at_least is not None:
+            delay = max(delay, min(at_least, FETCH_MAX_RATE_LIMIT_WAIT_SECONDS))
+        return delay
+
+    def _retry_after(self, headers):
+        """
+        Seconds GitHub asked us to wait, from Retry-After or an exhausted
+        rate limit; None if it did not say.
+        """
+        if not headers:
+            return None
+        lowered = {k.lower(): v for k, v in headers.items()}
+        if "retry-after" in lowered:
+            return float(lowered["retry-after"])
+        if lowered.get("x-ratelimit-remaining") == "0" and "x-ratelimit-reset" in lowered:
+            return max(0.0, float(lowered["x-ratelimit-reset"]) - time.time())
+        return None
+
+    def _retry_delay(self, error, attempt: int):
+        """
+        Backoff before the next attempt, or None if error is not retryable.
+        """
+        if isinstance(error, _Retry):
+            return self._backoff(attempt, error.delay)
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return self._backoff(attempt)
+        if isinstance(error, GithubException):
+            self._note_headers(error.headers)
+            waited = self._retry_after(error.headers)
+            if isinstance(error, RateLimitExceededException) or waited is not None:
+                return self._backoff(attempt, waited)
+            if error.status in _RETRY_STATUSES:
+                return self._backoff(attempt)
+        return None
+
+    # ---- slots ----
+
+    def is_background(self) -> bool:
+        return getattr(self._local, "background", False)
+
+    @contextmanager
+    def background(self):
+        """
+        Mark fetches made by this thread (and the pool work it starts) as
+        background work.
+        """
+        previous = self.is_background()
+        self._local.background = True
+        try:
+            yield
+        finally:
+            self._local.background = previous
+
+    @contextmanager
+    def _slot(self):
+        background = self.is_background()
+        with self._slots:
+            if background:
+                while (
+                    self._active >= self.concurrency
+                    or self._foreground_waiting
+                    or self._active_background >= self.background_concurrency
+                ):
+                    self._slots.wait()
+                self._active_background += 1
+            else:
+                self._foreground_waiting += 1
+                while self._active >= self.concurrency:
+                    self._slots.wait()
+                self._foreground_waiting -= 1
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._slots:
+                self._active -= 1
+                if background:
+                    self._active_background -= 1
+                self._slots.notify_all()
+
+    # ---- calls ----
+
+    def run(self, fn, *args, **kwargs):
+        """
+        fn(*args, **kwargs) within a concurrency slot, retried on transient
+        failures and rate limiting.
+        """
+        return self._run(
+            getattr(fn, "__qualname__", "call"), fn, args, kwargs, note_client=True
+        )
+
+    def _run(self, label, fn, args, kwargs, note_client=False, revalidation=False):
+        with tracing.span("github", call=label) as span:
+            attempt = 0
+            while True:
+                self._wait_for_quota(revalidation)
+                with self._slot():
+                    try:
+                        with self._lock:
+                            self.requests += 1
+                        tracing.count("github.requests")
+                        result = fn(*args, **kwargs)
+                        if note_client:
+                            self._note_requester(fn, args)
+                        span.set(attempts=attempt + 1, rate_limit_remaining=self._remaining)
+                        return result
+                    except Exception as e:
+                        delay = self._retry_delay(e, attempt)
+                        if delay is None or attempt >= FETCH_MAX_RETRIES:
+                            span.set(attempts=attempt + 1)
+                            if isinstance(e, _Retry):
+                                raise requests.HTTPError("GitHub request kept failing") from e
+                            raise
+
+                with self._lock:
+                    self.retries += 1
+                tracing.count("github.retries")
+                time.sleep(delay)
+                attempt += 1
+
+    def _send(self, url, headers, stream):
+        response = self.session.get(
+            url, headers=headers, stream=stream, timeout=FETCH_TIMEOUT_SECONDS
+        )
+        self._note_headers(response.headers)
+
+        if response.status_code in _RETRY_STATUSES or (
+            response.status_code == 403 and self._retry_after(response.headers) is not None
+        ):
+            delay = self._retry_after(response.headers)
+            response.close()
+            raise _Retry(delay)
+
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+    def get(self, url: str, token: str = None, accept: str = JSON, conditional: bool = False) -> bytes:
+        """
+        Body of a GET. With conditional=True the last ETag is sent and a 304
+        is answered from the stored body; 304s do not use rate-limit quota.
+        """
+        headers = {"Accept": accept, "X-GitHub-Api-Version": "2022-11-28"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+
+        key = (hash(token), url, accept)
+        stored = None
+        if conditional:
+            with self._lock:
+                stored = self._etags.get(key)
+                if stored is not None:
+                    self._etags.move_to_end(key)
+            if stored is not None:
+                headers["If-None-Match"] = stored[0]
+
+        response = self._run(
+            url, self._send, (url, headers, False), {}, revalidation=stored is not None
+        )
+        if response.status_code == 304 and stored is not None:
+            with self._lock:
+                self.not_modified += 1
+            tracing.count("github.not_modified")
+            return stored[1]
+
+        body = response.content
+        etag = response.headers.get("ETag")
+        if conditional and etag:
+            with self._lock:
+                self._etags[key] = (etag, body)
+                self._etags.move_to_end(key)
+                while len(self._etags) > ETAG_CACHE_MAX_ENTRIES:
+                    self._etags.popitem(last=False)
+        return body
+
+    @contextmanager
+    def stream(self, url: str, token: str = None, accept: str = RAW):
+        """
+        Streaming GET for large downloads; yields the open response.
+        """
+        headers = {"Accept": accept}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        response = self._run(url, self._send, (url, headers, True), {})
+        try:
+            yield response
+        finally:
+            response.close()
+
+    # ---- fan-out ----
+
+    def _work(self, fn, item, background):
+        self._local.worker = True
+        self._local.background = background
+        return fn(item)
+
+    def imap(self, fn, items):
+        """
+        fn(item) for each item, results in input order, with a bounded
+        number of items in flight. Nested use runs inline so pool threads
+        never wait on each other.
+        """
+        if getattr(self._local, "worker", False):
+            for item in items:
+                yield fn(item)
+            return
+
+        background = self.is_background()
+        executor = self._background_executor if background else self._executor
+        work = tracing.in_context(self._work)
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(executor.submit(work, fn, item, background))
+                if len(pending) >= 2 * self.concurrency:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def clear_etags(self):
+        with self._lock:
+            self._etags.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "not_modified": self.not_modified,
+                "rate_limit_waits": self.rate_limit_waits,
+                "rate_limit_remaining": self._remaining,
+            }
+
+
+_scheduler = FetchScheduler(FETCH_CONCURRENCY, PREFETCH_CONCURRENCY)
+
+
+def run(fn, *args, **kwargs):
+    return _scheduler.run(fn, *args, **kwargs)
+
+
+def github_get(ctx, url: str, accept: str = JSON, conditional: bool = False) -> bytes:
+    return _scheduler.get(url, ctx.token, accept, conditional)
+
+
+def github_stream(url: str, token: str = None, accept: str = RAW):
+    return _scheduler.stream(url, token, accept)
+
+
+def background():
+    return _scheduler.background()
+
+
+def is_background() -> bool:
+    return _scheduler.is_background()
+
+
+def imap(fn, items):
+    return _scheduler.imap(fn, items)
+
+
+def map_all(fn, items) -> list:
+    return list(_scheduler.imap(fn, items))
+
+
+def use_transport(session):
+    """
+    Send raw requests through session instead of the pooled
+    requests.Session, e.g. a local stand-in for benchmarks.
+    """
+    _scheduler.session = session
+
+
+def clear_etags():
+    _scheduler.clear_etags()
+
+
+def fetch_stats() -> dict:
+    return _scheduler.stats()
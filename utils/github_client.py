@@ -1,28 +1,121 @@
 
 
+import threading
+import time
+
 from github import Github
-from config.settings import GITHUB_TOKEN
+from utils.fetch_scheduler import run
+from config.settings import (
+    GITHUB_TOKEN,
+    GITHUB_POOL_SIZE,
+    GITHUB_HANDLE_TTL_SECONDS,
+    REPO_LIST_TTL_SECONDS,
+    SNAPSHOT_MODE,
+)
 
-# These will be set once per session
-_github_client = None
-_repo = None
+# Process-wide memo of clients, repo handles and repo listings so that
+# Streamlit reruns do not rebuild the client or re-query GitHub.
+_clients = {}
+_repo_handles = {}
+_repo_lists = {}
+_memo_lock = threading.Lock()
 
 
-def init_repo(owner: str, repo_name: str):
+class RepoContext:
     """
-    Initialize GitHub client and repository.
-    Must be called ONCE when user selects a repo.
+    The repository a session is working against.
+
+    Passed explicitly to tools and agents instead of living in module
+    globals, so concurrent sessions on different repos never share state.
+    Clients (and their HTTP connection pools) are shared underneath.
     """
-    global _github_client, _repo
 
-    _github_client = Github(GITHUB_TOKEN)
-    _repo = _github_client.get_repo(f"{owner}/{repo_name}")
+    def __init__(
+        self,
+        owner: str,
+        name: str,
+        repo,
+        token: str = GITHUB_TOKEN,
+        snapshot: bool = SNAPSHOT_MODE,
+    ):
+        self.owner = owner
+        self.name = name
+        self.repo = repo
+        self.token = token
+        # serve tree and file content from a local tarball snapshot
+        self.snapshot = snapshot
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.owner}/{self.name}"
+
+    def __repr__(self) -> str:
+        return f"RepoContext({self.full_name})"
+
+
+def _memoized(store: dict, key, ttl: float, factory):
+    now = time.monotonic()
+    with _memo_lock:
+        entry = store.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+    # fetch outside the lock; a rare duplicate fetch is harmless
+    value = factory()
+    with _memo_lock:
+        store[key] = (now + ttl, value)
+    return value
+
+
+def get_client(token: str = GITHUB_TOKEN) -> Github:
+    """
+    One client per token, shared by every session and thread.
+    """
+    with _memo_lock:
+        client = _clients.get(token)
+        if client is None:
+            # retries and pacing are left to the fetch scheduler
+            client = Github(
+                token,
+                pool_size=GITHUB_POOL_SIZE,
+                retry=None,
+                seconds_between_requests=None,
+            )
+            _clients[token] = client
+        return client
+
+
+def _repo_names(client, owner: str) -> list:
+    return [r.name for r in client.get_user(owner).get_repos()]
+
+
+def list_repos(owner: str, token: str = GITHUB_TOKEN) -> list:
+    """
+    Names of the owner's repositories, cached for REPO_LIST_TTL_SECONDS.
+    """
+    return _memoized(
+        _repo_lists,
+        (token, owner),
+        REPO_LIST_TTL_SECONDS,
+        lambda: run(_repo_names, get_client(token), owner),
+    )
 
 
-def get_repo():
+def init_repo(
+    owner: str,
+    repo_name: str,
+    token: str = GITHUB_TOKEN,
+    snapshot: bool = SNAPSHOT_MODE,
+) -> RepoContext:
     """
-    Return initialized repository object.
+    Return a new session context for owner/repo_name.
+    Cheap to call on every rerun: the underlying repo handle is memoized
+    per (token, owner, repo) for GITHUB_HANDLE_TTL_SECONDS.
     """
-    if _repo is None:
-        raise RuntimeError("Repository not initialized. Call init_repo() first.")
-    return _repo
+    repo = _memoized(
+        _repo_handles,
+        (token, owner, repo_name),
+        GITHUB_HANDLE_TTL_SECONDS,
+        lambda: run(get_client(token).get_repo, f"{owner}/{repo_name}"),
+    )
+    return RepoContext(owner, repo_name, repo, token, snapshot)
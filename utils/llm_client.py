@@ -0,0 +1,57 @@
+import threading
+
+from config.settings import (
+    LLM_PROVIDER,
+    LLM_MODEL,
+    LLM_TEMPERATURE,
+    LLM_MAX_TOKENS,
+)
+
+#llm client
+# One LLM client per process, shared by every session, request and thread
+# (the Groq client is thread-safe and keeps its HTTP connections open).
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def _create_llm():
+    if LLM_PROVIDER == "groq":
+        from groq import Groq
+        client = Groq()
+
+        class GroqLLM:
+            model = LLM_MODEL
+
+            def invoke(self, messages):
+                response = client.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=messages,
+                    temperature=LLM_TEMPERATURE,
+                    max_tokens=LLM_MAX_TOKENS,
+                )
+                return response.choices[0].message
+
+            def stream(self, messages):
+                response = client.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=messages,
+                    temperature=LLM_TEMPERATURE,
+                    max_tokens=LLM_MAX_TOKENS,
+                    stream=True,
+                )
+                for chunk in response:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+
+        return GroqLLM()
+
+    raise RuntimeError("Unsupported LLM provider")
+
+
+def get_llm():
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            _llm = _create_llm()
+        return _llm
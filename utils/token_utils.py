@@ -0,0 +1,25 @@
+
+import tiktoken
+
+# tiktoken has no Llama vocabulary; cl100k_base is a close enough
+# estimate for budgeting. It downloads its BPE file on first use, so fall
+# back to a character heuristic when that is not possible (offline).
+_ENCODING_NAME = "cl100k_base"
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding(_ENCODING_NAME)
+        except Exception:
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,390 @@
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config.settings import (
+    ENABLE_TRACING,
+    TRACE_MAX_SPANS,
+    TRACE_LOG_PATH,
+    METRICS_HOST,
+)
+
+#tracing
+# Lightweight span tracing. A trace covers one answer (classification,
+# GitHub calls, parsing, LLM calls, streaming); spans nest through context
+# variables, and thread pools carry them over with in_context(). Every
+# span and counter also feeds process-wide aggregates, exported as
+# Prometheus text; finished traces can be appended to a JSON-lines file.
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_current_trace = ContextVar("ares_trace", default=None)
+_current_span = ContextVar("ares_span", default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    def __init__(self, name: str, parent, attrs: dict):
+        self.id = next(_span_ids)
+        self.name = name
+        self.parent = parent.id if parent is not None else None
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+
+class _NullSpan:
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    def __init__(self, name: str, attrs: dict):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        self.end = None
+        self.spans = []
+        self.dropped = 0
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            # top-level spans (e.g. handle_query) are kept past the cap
+            if len(self.spans) < TRACE_MAX_SPANS or span.parent is None:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def count(self, name: str, value: float):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def find(self, name: str):
+        """
+        The first finished span called name, or None.
+        """
+        with self._lock:
+            return next((span for span in self.spans if span.name == name), None)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def breakdown(self) -> list:
+        """
+        [(span name, calls, total ms)], slowest first. Nested spans overlap,
+        so the totals do not add up to the trace duration.
+        """
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                calls, ms = totals.get(span.name, (0, 0.0))
+                totals[span.name] = (calls + 1, ms + span.duration_ms)
+        return sorted(
+            ((name, calls, ms) for name, (calls, ms) in totals.items()),
+            key=lambda row: -row[2],
+        )
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = [
+                {
+                    "id": span.id,
+                    "parent": span.parent,
+                    "name": span.name,
+                    "start_ms": round((span.start - self.start) * 1000, 3),
+                    "duration_ms": round(span.duration_ms, 3),
+                    "attrs": span.attrs,
+                }
+                for span in self.spans
+            ]
+            counters = dict(self.counters)
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "attrs": self.attrs,
+            "start": self.wall_start,
+            "duration_ms": round(self.duration_ms, 3),
+            "counters": counters,
+            "dropped_spans": self.dropped,
+            "spans": spans,
+        }
+
+
+class _Metrics:
+    """
+    Process-wide span latency histograms, counters and gauges.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def observe(self, name: str, seconds: float, error: bool):
+        with self._lock:
+            entry = self.spans.get(name)
+            if entry is None:
+                entry = self.spans[name] = {
+                    "count": 0,
+                    "errors": 0,
+                    "sum": 0.0,
+                    "buckets": [0] * len(_LATENCY_BUCKETS),
+                }
+            entry["count"] += 1
+            entry["errors"] += error
+            entry["sum"] += seconds
+            for i, bound in enumerate(_LATENCY_BUCKETS):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+
+    def count(self, name: str, value: float):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def snapshot(self):
+        with self._lock:
+            return (
+                {name: dict(entry, buckets=list(entry["buckets"])) for name, entry in self.spans.items()},
+                dict(self.counters),
+                dict(self.gauges),
+            )
+
+
+_metrics = _Metrics()
+_log_lock = threading.Lock()
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def trace(name: str, **attrs):
+    """
+    Collect the spans of one answer. Yields the Trace (None when tracing
+    is off).
+    """
+    if not ENABLE_TRACING:
+        yield None
+        return
+
+    active = Trace(name, attrs)
+    token = _current_trace.set(active)
+    span_token = _current_span.set(None)
+    try:
+        yield active
+    finally:
+        active.end = time.perf_counter()
+        _current_span.reset(span_token)
+        _current_trace.reset(token)
+        _metrics.observe("trace", (active.end - active.start), False)
+        if TRACE_LOG_PATH:
+            _write_trace(active)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Time a block as a child of the current span. Yields the span, whose
+    set() adds attributes (e.g. token counts) once they are known.
+    """
+    if not ENABLE_TRACING:
+        yield _NULL_SPAN
+        return
+
+    current = Span(name, _current_span.get(), attrs)
+    token = _current_span.set(current)
+    error = False
+    try:
+        yield current
+    except BaseException as e:
+        error = True
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+        _metrics.observe(name, current.end - current.start, error)
+        active = _current_trace.get()
+        if active is not None:
+            active.add(current)
+
+
+def record(name: str, start: float, **attrs):
+    """
+    Add a span that started at start (time.perf_counter()) and ends now,
+    for work that cannot sit inside a with block, e.g. a stream consumed
+    chunk by chunk.
+    """
+    if not ENABLE_TRACING:
+        return
+    finished = Span(name, _current_span.get(), attrs)
+    finished.start = start
+    finished.end = time.perf_counter()
+    _metrics.observe(name, finished.end - start, False)
+    active = _current_trace.get()
+    if active is not None:
+        active.add(finished)
+
+
+def traced(name: str):
+    """
+    Decorator form of span().
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, value: float = 1):
+    """
+    Add to a counter of the current trace and of the process.
+    """
+    if not ENABLE_TRACING:
+        return
+    _metrics.count(name, value)
+    active = _current_trace.get()
+    if active is not None:
+        active.count(name, value)
+
+
+def gauge(name: str, value: float):
+    if ENABLE_TRACING:
+        _metrics.gauge(name, value)
+
+
+def gauge_value(name: str):
+    return _metrics.snapshot()[2].get(name)
+
+
+def in_context(fn):
+    """
+    Wrap fn for a thread pool so its spans join the submitting caller's
+    trace.
+    """
+    context = copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+
+def _write_trace(finished: Trace):
+    line = json.dumps(finished.to_dict(), default=str)
+    directory = os.path.dirname(TRACE_LOG_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with _log_lock, open(TRACE_LOG_PATH, "a") as f:
+        f.write(line + "\n")
+
+
+def _metric_name(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def prometheus_text() -> str:
+    """
+    Aggregates in the Prometheus text exposition format.
+    """
+    spans, counters, gauges = _metrics.snapshot()
+    lines = [
+        "# HELP ares_span_duration_seconds Time spent in traced operations.",
+        "# TYPE ares_span_duration_seconds histogram",
+    ]
+    for name in sorted(spans):
+        entry = spans[name]
+        for bound, observed in zip(_LATENCY_BUCKETS, entry["buckets"]):
+            lines.append(
+                f'ares_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {observed}'
+            )
+        lines.append(
+            f'ares_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {entry["count"]}'
+        )
+        lines.append(f'ares_span_duration_seconds_sum{{span="{name}"}} {entry["sum"]:.6f}')
+        lines.append(f'ares_span_duration_seconds_count{{span="{name}"}} {entry["count"]}')
+
+    lines.append("# HELP ares_span_errors_total Traced operations that raised.")
+    lines.append("# TYPE ares_span_errors_total counter")
+    for name in sorted(spans):
+        lines.append(f'ares_span_errors_total{{span="{name}"}} {spans[name]["errors"]}')
+
+    for name in sorted(counters):
+        metric = f"ares_{_metric_name(name)}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {counters[name]}")
+
+    for name in sorted(gauges):
+        metric = f"ares_{_metric_name(name)}"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {gauges[name]}")
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = METRICS_HOST):
+    """
+    Serve /metrics on host:port from a daemon thread; once per process.
+    """
+    global _server
+    with _server_lock:
+        if _server is not None or not port:
+            return _server
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(
+            target=_server.serve_forever, name="metrics", daemon=True
+        ).start()
+        return _server